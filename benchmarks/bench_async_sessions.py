@@ -0,0 +1,84 @@
+"""Benchmark: concurrent sessions on one event loop versus sequential ``send`` calls.
+
+Every session runs one turn against the scripted offline model (``CI_COACH_LLM_PROVIDER=fake``)
+with a fixed simulated LLM latency. Turns are routed by the fast-path rules to a text-only
+coach, so the measurement is dominated by waiting on the LLM, which is the case ``asend``
+is meant for. The response cache is disabled so every turn pays the simulated latency.
+
+Throughput levels off at roughly 120 turns per second: past a hundred or so sessions the
+event loop is CPU-bound on LangGraph's per-step scheduling (about 8 ms per turn), and
+latency grows with the number of sessions rather than staying at the simulated latency.
+
+Run with ``python benchmarks/bench_async_sessions.py``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import time
+
+os.environ["CI_COACH_LLM_PROVIDER"] = "fake"
+os.environ["CI_COACH_LLM_CACHE_MODE"] = "off"
+os.environ.setdefault("CI_COACH_FAKE_LATENCY_MS", "200")
+
+import pandas as pd  # noqa: E402
+
+from ci_coach.app import CICoachApp  # noqa: E402
+
+SESSION_COUNTS = (1, 10, 100, 300)
+MESSAGE = "Help me write a SMART problem statement for slow QC release."
+
+
+def _sequential(sessions: int) -> tuple[float, list[float]]:
+    apps = [CICoachApp() for _ in range(sessions)]
+    latencies = []
+    start = time.perf_counter()
+    for app in apps:
+        turn_start = time.perf_counter()
+        app.send(MESSAGE)
+        latencies.append(time.perf_counter() - turn_start)
+    return time.perf_counter() - start, latencies
+
+
+async def _concurrent(sessions: int) -> tuple[float, list[float]]:
+    apps = [CICoachApp() for _ in range(sessions)]
+
+    async def turn(app: CICoachApp) -> float:
+        turn_start = time.perf_counter()
+        await app.asend(MESSAGE)
+        return time.perf_counter() - turn_start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(turn(app) for app in apps))
+    return time.perf_counter() - start, list(latencies)
+
+
+def main() -> None:
+    rows = []
+    for sessions in SESSION_COUNTS:
+        # Sequential runs scale linearly with the simulated latency; cap them for large counts.
+        if sessions <= 10:
+            wall, latencies = _sequential(sessions)
+            rows.append(_row("send (sequential)", sessions, wall, latencies))
+        wall, latencies = asyncio.run(_concurrent(sessions))
+        rows.append(_row("asend (gather)", sessions, wall, latencies))
+    print(f"Simulated LLM latency: {os.environ['CI_COACH_FAKE_LATENCY_MS']} ms per call")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+def _row(mode: str, sessions: int, wall: float, latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "wall_s": round(wall, 3),
+        "turns_per_s": round(sessions / wall, 1),
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Micro-benchmark: chart render time against dataset size, with and without data reduction.
+
+Renders each chart type from an in-memory DataFrame of a synthetic cycle-time extract.
+``reduced`` uses the default ``max_points`` threshold (LTTB/min-max decimation, numpy
+binning, hexbin and precomputed box statistics above it); ``full`` sets the threshold above
+the row count so every row is plotted, which is how charts were drawn before. Full renders
+are skipped for the largest sizes, where they take minutes.
+
+Run with ``python benchmarks/bench_chart_downsampling.py``.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+
+from ci_coach.artifacts import using_artifacts_dir
+from ci_coach.charts import MAX_POINTS, ChartRenderer, ChartSpec
+
+SIZES = (10_000, 100_000, 1_000_000, 5_000_000)
+FULL_LIMIT = 100_000
+CHARTS = {
+    "histogram": dict(value_column="cycle_time"),
+    "boxplot": dict(value_column="cycle_time"),
+    "run": dict(value_column="cycle_time", secondary_column="seq"),
+    "control": dict(value_column="cycle_time", secondary_column="seq"),
+    "scatter": dict(value_column="cycle_time", secondary_column="queue_time"),
+}
+
+
+def _dataset(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    queue_time = rng.gamma(2.0, 3.0, rows)
+    return pd.DataFrame(
+        {
+            "seq": np.arange(rows),
+            "queue_time": queue_time,
+            "cycle_time": 10 + 0.5 * queue_time + rng.normal(0, 2, rows) + np.sin(np.arange(rows) / 5_000),
+        }
+    )
+
+
+def _render(df: pd.DataFrame, chart: str, max_points: int) -> float:
+    renderer = ChartRenderer({"extract": df}, max_points=max_points)
+    spec = ChartSpec(dataset_name="extract", chart_type=chart, title=chart, **CHARTS[chart])
+    start = time.perf_counter()
+    renderer.render(spec)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp, using_artifacts_dir(Path(tmp)):
+        for size in SIZES:
+            df = _dataset(size)
+            for chart in CHARTS:
+                reduced = _render(df, chart, MAX_POINTS)
+                full = _render(df, chart, size + 1) if size <= FULL_LIMIT else None
+                rows.append(
+                    {
+                        "rows": size,
+                        "chart": chart,
+                        "reduced_ms": round(reduced * 1000, 1),
+                        "full_ms": round(full * 1000, 1) if full is not None else None,
+                    }
+                )
+    table = pd.DataFrame(rows).pivot(index="chart", columns="rows", values=["reduced_ms", "full_ms"])
+    print(table.to_string())
+
+
+if __name__ == "__main__":
+    main()
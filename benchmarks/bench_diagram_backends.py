@@ -0,0 +1,87 @@
+"""Micro-benchmark: diagram export latency per backend (SVG, Mermaid, DOT, PNG).
+
+Process maps are the synthetic swimlane maps of ``bench_process_map_layout.py``; fishbones
+have six categories with a growing number of causes each. The text backends run first, in
+a process that has not imported matplotlib, and ``pyplot_loaded`` records whether any of
+them pulled it in. PNG rasterisation is timed after a warm-up render and skipped above
+``PNG_LIMIT`` steps or causes. ``kb`` is each file's size.
+
+Run with ``python benchmarks/bench_diagram_backends.py``.
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+
+from bench_process_map_layout import synthetic_map
+from ci_coach.diagrams import DIAGRAM_RENDERERS
+
+MAP_SIZES = (20, 200, 2_000, 10_000)
+FISHBONE_SIZES = (12, 120, 1_200)
+CATEGORIES = 6
+TEXT_FORMATS = ("svg", "mermaid", "dot")
+PNG_LIMIT = 2_000
+
+
+def synthetic_fishbone(causes: int, categories: int = CATEGORIES) -> Dict[str, Any]:
+    per_category = max(causes // categories, 1)
+    return {
+        "effect": "Late deliveries",
+        "categories": [
+            {
+                "name": f"Category {category}",
+                "causes": [
+                    {"statement": f"Cause {category}.{cause}", "evidence": "Observed on the floor"}
+                    for cause in range(per_category)
+                ],
+            }
+            for category in range(categories)
+        ],
+    }
+
+
+def _time(fmt: str, kind: str, artifact: Dict[str, Any], path: Path) -> Dict[str, Any]:
+    renderer = DIAGRAM_RENDERERS[fmt]
+    start = time.perf_counter()
+    renderer.render(kind, artifact, path / f"{kind}{renderer.suffix}")
+    elapsed = time.perf_counter() - start
+    return {
+        "ms": round(elapsed * 1000, 1),
+        "kb": round((path / f"{kind}{renderer.suffix}").stat().st_size / 1024, 1),
+    }
+
+
+def main() -> None:
+    cases = [("process_map", size, synthetic_map(size)) for size in MAP_SIZES]
+    cases += [("fishbone", size, synthetic_fishbone(size)) for size in FISHBONE_SIZES]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind, size, artifact in cases:
+            for fmt in TEXT_FORMATS:
+                case = Path(tmp) / f"{kind}_{size}_{fmt}"
+                case.mkdir()
+                rows.append({"diagram": kind, "size": size, "format": fmt, **_time(fmt, kind, artifact, case)})
+        pyplot_loaded = "matplotlib.pyplot" in sys.modules
+
+        # Pay the one-off pyplot import before timing the PNG path.
+        DIAGRAM_RENDERERS["png"].render("process_map", synthetic_map(3), Path(tmp) / "warm_up.png")
+        for kind, size, artifact in cases:
+            if size > PNG_LIMIT:
+                continue
+            case = Path(tmp) / f"{kind}_{size}_png"
+            case.mkdir()
+            rows.append({"diagram": kind, "size": size, "format": "png", **_time("png", kind, artifact, case)})
+
+    table = pd.DataFrame(rows).pivot_table(index=["diagram", "size"], columns="format", values=["ms", "kb"])
+    print(table.to_string())
+    print(f"\npyplot_loaded by text backends: {pyplot_loaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Micro-benchmark: fishbone layout and rendering against the number of categories and causes.
+
+Synthetic fishbones have causes of two to twelve words, half of them with evidence, and
+about a third of the causes carry two sub-causes. ``layout_ms`` is
+:func:`ci_coach.fishbone_layout.fishbone_layout` alone; ``svg_ms`` and ``png_ms`` are the full
+exports. PNG time is dominated by glyph rasterisation, so it grows with the amount of text
+drawn; past ``MAX_FIGURE_INCHES`` the diagram is shrunk and cause labels are dropped.
+
+Run with ``python benchmarks/bench_fishbone_layout.py``.
+"""
+
+from __future__ import annotations
+
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+
+from ci_coach.diagrams import fishbone_svg, render_fishbone
+from ci_coach.fishbone_layout import fishbone_layout
+
+SIZES = ((4, 3), (6, 10), (6, 30), (12, 50), (20, 100))
+PNG_LIMIT = 1_000
+CATEGORY_NAMES = ("Methods", "Machines", "Materials", "Manpower", "Measurement", "Environment")
+WORDS = (
+    "queue triage lot sample analyst shift handover approval LIMS backlog calibration drift "
+    "training rework batch record review"
+).split()
+
+
+def synthetic_fishbone(categories: int, causes: int, seed: int = 7) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+
+    def words(count: int) -> str:
+        return " ".join(rnd.choice(WORDS) for _ in range(count))
+
+    def cause(nested: bool) -> Dict[str, Any]:
+        return {
+            "statement": words(rnd.randint(2, 12)),
+            "evidence": words(rnd.randint(1, 8)) if rnd.random() < 0.5 else "",
+            "causes": [cause(False) for _ in range(2)] if nested and rnd.random() < 0.3 else [],
+        }
+
+    return {
+        "effect": "Slow material release from QC",
+        "categories": [
+            {"name": f"{CATEGORY_NAMES[index % 6]} {index // 6 + 1}", "causes": [cause(True) for _ in range(causes)]}
+            for index in range(categories)
+        ],
+    }
+
+
+def _time(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def main() -> None:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Pay the one-off pyplot import before timing.
+        render_fishbone(synthetic_fishbone(1, 1), Path(tmp) / "warm_up.png")
+        for categories, causes in SIZES:
+            fishbone = synthetic_fishbone(categories, causes)
+            layout = fishbone_layout(fishbone)
+            rows.append(
+                {
+                    "categories": categories,
+                    "causes": causes,
+                    "rows": layout.causes,
+                    "layout_ms": _time(fishbone_layout, fishbone),
+                    "svg_ms": _time(fishbone_svg, fishbone),
+                    "png_ms": _time(render_fishbone, fishbone, Path(tmp) / f"fishbone_{categories}_{causes}.png")
+                    if layout.causes <= PNG_LIMIT
+                    else None,
+                    "inches": f"{layout.width:.0f} x {layout.height:.0f}",
+                }
+            )
+    print(pd.DataFrame(rows).set_index(["categories", "causes"]).to_string())
+
+
+if __name__ == "__main__":
+    main()
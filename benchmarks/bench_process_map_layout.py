@@ -0,0 +1,79 @@
+"""Micro-benchmark: process-map graph indexing, layered layout and rendering against map size.
+
+Synthetic as-is maps spread steps over 12 role lanes. Each step follows one of the three
+steps before it, so branches run in parallel, and about one step in twenty loops back as
+rework. ``columns`` is the layered layout's width; the previous renderer used one column
+per step. Rendering skips step labels once the map is shrunk past legibility, which is why
+the largest sizes render faster per step.
+
+Run with ``python benchmarks/bench_process_map_layout.py``.
+"""
+
+from __future__ import annotations
+
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+
+from ci_coach.diagrams import render_process_map
+from ci_coach.process_graph import ProcessGraph, layered_layout
+
+SIZES = (20, 100, 500, 2_000, 10_000)
+LANES = 12
+RENDER_LIMIT = 2_000
+
+
+def synthetic_map(steps: int, lanes: int = LANES, seed: int = 7) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    edges = []
+    for step in range(1, steps):
+        edges.append({"from": f"s{max(0, step - rnd.randint(1, 3))}", "to": f"s{step}"})
+        if step > 5 and rnd.random() < 0.05:
+            edges.append({"from": f"s{step}", "to": f"s{step - rnd.randint(2, 5)}", "note": "rework"})
+    return {
+        "roles": [{"id": f"r{lane}", "name": f"Role {lane}"} for lane in range(lanes)],
+        "steps": [
+            {"id": f"s{step}", "name": f"Step {step}", "role_id": f"r{rnd.randrange(lanes)}"}
+            for step in range(steps)
+        ],
+        "edges": edges,
+    }
+
+
+def main() -> None:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Pay the one-off pyplot import before timing.
+        render_process_map(synthetic_map(3), Path(tmp) / "warm_up.png")
+        for size in SIZES:
+            process_map = synthetic_map(size)
+            start = time.perf_counter()
+            graph = ProcessGraph.from_map(process_map)
+            indexed = time.perf_counter()
+            layout = layered_layout(graph)
+            laid_out = time.perf_counter()
+            render_ms = None
+            if size <= RENDER_LIMIT:
+                render_process_map(process_map, Path(tmp) / f"map_{size}.png")
+                render_ms = round((time.perf_counter() - laid_out) * 1000, 1)
+            rows.append(
+                {
+                    "steps": size,
+                    "edges": len(graph.edges),
+                    "index_ms": round((indexed - start) * 1000, 2),
+                    "layout_ms": round((laid_out - indexed) * 1000, 2),
+                    "render_ms": render_ms,
+                    "columns": layout.columns,
+                    "rows": layout.rows,
+                    "rework_edges": int(layout.back_edge.sum()),
+                }
+            )
+    print(pd.DataFrame(rows).set_index("steps").to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Micro-benchmark: process discovery from event logs against the number of events.
+
+Synthetic logs follow Receive, Sample, Test, Review and Release with random retests and a
+long tail of eighty rare activities, four to eight events per case, and string timestamps
+as they arrive from a CSV. ``mine_ms`` is :func:`ci_coach.process_mining.discover_process_map`
+end to end, timestamp parsing included; ``shift_ms`` is the usual pandas version of the
+directly-follows count (sort, ``groupby().shift()``, then ``groupby().agg()`` over the
+pairs), skipped above ``SHIFT_LIMIT`` events.
+
+Run with ``python benchmarks/bench_process_mining.py``.
+"""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from ci_coach.process_mining import discover_process_map
+
+CASES = (1_000, 10_000, 100_000, 500_000)
+SHIFT_LIMIT = 1_000_000
+ACTIVITIES = np.array(["Receive", "Sample", "Test", "Retest", "Review", "Release"] + [f"Rare {i}" for i in range(80)])
+LANES = np.array(["Warehouse", "QC", "QC", "QC", "QA", "QA"] + ["Other"] * 80)
+
+
+def synthetic_log(cases: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(4, 9, cases)
+    events = int(lengths.sum())
+    case = np.repeat(np.arange(cases), lengths)
+    position = np.arange(events) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    activity = np.minimum(position, 5)
+    activity = np.where(rng.random(events) < 0.05, 3, activity)
+    activity = np.where(rng.random(events) < 0.01, 6 + rng.integers(0, 80, events), activity)
+    minutes = np.repeat(rng.integers(0, 10**6, cases), lengths) + position * rng.integers(10, 600, events)
+    timestamps = np.datetime64("2024-01-01") + minutes.astype("timedelta64[m]")
+    return pd.DataFrame(
+        {
+            "case_id": case.astype(str),
+            "activity": ACTIVITIES[activity],
+            "timestamp": pd.Series(timestamps).dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "resource": LANES[activity],
+        }
+    )
+
+
+def shift_dfg(log: pd.DataFrame) -> pd.DataFrame:
+    events = log.assign(timestamp=pd.to_datetime(log["timestamp"])).sort_values(["case_id", "timestamp"], kind="stable")
+    grouped = events.groupby("case_id")
+    events["next"] = grouped["activity"].shift(-1)
+    events["gap"] = (grouped["timestamp"].shift(-1) - events["timestamp"]).dt.total_seconds() / 60
+    return events.dropna(subset=["next"]).groupby(["activity", "next"])["gap"].agg(["size", "median"])
+
+
+def _time(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def main() -> None:
+    rows = []
+    for cases in CASES:
+        log = synthetic_log(cases)
+        discovery = discover_process_map(log)
+        rows.append(
+            {
+                "cases": cases,
+                "events": len(log),
+                "activities": len(discovery.process_map["steps"]),
+                "transitions": len(discovery.process_map["edges"]),
+                "mine_ms": _time(discover_process_map, log),
+                "shift_ms": _time(shift_dfg, log) if len(log) <= SHIFT_LIMIT else None,
+            }
+        )
+    print(pd.DataFrame(rows).set_index("cases").to_string())
+
+
+if __name__ == "__main__":
+    main()
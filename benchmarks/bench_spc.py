@@ -0,0 +1,81 @@
+"""Micro-benchmark: SPC limits and Nelson rule checks against series length.
+
+Times :func:`ci_coach.spc.imr`, :func:`~ci_coach.spc.xbar_r` (subgroups of 5) and
+:func:`~ci_coach.spc.xbar_s` (subgroups of 12), each computing limits and all eight rules,
+on a synthetic cycle-time series with a shift and a trend injected. ``loop_ms`` is the same
+rule check written as a per-point Python loop, for comparison; it is skipped above 100,000
+points, where it takes minutes.
+
+Run with ``python benchmarks/bench_spc.py``.
+"""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from ci_coach.spc import imr, xbar_r, xbar_s
+
+SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+LOOP_LIMIT = 100_000
+
+
+def _series(points: int) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    values = rng.normal(30, 2, points)
+    values[points // 2 : points // 2 + 50] += 4
+    values[points // 4 : points // 4 + 20] += np.linspace(0, 6, 20)
+    return values
+
+
+def _loop_rules(values: np.ndarray, center: float, sigma: float) -> int:
+    z = [(value - center) / sigma for value in values]
+    hits = 0
+    for i in range(len(z)):
+        window = z[max(0, i - 14) : i + 1]
+        steps = [b - a for a, b in zip(window, window[1:])]
+        hits += abs(z[i]) > 3
+        hits += len(window) >= 9 and (all(v > 0 for v in window[-9:]) or all(v < 0 for v in window[-9:]))
+        hits += len(steps) >= 5 and (all(s > 0 for s in steps[-5:]) or all(s < 0 for s in steps[-5:]))
+        hits += len(steps) >= 13 and all(a * b < 0 for a, b in zip(steps[-13:], steps[-12:]))
+        hits += len(window) >= 3 and (
+            sum(v > 2 for v in window[-3:]) >= 2 or sum(v < -2 for v in window[-3:]) >= 2
+        )
+        hits += len(window) >= 5 and (
+            sum(v > 1 for v in window[-5:]) >= 4 or sum(v < -1 for v in window[-5:]) >= 4
+        )
+        hits += len(window) >= 15 and all(abs(v) < 1 for v in window[-15:])
+        hits += len(window) >= 8 and all(abs(v) > 1 for v in window[-8:])
+    return hits
+
+
+def _time(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def main() -> None:
+    rows = []
+    for size in SIZES:
+        values = _series(size)
+        result = imr(values)
+        rows.append(
+            {
+                "points": size,
+                "imr_ms": _time(imr, values),
+                "xbar_r_ms": _time(xbar_r, values, 5),
+                "xbar_s_ms": _time(xbar_s, values, 12),
+                "loop_ms": _time(_loop_rules, values, result.limits.center, result.sigma)
+                if size <= LOOP_LIMIT
+                else None,
+                "signals": sum(violation.indices.size for violation in result.violations),
+            }
+        )
+    print(pd.DataFrame(rows).set_index("points").to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Startup benchmark: import cost of the package entry points, from ``python -X importtime``.
+
+Each module is imported in a fresh interpreter ``REPEATS`` times. The table shows the median
+cumulative import time and how many modules were loaded, plus whether any of the heavy
+dependencies that should load lazily (the plotting stack, the OpenAI client) came along.
+The slowest imports behind ``ci_coach.app`` are listed below the table.
+
+With ``--check`` the script exits non-zero when an entry point exceeds its budget in
+``BUDGET_MS`` or loads a lazy dependency, so it can guard against import-time regressions
+in CI. Run with ``python benchmarks/bench_startup.py [--check]``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+REPEATS = 3
+# Generous budgets: they catch an eager matplotlib or LangChain import, not machine noise.
+BUDGET_MS = {
+    "ci_coach": 100,
+    "ci_coach.cli": 2_000,
+    "ci_coach.app": 3_000,
+    "ci_coach.charts": 1_500,
+}
+LAZY_MODULES = ("matplotlib.pyplot", "seaborn", "scipy", "langchain_openai", "openai")
+
+
+def _importtime(module: str) -> List[Tuple[str, int, int]]:
+    """Return ``(module, self_us, cumulative_us)`` rows for importing ``module``."""
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _measure(module: str) -> Tuple[Dict[str, object], List[Tuple[str, int, int]]]:
+    runs = [_importtime(module) for _ in range(REPEATS)]
+    totals = [next(row[2] for row in run if row[0] == module) for run in runs]
+    loaded = {row[0] for row in runs[0]}
+    lazy = [name for name in LAZY_MODULES if name in loaded]
+    return (
+        {
+            "module": module,
+            "import_ms": round(statistics.median(totals) / 1000, 1),
+            "budget_ms": BUDGET_MS[module],
+            "modules_loaded": len(loaded),
+            "lazy_deps_loaded": ", ".join(lazy) or "-",
+        },
+        runs[0],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="Exit non-zero on a budget or laziness regression.")
+    args = parser.parse_args()
+
+    results = []
+    app_rows: List[Tuple[str, int, int]] = []
+    for module in BUDGET_MS:
+        result, rows = _measure(module)
+        results.append(result)
+        if module == "ci_coach.app":
+            app_rows = rows
+    table = pd.DataFrame(results).set_index("module")
+    print(table.to_string())
+
+    slowest = sorted(app_rows, key=lambda row: row[1], reverse=True)[:10]
+    print("\nSlowest imports (self time) behind ci_coach.app:")
+    for name, self_us, cumulative_us in slowest:
+        print(f"  {self_us / 1000:8.1f} ms self  {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    if args.check:
+        failures = table[(table["import_ms"] > table["budget_ms"]) | (table["lazy_deps_loaded"] != "-")]
+        if not failures.empty:
+            print(f"\nStartup regression in: {', '.join(failures.index)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Micro-benchmark: per-hop graph state overhead as conversation history grows.
+
+Compares the legacy ``StateGraph(dict)`` pattern, where every node round-trips the full
+state through ``CIState.from_dict``/``to_dict``, against the typed ``GraphState`` schema
+where nodes return only the fields they change. No LLM is involved; each node appends one
+assistant message, which is the shape of a real coach hop.
+
+Run with ``python benchmarks/bench_state_hops.py``.
+"""
+
+from __future__ import annotations
+
+import time
+
+import pandas as pd
+from langgraph.graph import END, StateGraph
+
+from ci_coach.state import CIState, GraphState, Message, message_update
+
+HOPS = 8
+REPEATS = 20
+HISTORY_SIZES = (10, 100, 1_000, 5_000)
+
+
+def _legacy_node(state):
+    ci_state = CIState.from_dict(state)
+    ci_state.messages.append(Message(role="assistant", content="ok"))
+    ci_state.audit_log.append({"role": "assistant", "content": "ok"})
+    ci_state.turn_hops += 1
+    return ci_state.to_dict()
+
+
+def _delta_node(state: GraphState) -> GraphState:
+    ci_state = CIState.from_graph_state(state)
+    update = message_update("assistant", "ok")
+    update["turn_hops"] = ci_state.turn_hops + 1
+    return update
+
+
+def _build(schema, node):
+    graph = StateGraph(schema)
+    names = [f"hop_{i}" for i in range(HOPS)]
+    for name in names:
+        graph.add_node(name, node)
+    graph.set_entry_point(names[0])
+    for current, following in zip(names, names[1:]):
+        graph.add_edge(current, following)
+    graph.add_edge(names[-1], END)
+    return graph.compile()
+
+
+def _make_state(history: int) -> CIState:
+    state = CIState()
+    for i in range(history):
+        role = "user" if i % 2 == 0 else "assistant"
+        state.messages.append(Message(role=role, content=f"message {i} " * 20))
+        state.audit_log.append({"role": role, "content": f"message {i}"})
+    state.datasets["dataset_1"] = pd.DataFrame({"cycle": range(10_000)})
+    return state
+
+
+def _per_hop_us(graph, make_input) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        payload = make_input()
+        start = time.perf_counter()
+        graph.invoke(payload)
+        best = min(best, time.perf_counter() - start)
+    return best / HOPS * 1e6
+
+
+def main() -> None:
+    legacy = _build(dict, _legacy_node)
+    delta = _build(GraphState, _delta_node)
+
+    print(f"{'history':>8} {'legacy us/hop':>14} {'delta us/hop':>13}")
+    for history in HISTORY_SIZES:
+        state = _make_state(history)
+        legacy_us = _per_hop_us(legacy, state.to_dict)
+        delta_us = _per_hop_us(delta, state.to_graph_state)
+        print(f"{history:>8} {legacy_us:>14.1f} {delta_us:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
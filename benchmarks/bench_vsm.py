@@ -0,0 +1,96 @@
+"""Micro-benchmark: value stream metrics and VSM export against stages and product families.
+
+Synthetic value streams have random cycle times, waits and WIP, split evenly over the
+families. ``compute_ms`` is :func:`ci_coach.vsm.compute_vsm` and ``to_dict_ms`` builds the VSM
+JSON kept in the session state; ``loop_ms`` is the straightforward per-family pandas loop
+they replace (boolean mask, sums, ``idxmax`` and a takt filter per family), skipped above
+``LOOP_LIMIT`` families. ``svg_ms`` and ``png_ms`` are the diagram exports, skipped above
+``SVG_LIMIT`` and ``PNG_LIMIT`` stages.
+
+Run with ``python benchmarks/bench_vsm.py``.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ci_coach.diagrams import render_vsm, vsm_svg
+from ci_coach.vsm import DEFAULT_AVAILABLE_MIN, compute_vsm
+
+SIZES = ((10, 1), (1_000, 10), (10_000, 100), (200_000, 2_000))
+DEMAND = 40.0
+LOOP_LIMIT = 500
+SVG_LIMIT = 10_000
+PNG_LIMIT = 1_000
+
+
+def synthetic_stages(stages: int, families: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "id": [f"s{i}" for i in range(stages)],
+            "name": [f"Stage {i}" for i in range(stages)],
+            "family": [f"Family {i * families // stages}" for i in range(stages)],
+            "ct_min": rng.gamma(2.0, 4.0, stages).round(2),
+            "wt_min": rng.gamma(1.5, 60.0, stages).round(1),
+            "wip": rng.integers(0, 40, stages),
+        }
+    )
+
+
+def per_family_loop(stages: pd.DataFrame) -> List[Dict[str, Any]]:
+    takt = DEFAULT_AVAILABLE_MIN / DEMAND
+    results = []
+    for family in stages["family"].unique():
+        rows = stages[stages["family"] == family]
+        value_add, wait = rows["ct_min"].sum(), rows["wt_min"].sum()
+        results.append(
+            {
+                "family": family,
+                "lead_time_min": value_add + wait,
+                "pct_va": value_add / (value_add + wait),
+                "bottleneck_stage_id": rows.loc[rows["ct_min"].idxmax(), "id"],
+                "stages_over_takt": rows.loc[rows["ct_min"] > takt, "id"].tolist(),
+                "wip_lead_time_min": rows["wip"].sum() * takt,
+            }
+        )
+    return results
+
+
+def _time(function, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def main() -> None:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Pay the one-off pyplot import before timing.
+        render_vsm(compute_vsm(synthetic_stages(3, 1), DEMAND).to_dict(), Path(tmp) / "warm_up.png")
+        for size, families in SIZES:
+            stages = synthetic_stages(size, families)
+            result = compute_vsm(stages, DEMAND)
+            vsm = result.to_dict()
+            rows.append(
+                {
+                    "stages": size,
+                    "families": families,
+                    "compute_ms": _time(compute_vsm, stages, DEMAND),
+                    "to_dict_ms": _time(result.to_dict),
+                    "loop_ms": _time(per_family_loop, stages) if families <= LOOP_LIMIT else None,
+                    "svg_ms": _time(vsm_svg, vsm) if size <= SVG_LIMIT else None,
+                    "png_ms": _time(render_vsm, vsm, Path(tmp) / f"vsm_{size}.png") if size <= PNG_LIMIT else None,
+                }
+            )
+    print(pd.DataFrame(rows).set_index(["stages", "families"]).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,20 @@
 """Unified Continuous Improvement Coach package."""
 
-from .app import CICoachApp
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .app import CICoachApp
 
 __all__ = ["CICoachApp"]
+
+
+def __getattr__(name: str) -> Any:
+    # ``CICoachApp`` pulls in LangGraph, LangChain and pandas; importing it on first access
+    # keeps ``import ci_coach.<module>`` (and the render workers) light.
+    if name == "CICoachApp":
+        from .app import CICoachApp
+
+        return CICoachApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,130 +2,438 @@
 
 from __future__ import annotations
 
-from typing import Dict
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
 
+import pandas as pd
 from langgraph.graph import END, StateGraph
 
+from .artifacts import using_artifacts_dir
 from .coaches import (
+    COACH_TEMPERATURE,
+    DIAGRAM_TITLES,
+    SUPERVISOR_TEMPERATURE,
     a3_node,
+    aa3_node,
+    acharts_node,
+    afishbone_node,
+    afive_whys_node,
+    akaizen_node,
+    aproblem_node,
+    aprocess_map_node,
+    asipoc_node,
+    asupervisor_node,
+    avalue_prop_node,
+    avsm_node,
     charts_node,
     five_whys_node,
     fishbone_node,
     kaizen_node,
     problem_node,
     process_map_node,
+    render_diagram,
     sipoc_node,
+    streaming,
+    summarise_history,
     supervisor_node,
     value_prop_node,
+    vsm_node,
 )
-from .datasets import dataframe_preview, extract_datasets
-from .state import CIState, append_message
+from .conversation import build_context_window, count_tokens, summary_due
+from .dataset_store import get_dataset_store
+from .datasets import IngestStats, dataframe_preview, extract_datasets, load_dataset
+from .diagrams import DIAGRAM_KINDS
+from .llm import get_registry
+from .llm_cache import get_response_cache
+from .persistence import SessionCheckpointer
+from .policy import TurnPolicy
+from .render_cache import get_render_cache
+from .render_pool import get_render_pool
+from .state import CIState, GraphState, Message, append_message
 
+COACH_NODES = {
+    "problem": problem_node,
+    "value_prop": value_prop_node,
+    "process_map": process_map_node,
+    "sipoc": sipoc_node,
+    "fishbone": fishbone_node,
+    "five_whys": five_whys_node,
+    "a3": a3_node,
+    "kaizen": kaizen_node,
+    "charts": charts_node,
+    "vsm": vsm_node,
+}
 
-def _route_from_supervisor(state: Dict[str, any]) -> str:
+ASYNC_COACH_NODES = {
+    "problem": aproblem_node,
+    "value_prop": avalue_prop_node,
+    "process_map": aprocess_map_node,
+    "sipoc": asipoc_node,
+    "fishbone": afishbone_node,
+    "five_whys": afive_whys_node,
+    "a3": aa3_node,
+    "kaizen": akaizen_node,
+    "charts": acharts_node,
+    "vsm": avsm_node,
+}
+
+
+def _node_id(decision: str) -> str:
+    # Graph node ids may not reuse GraphState keys such as ``process_map`` or ``charts``.
+    return f"{decision}_coach"
+
+
+def _route_from_supervisor(state: GraphState) -> str:
     decision = state.get("router_decision") or "problem"
-    if decision not in {
-        "problem",
-        "value_prop",
-        "process_map",
-        "sipoc",
-        "fishbone",
-        "five_whys",
-        "a3",
-        "kaizen",
-        "charts",
-        "idle",
-    }:
+    if decision != "idle" and decision not in COACH_NODES:
         return "problem"
     return decision
 
 
-class CICoachApp:
-    """High level interface for running the CI Coach conversation."""
+def _route_after_coach(state: GraphState) -> str:
+    """End the turn after a coach unless the policy allows chaining another hop."""
 
-    def __init__(self) -> None:
-        self.state = CIState()
-        self._graph = self._build_graph()
-
-    def _build_graph(self):
-        graph = StateGraph(dict)
-        graph.add_node("supervisor", supervisor_node)
-        graph.add_node("problem", problem_node)
-        graph.add_node("value_prop", value_prop_node)
-        graph.add_node("process_map", process_map_node)
-        graph.add_node("sipoc", sipoc_node)
-        graph.add_node("fishbone", fishbone_node)
-        graph.add_node("five_whys", five_whys_node)
-        graph.add_node("a3", a3_node)
-        graph.add_node("kaizen", kaizen_node)
-        graph.add_node("charts", charts_node)
-
-        graph.set_entry_point("supervisor")
+    policy = TurnPolicy.from_dict(state.get("turn_policy"))
+    if policy.can_chain(state.get("turn_hops", 0), state.get("turn_llm_calls", 0)):
+        return "supervisor"
+    return "end"
+
+
+def _build_graph(supervisor: Callable[..., Any], coaches: Dict[str, Callable[..., Any]]):
+    graph = StateGraph(GraphState)
+    graph.add_node("supervisor", supervisor)
+    for decision, node in coaches.items():
+        graph.add_node(_node_id(decision), node)
+
+    graph.set_entry_point("supervisor")
+    graph.add_conditional_edges(
+        "supervisor",
+        _route_from_supervisor,
+        {**{decision: _node_id(decision) for decision in coaches}, "idle": END},
+    )
+
+    for decision in coaches:
         graph.add_conditional_edges(
-            "supervisor",
-            _route_from_supervisor,
-            {
-                "problem": "problem",
-                "value_prop": "value_prop",
-                "process_map": "process_map",
-                "sipoc": "sipoc",
-                "fishbone": "fishbone",
-                "five_whys": "five_whys",
-                "a3": "a3",
-                "kaizen": "kaizen",
-                "charts": "charts",
-                "idle": END,
-            },
+            _node_id(decision),
+            _route_after_coach,
+            {"supervisor": "supervisor", "end": END},
         )
 
-        for node in [
-            "problem",
-            "value_prop",
-            "process_map",
-            "sipoc",
-            "fishbone",
-            "five_whys",
-            "a3",
-            "kaizen",
-            "charts",
-        ]:
-            graph.add_edge(node, "supervisor")
-
-        return graph.compile()
+    return graph.compile()
+
+
+@lru_cache(maxsize=None)
+def compiled_graph(asynchronous: bool = False):
+    """Return the compiled turn graph, shared by every session.
+
+    The graph holds no per-session state (there is no checkpointer), so compiling it once
+    keeps session construction cheap when many sessions are created.
+    """
+
+    if asynchronous:
+        return _build_graph(asupervisor_node, ASYNC_COACH_NODES)
+    return _build_graph(supervisor_node, COACH_NODES)
+
+
+def _dataset_name(stem: str) -> str:
+    return re.sub(r"\W+", "_", stem).strip("_").lower() or "dataset"
+
+
+def _elapsed_ms(start: float, end: float) -> float:
+    return round((end - start) * 1000, 1)
+
+
+def _summarise(
+    generation: int, summary: str, pending: List[Message], upto: int
+) -> Tuple[int, str, int]:
+    return generation, summarise_history(summary, pending), upto
+
+
+# Shared by every session; each session has at most one summary in flight.
+_summariser = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CI_COACH_SUMMARY_WORKERS", "2")),
+    thread_name_prefix="ci-coach-summary",
+)
+
+
+class CICoachApp:
+    """High level interface for running the CI Coach conversation.
+
+    ``artifacts_dir`` overrides where this session's charts and diagrams are written, so
+    several sessions can share a process without overwriting each other's files. With a
+    ``checkpointer`` and ``session_id`` the state is checkpointed after every turn.
+    """
+
+    def __init__(
+        self,
+        policy: TurnPolicy | None = None,
+        artifacts_dir: Path | None = None,
+        state: CIState | None = None,
+        session_id: str | None = None,
+        checkpointer: SessionCheckpointer | None = None,
+    ) -> None:
+        self.state = state or CIState()
+        self.policy = policy or TurnPolicy.from_env()
+        self.artifacts_dir = artifacts_dir
+        self.session_id = session_id
+        self.checkpointer = checkpointer if session_id else None
+        self._graph = compiled_graph()
+        self._pending_summary: Future | None = None
+        self._generation = 0
+
+    def warm_up(self, render_pool: bool = False) -> None:
+        """Create the LLM clients for every node and open a pooled connection.
+
+        The render workers otherwise start on the first chart or diagram, so sessions that
+        never plot do not fork them or load matplotlib; pass ``render_pool=True`` to start
+        them now.
+        """
+
+        nodes = [("supervisor", SUPERVISOR_TEMPERATURE)]
+        nodes.extend((decision, COACH_TEMPERATURE) for decision in COACH_NODES)
+        get_registry().warm_up(nodes)
+        if render_pool:
+            get_render_pool().start()
+
+    def metrics(self) -> Dict[str, any]:
+        """Return runtime metrics for the session."""
+
+        return {
+            "llm_clients": get_registry().metrics(),
+            "llm_cache": get_response_cache().stats(),
+            "datasets": get_dataset_store().stats(),
+            "render_pool": get_render_pool().stats(),
+            "render_cache": get_render_cache().stats(),
+            "diagrams": {"rendered": 0, "unchanged": 0, **self.state.diagram_stats},
+        }
+
+    @classmethod
+    def resume(
+        cls, session_id: str, checkpointer: SessionCheckpointer, **kwargs: Any
+    ) -> "CICoachApp":
+        """Load ``session_id`` from its latest checkpoint, or start it fresh if unknown."""
+
+        state = checkpointer.load(session_id)
+        return cls(state=state, session_id=session_id, checkpointer=checkpointer, **kwargs)
 
     def reset(self) -> None:
+        self._generation += 1
+        self._pending_summary = None
         self.state = CIState()
+        self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Persist the current state when the session is backed by a checkpointer."""
+
+        if self.checkpointer is not None:
+            self.checkpointer.save(self.session_id, self.state)
+
+    async def acheckpoint(self) -> None:
+        """Async variant of :meth:`checkpoint`: serialising, hashing and the SQLite write run on a worker thread."""
+
+        if self.checkpointer is not None:
+            await asyncio.to_thread(self.checkpointer.save, self.session_id, self.state)
 
-    def send(self, message: str) -> str:
-        """Process a user message and return the assistant response."""
+    def _schedule_summary(self) -> None:
+        """Fold turns that left the context window into the rolling summary off the turn path."""
+
+        if self._pending_summary is not None:
+            return
+        window = build_context_window(self.state)
+        if not summary_due(self.state, window):
+            return
+        pending = self.state.messages[self.state.summarized_upto : window.aged_out]
+        self._pending_summary = _summariser.submit(
+            _summarise,
+            self._generation,
+            self.state.conversation_summary,
+            pending,
+            window.aged_out,
+        )
+
+    def _apply_pending_summary(self, wait: bool = False) -> None:
+        future = self._pending_summary
+        if future is None or (not wait and not future.done()):
+            return
+        self._pending_summary = None
+        try:
+            generation, summary, upto = future.result()
+        except Exception as exc:
+            self.state.audit_log.append({"node": "summary", "error": str(exc)})
+            return
+        if generation != self._generation:
+            return
+        self.state.conversation_summary = summary
+        self.state.summarized_upto = upto
+        self.state.audit_log.append(
+            {"node": "summary", "summarized_upto": upto, "tokens": count_tokens(summary)}
+        )
 
+    def _begin_turn(self, message: str) -> None:
+        self._apply_pending_summary()
         append_message(self.state, "user", message)
         self.state.latest_user_message = message
+        self.state.pending_response = None
+        self.state.turn_policy = self.policy.to_dict()
+        self.state.turn_hops = 0
+        self.state.turn_llm_calls = 0
+        self.state.turn_prompt_tokens = []
+
+        for name, df in extract_datasets(message):
+            self._register_dataset(name, df)
+
+    def _register_dataset(
+        self, name: str, df: pd.DataFrame, details: Dict[str, Any] | None = None
+    ) -> str:
+        """Store ``df`` and reference it from the state; return the dataset's identifier."""
+
+        handle = get_dataset_store().put(name, df)
+        for identifier, existing in self.state.datasets.items():
+            if existing["hash"] == handle.hash:
+                # The same data shared again: keep referring to the existing dataset.
+                self.state.audit_log.append(
+                    {"node": "dataset_ingest", "dataset": identifier, "duplicate": True}
+                )
+                return identifier
+        identifier = name
+        counter = 1
+        while identifier in self.state.datasets:
+            counter += 1
+            identifier = f"{name}_{counter}"
+        handle.name = identifier
+        self.state.datasets[identifier] = handle.to_dict()
+        self.state.audit_log.append(
+            {
+                "node": "dataset_ingest",
+                "dataset": identifier,
+                "rows": handle.rows,
+                "preview": dataframe_preview(df),
+                **(details or {}),
+            }
+        )
+        return identifier
+
+    def load_dataset(
+        self, source: str | Path | BinaryIO, name: str | None = None, **options: Any
+    ) -> Tuple[str, IngestStats]:
+        """Bulk-load a CSV/TSV/JSON/XLSX file (or binary stream) as a session dataset.
+
+        ``options`` are passed to :func:`ci_coach.datasets.load_dataset` (``fmt``,
+        ``max_rows``, ``aggregate_by``, ...). Returns the dataset identifier and the ingest
+        throughput/memory figures, which are also written to the audit log.
+        """
+
+        df, stats = load_dataset(source, **options)
+        if name is None:
+            name = _dataset_name(Path(source).stem if isinstance(source, (str, Path)) else "stdin")
+        identifier = self._register_dataset(name, df, {"ingest": stats.to_dict()})
+        self.checkpoint()
+        return identifier, stats
+
+    def export_diagram(self, kind: str, fmt: Optional[str] = None) -> Path:
+        """Render the session's ``process_map``, ``fishbone`` or ``vsm`` as ``fmt`` and return the file.
+
+        ``fmt`` defaults to ``CI_COACH_DIAGRAM_FORMAT``; PNG, Mermaid or DOT copies of a
+        diagram are produced on request this way.
+        """
+
+        if kind not in DIAGRAM_KINDS:
+            raise ValueError(f"Unknown diagram {kind!r}; expected one of {', '.join(DIAGRAM_KINDS)}.")
+        artifact = getattr(self.state, kind)
+        if not artifact:
+            raise ValueError(f"No {DIAGRAM_TITLES[kind].lower()} has been drafted yet.")
+        with using_artifacts_dir(self.artifacts_dir):
+            return render_diagram(kind, artifact, fmt)
+
+    def _record_turn(
+        self, result_state: GraphState, turn_start: float, first_token_at: List[float]
+    ) -> str:
+        self.state = CIState.from_graph_state(result_state)
+        self.state.audit_log.append(
+            {
+                "node": "turn",
+                "policy": self.policy.mode,
+                "hops": self.state.turn_hops,
+                "llm_calls": self.state.turn_llm_calls,
+                "prompt_tokens": self.state.turn_prompt_tokens,
+                "ttft_ms": _elapsed_ms(turn_start, first_token_at[0]) if first_token_at else None,
+                "latency_ms": _elapsed_ms(turn_start, time.perf_counter()),
+            }
+        )
+
+        return self.state.pending_response or "Let me know how else I can help."
+
+    def _finish_turn(
+        self, result_state: GraphState, turn_start: float, first_token_at: List[float]
+    ) -> str:
+        response = self._record_turn(result_state, turn_start, first_token_at)
+        self.checkpoint()
+        self._schedule_summary()
+        return response
+
+    @staticmethod
+    def _timed_sink(
+        on_token: Callable[[str], None] | None, first_token_at: List[float]
+    ) -> Callable[[str], None] | None:
+        if on_token is None:
+            return None
+
+        def sink(delta: str) -> None:
+            if not first_token_at:
+                first_token_at.append(time.perf_counter())
+            on_token(delta)
+
+        return sink
+
+    def send(self, message: str, on_token: Callable[[str], None] | None = None) -> str:
+        """Process a user message and return the assistant response.
+
+        When ``on_token`` is given, the coach's reply text is passed to it incrementally as
+        the LLM streams it; the complete response is still returned at the end of the turn.
+        """
+
+        turn_start = time.perf_counter()
+        self._begin_turn(message)
+        first_token_at: List[float] = []
+        sink = self._timed_sink(on_token, first_token_at)
+        with using_artifacts_dir(self.artifacts_dir), streaming(sink):
+            result_state = self._graph.invoke(self.state.to_graph_state())
+        return self._finish_turn(result_state, turn_start, first_token_at)
+
+    async def asend(self, message: str, on_token: Callable[[str], None] | None = None) -> str:
+        """Async variant of :meth:`send` for running many sessions on one event loop.
+
+        LLM calls use ``ainvoke``/``astream``, and pasted-dataset parsing, chart/diagram
+        rendering, the checkpoint write and summaries run on worker threads. What remains on
+        the loop is mostly LangGraph's per-step scheduling, several milliseconds of CPU per
+        turn, which caps one loop at roughly a hundred turns per second; run more processes
+        to go beyond that. Turns of one
+        ``CICoachApp`` must still be awaited one at a time.
+        """
 
-        datasets = extract_datasets(message)
-        for name, df in datasets:
-            identifier = name
-            counter = 1
-            while identifier in self.state.datasets:
-                counter += 1
-                identifier = f"{name}_{counter}"
-            self.state.datasets[identifier] = df
-            preview = dataframe_preview(df)
-            self.state.audit_log.append(
-                {
-                    "node": "dataset_ingest",
-                    "dataset": identifier,
-                    "preview": preview,
-                }
-            )
-
-        result_state = self._graph.invoke(self.state.to_dict())
-        self.state = CIState.from_dict(result_state)
-
-        response = self.state.pending_response or "Let me know how else I can help."
+        turn_start = time.perf_counter()
+        if "```" in message:
+            # Pasted tables are parsed and written to the dataset store on a worker thread.
+            await asyncio.to_thread(self._begin_turn, message)
+        else:
+            self._begin_turn(message)
+        first_token_at: List[float] = []
+        sink = self._timed_sink(on_token, first_token_at)
+        with using_artifacts_dir(self.artifacts_dir), streaming(sink):
+            result_state = await compiled_graph(asynchronous=True).ainvoke(self.state.to_graph_state())
+        response = self._record_turn(result_state, turn_start, first_token_at)
+        await self.acheckpoint()
+        self._schedule_summary()
         return response
 
     def export_state(self) -> Dict[str, any]:
         """Return a dictionary representation of the full state."""
 
+        self._apply_pending_summary(wait=True)
         return self.state.to_dict()
@@ -0,0 +1,75 @@
+"""Location of generated chart and diagram files."""
+
+from __future__ import annotations
+
+import os
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator
+
+_artifacts_override: ContextVar[Path | None] = ContextVar("ci_coach_artifacts_dir", default=None)
+
+
+def default_artifacts_dir() -> Path:
+    """Return the process-wide artifacts directory (``CI_COACH_ARTIFACTS``, default ``artifacts``)."""
+
+    return Path(os.getenv("CI_COACH_ARTIFACTS", "artifacts"))
+
+
+def artifacts_dir() -> Path:
+    """Return the directory renderers should write to, creating it on demand.
+
+    Sessions hosted side by side set their own directory with :func:`using_artifacts_dir`,
+    so concurrent turns never overwrite each other's ``fishbone.png``.
+    """
+
+    path = _artifacts_override.get() or default_artifacts_dir()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def using_artifacts_dir(path: Path | None) -> Iterator[None]:
+    """Direct renders made while the block runs to ``path`` (``None`` keeps the default)."""
+
+    token = _artifacts_override.set(Path(path) if path is not None else None)
+    try:
+        yield
+    finally:
+        _artifacts_override.reset(token)
+
+
+@lru_cache(maxsize=None)
+def pyplot() -> Any:
+    """Return ``matplotlib.pyplot`` with the chart theme applied, importing it on first use.
+
+    pyplot and seaborn take over a second to import, so sessions that never draw do not load
+    them; render workers call this while warming up.
+    """
+
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set_theme(style="whitegrid")
+    return plt
+
+
+def save_figure(fig: Any, path: Path, dpi: int) -> None:
+    """Write ``fig`` to ``path`` atomically, so a concurrent reader never sees a partial PNG."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.stem}.{uuid.uuid4().hex}.tmp{path.suffix}")
+    fig.savefig(tmp, dpi=dpi)
+    os.replace(tmp, path)
+
+
+def write_text(path: Path, text: str) -> None:
+    """Write ``text`` to ``path`` atomically, like :func:`save_figure`."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.stem}.{uuid.uuid4().hex}.tmp{path.suffix}")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
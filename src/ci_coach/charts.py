@@ -5,17 +5,24 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-import seaborn as sns
 
-sns.set_theme(style="whitegrid")
+from .artifacts import artifacts_dir, pyplot, save_figure
+from .dataset_store import DatasetStore, get_dataset_store
+from .downsample import binned_histogram, box_stats, lttb, minmax_indices
+from .spc import SPCResult, control_chart
 
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
 
-ARTIFACTS_DIR = Path(os.getenv("CI_COACH_ARTIFACTS", "artifacts"))
-ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+# Bump when a change to the plotting code changes the output, so cached renders are redone.
+RENDERER_VERSION = 3
+CHART_DPI = 150
+# Above this many rows, series are reduced to about this many points before plotting.
+MAX_POINTS = int(os.getenv("CI_COACH_CHART_MAX_POINTS", "2000"))
 
 
 @dataclass
@@ -26,21 +33,48 @@ class ChartSpec:
     category_column: Optional[str] = None
     secondary_column: Optional[str] = None
     title: str = ""
+    # Control charts only: observations per subgroup for an X-bar chart; unset means I-MR.
+    subgroup_size: Optional[int] = None
 
 
 class ChartRenderer:
-    """Render charts from ``ChartSpec`` instructions."""
+    """Render charts from ``ChartSpec`` instructions.
 
-    def __init__(self, datasets: dict[str, pd.DataFrame]):
+    ``datasets`` maps names to dataset handles (as kept in ``CIState.datasets``) or to
+    in-memory DataFrames. Handles are read from the dataset store, loading only the columns
+    the spec uses. Datasets with more than ``max_points`` rows are reduced before plotting
+    (see :mod:`ci_coach.downsample`), so render time stays roughly flat as they grow.
+    """
+
+    def __init__(
+        self,
+        datasets: Mapping[str, Union[pd.DataFrame, Mapping[str, Any]]],
+        store: DatasetStore | None = None,
+        max_points: int = MAX_POINTS,
+    ):
         self.datasets = datasets
+        self.store = store
+        self.max_points = max_points
+
+    def _frame(self, spec: ChartSpec) -> pd.DataFrame:
+        dataset = self.datasets[spec.dataset_name]
+        if isinstance(dataset, pd.DataFrame):
+            return dataset
+        columns = [
+            column
+            for column in (spec.value_column, spec.category_column, spec.secondary_column)
+            if column
+        ]
+        return (self.store or get_dataset_store()).load(dataset, columns=list(dict.fromkeys(columns)))
 
-    def render(self, spec: ChartSpec) -> Path:
+    def render(self, spec: ChartSpec, path: Path | None = None) -> Path:
         if spec.dataset_name not in self.datasets:
             raise KeyError(f"Dataset {spec.dataset_name!r} not found. Available: {list(self.datasets)}")
 
-        df = self.datasets[spec.dataset_name]
+        df = self._frame(spec)
         chart_type = spec.chart_type.lower()
 
+        plt = pyplot()
         fig, ax = plt.subplots(figsize=(8, 5))
 
         if chart_type == "pareto":
@@ -49,8 +83,10 @@ class ChartRenderer:
             self._histogram(df, spec, ax)
         elif chart_type == "boxplot":
             self._boxplot(df, spec, ax)
-        elif chart_type in {"run", "control"}:
+        elif chart_type == "run":
             self._run_chart(df, spec, ax)
+        elif chart_type == "control":
+            self._control_chart(df, spec, ax)
         elif chart_type == "scatter":
             self._scatter(df, spec, ax)
         elif chart_type == "bar_compare":
@@ -62,8 +98,8 @@ class ChartRenderer:
         ax.grid(True, axis="y", alpha=0.2)
         fig.tight_layout()
 
-        artifact_path = ARTIFACTS_DIR / f"chart_{spec.chart_type}_{spec.dataset_name}.png"
-        fig.savefig(artifact_path, dpi=150)
+        artifact_path = path or artifacts_dir() / f"chart_{spec.chart_type}_{spec.dataset_name}.png"
+        save_figure(fig, artifact_path, CHART_DPI)
         plt.close(fig)
         return artifact_path
 
@@ -84,37 +120,102 @@ class ChartRenderer:
         ax.set_ylabel(spec.value_column)
         ax2.set_ylabel("Cumulative %")
         ax2.set_ylim(0, 1.05)
-        ax.tick_params(axis="x", rotation=45, ha="right")
+        ax.tick_params(axis="x", rotation=45)
+        pyplot().setp(ax.get_xticklabels(), ha="right")
 
     def _histogram(self, df: pd.DataFrame, spec: ChartSpec, ax: plt.Axes) -> None:
-        sns.histplot(df[spec.value_column].dropna(), bins=15, ax=ax, color="#1f77b4")
+        values = df[spec.value_column].dropna()
+        if len(values) > self.max_points:
+            counts, edges = binned_histogram(values.to_numpy())
+            ax.stairs(counts, edges, fill=True, color="#1f77b4", alpha=0.75)
+        else:
+            import seaborn as sns
+
+            sns.histplot(values, bins=15, ax=ax, color="#1f77b4")
         ax.set_xlabel(spec.value_column)
         ax.set_ylabel("Frequency")
 
     def _boxplot(self, df: pd.DataFrame, spec: ChartSpec, ax: plt.Axes) -> None:
-        sns.boxplot(y=df[spec.value_column].dropna(), ax=ax, color="#1f77b4")
+        values = df[spec.value_column].dropna()
+        if len(values) > self.max_points:
+            ax.bxp(
+                [box_stats(values.to_numpy())],
+                patch_artist=True,
+                boxprops={"facecolor": "#1f77b4"},
+                flierprops={"markersize": 3},
+            )
+            ax.set_xticks([])
+        else:
+            import seaborn as sns
+
+            sns.boxplot(y=values, ax=ax, color="#1f77b4")
         ax.set_ylabel(spec.value_column)
 
     def _run_chart(self, df: pd.DataFrame, spec: ChartSpec, ax: plt.Axes) -> None:
         if spec.secondary_column is None:
-            raise ValueError("Run/Control charts require a secondary_column for ordering.")
+            raise ValueError("Run charts require a secondary_column for ordering.")
 
         ordered = df.sort_values(spec.secondary_column)
-        ax.plot(ordered[spec.secondary_column], ordered[spec.value_column], marker="o")
+        # The centre line comes from every row, before any points are dropped.
         mean_val = ordered[spec.value_column].mean()
+        if len(ordered) > self.max_points:
+            ordered = ordered.dropna(subset=[spec.value_column])
+            x = _axis_values(ordered[spec.secondary_column])
+            ordered = ordered.iloc[lttb(x, ordered[spec.value_column].to_numpy(), self.max_points)]
+            marker = None
+        else:
+            marker = "o"
+        ax.plot(ordered[spec.secondary_column], ordered[spec.value_column], marker=marker)
         ax.axhline(mean_val, color="red", linestyle="--", linewidth=1, label="Mean")
-        if spec.chart_type == "control":
-            std = ordered[spec.value_column].std()
-            ax.axhline(mean_val + 3 * std, color="gray", linestyle=":", linewidth=1)
-            ax.axhline(mean_val - 3 * std, color="gray", linestyle=":", linewidth=1)
         ax.set_xlabel(spec.secondary_column)
         ax.set_ylabel(spec.value_column)
         ax.legend()
 
+    def _control_chart(self, df: pd.DataFrame, spec: ChartSpec, ax: plt.Axes) -> None:
+        labels, result = control_limits(df, spec)
+        points = result.points
+        if points.size > self.max_points:
+            # Keep each bucket's extremes so every out-of-limit excursion stays visible.
+            keep = minmax_indices(points, self.max_points)
+            marker = None
+        else:
+            keep = np.arange(points.size)
+            marker = "o"
+        ax.plot(labels[keep], points[keep], marker=marker, markersize=4)
+        signals = np.unique(np.concatenate([v.indices for v in result.violations] or [np.empty(0, int)]))
+        if signals.size:
+            # Mark every signal on small charts, an even sample of them on large ones.
+            picks = np.linspace(0, signals.size - 1, min(signals.size, self.max_points)).astype(int)
+            shown = signals[np.unique(picks)]
+            ax.scatter(
+                labels[shown], points[shown], color="red", s=16, zorder=3, label=f"Rule signals ({signals.size:,})"
+            )
+        limits = result.limits
+        ax.axhline(limits.center, color="red", linestyle="--", linewidth=1, label=f"Centre ({result.chart})")
+        ax.axhline(limits.ucl, color="gray", linestyle=":", linewidth=1, label="UCL / LCL")
+        ax.axhline(limits.lcl, color="gray", linestyle=":", linewidth=1)
+        ax.set_xlabel(spec.secondary_column)
+        subgrouped = result.subgroup_size > 1
+        ax.set_ylabel(f"{spec.value_column} (subgroup mean)" if subgrouped else spec.value_column)
+        ax.legend()
+
     def _scatter(self, df: pd.DataFrame, spec: ChartSpec, ax: plt.Axes) -> None:
         if spec.secondary_column is None:
             raise ValueError("Scatter charts require a secondary_column.")
-        ax.scatter(df[spec.secondary_column], df[spec.value_column], alpha=0.7)
+        if len(df) > self.max_points:
+            # Too many points to see individually: show their density instead.
+            points = df[[spec.secondary_column, spec.value_column]].dropna()
+            hexes = ax.hexbin(
+                points[spec.secondary_column],
+                points[spec.value_column],
+                gridsize=60,
+                mincnt=1,
+                cmap="Blues",
+                bins="log",
+            )
+            ax.figure.colorbar(hexes, ax=ax, label="Rows (log)")
+        else:
+            ax.scatter(df[spec.secondary_column], df[spec.value_column], alpha=0.7)
         ax.set_xlabel(spec.secondary_column)
         ax.set_ylabel(spec.value_column)
 
@@ -129,4 +230,50 @@ class ChartRenderer:
         )
         pivot.plot(kind="bar", ax=ax)
         ax.set_ylabel(spec.value_column)
-        ax.tick_params(axis="x", rotation=45, ha="right")
+        ax.tick_params(axis="x", rotation=45)
+        pyplot().setp(ax.get_xticklabels(), ha="right")
+
+
+def _axis_values(series: pd.Series) -> np.ndarray:
+    # LTTB needs a numeric x axis; text labels fall back to their position.
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype("int64").to_numpy(dtype=float)
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=float)
+    return np.arange(len(series), dtype=float)
+
+
+def control_limits(df: pd.DataFrame, spec: ChartSpec) -> Tuple[pd.Index, SPCResult]:
+    """Return the labels of the charted points and the SPC result for a control chart spec.
+
+    Rows are ordered by ``secondary_column``; with ``subgroup_size`` set, consecutive rows form
+    the subgroups and each is labelled by its first row.
+    """
+
+    if spec.secondary_column is None:
+        raise ValueError("Control charts require a secondary_column for ordering.")
+    columns = list(dict.fromkeys([spec.secondary_column, spec.value_column]))
+    ordered = df[columns].sort_values(spec.secondary_column, kind="stable")
+    values = pd.to_numeric(ordered[spec.value_column], errors="coerce").to_numpy(dtype=float)
+    finite = np.isfinite(values)
+    labels = pd.Index(ordered[spec.secondary_column])[finite]
+    result = control_chart(values[finite], spec.subgroup_size)
+    if result.subgroup_size > 1:
+        labels = labels[:: result.subgroup_size][: result.points.size]
+    return labels, result
+
+
+def render_chart(
+    datasets: Mapping[str, Union[pd.DataFrame, Mapping[str, Any]]],
+    spec: ChartSpec,
+    store_root: Path | str | None = None,
+    path: Path | None = None,
+) -> Path:
+    """Render ``spec``; a module-level entry point for the render worker processes.
+
+    ``store_root`` names the dataset store directory, since a worker process does not share
+    the caller's store object.
+    """
+
+    store = DatasetStore(store_root) if store_root is not None else None
+    return ChartRenderer(datasets, store=store).render(spec, path)
@@ -4,10 +4,19 @@ from __future__ import annotations
 
 import argparse
 import json
+import shlex
 import sys
+import threading
+from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from .app import CICoachApp
+from .llm_cache import CacheMissError, LLMResponseCache, set_response_cache
+from .persistence import SessionCheckpointer
+from .policy import TurnPolicy
+
+if TYPE_CHECKING:
+    from .app import CICoachApp
 
 
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
@@ -17,19 +26,200 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         type=Path,
         help="Optional path to save the final conversation transcript as JSON.",
     )
+    parser.add_argument(
+        "--chain",
+        action="store_true",
+        help="Allow the Supervisor to chain several coaches within a single turn.",
+    )
+    parser.add_argument(
+        "--max-hops",
+        type=int,
+        default=3,
+        help="Maximum coaches per turn when --chain is set (default: 3).",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        type=Path,
+        help="SQLite file for cached LLM responses (default: artifacts/llm_cache.sqlite).",
+    )
+    parser.add_argument(
+        "--session",
+        help="Resume (or start) a durable session with this id; every turn is checkpointed.",
+    )
+    parser.add_argument(
+        "--sessions-db",
+        type=Path,
+        help="SQLite file holding session checkpoints (default: artifacts/sessions.sqlite).",
+    )
+    parser.add_argument(
+        "--list-sessions",
+        action="store_true",
+        help="List stored sessions and exit.",
+    )
+    parser.add_argument(
+        "--load",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="Load a CSV/TSV/JSON/XLSX file as a dataset before the first turn; '-' reads "
+        "piped stdin. May be repeated.",
+    )
+    _add_load_options(parser)
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument(
+        "--replay",
+        action="store_true",
+        help="Serve every LLM call from the response cache and fail on a miss (offline mode).",
+    )
+    cache_mode.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Disable the LLM response cache.",
+    )
     return parser.parse_args(argv)
 
 
+def _add_load_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--format",
+        dest="fmt",
+        choices=["csv", "tsv", "json", "jsonl", "xlsx"],
+        help="Dataset format when it cannot be inferred from the file name (stdin defaults to csv).",
+    )
+    parser.add_argument(
+        "--max-rows",
+        type=int,
+        help="Keep a uniform random sample of this many rows from larger files "
+        "(default: CI_COACH_INGEST_MAX_ROWS or 1,000,000).",
+    )
+    parser.add_argument(
+        "--aggregate-by",
+        metavar="COLUMNS",
+        help="Comma-separated columns to pre-aggregate large files by instead of keeping rows.",
+    )
+
+
+LOAD_USAGE = "Usage: :load <path> [--name NAME] [--format FMT] [--max-rows N] [--aggregate-by COLUMNS]"
+EXPORT_USAGE = "Usage: :export <process_map|fishbone|vsm> [svg|mermaid|dot|png]"
+
+
+def _load_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog=":load", add_help=False, exit_on_error=False)
+    parser.add_argument("path")
+    parser.add_argument("--name")
+    _add_load_options(parser)
+    return parser
+
+
+def _load(app: CICoachApp, path: str, args: argparse.Namespace, name: str | None = None) -> None:
+    options = {"fmt": args.fmt, "max_rows": args.max_rows}
+    if args.aggregate_by:
+        options["aggregate_by"] = [column.strip() for column in args.aggregate_by.split(",")]
+    source = sys.stdin.buffer if path == "-" else path
+    try:
+        identifier, stats = app.load_dataset(source, name=name, **options)
+    except (OSError, ValueError, KeyError, ImportError) as exc:
+        print(f"Coach: Could not load {path}: {exc}\n")
+        return
+    print(f"Coach: Loaded {identifier}: {stats.describe()}.\n")
+
+
+def _read_message() -> str:
+    """Read one message, continuing across lines while a ``` fence is open."""
+
+    lines = [input("You: ")]
+    while sum(line.count("```") for line in lines) % 2 == 1:
+        lines.append(input("... "))
+    return "\n".join(lines).strip()
+
+
+def _configure_cache(args: argparse.Namespace) -> LLMResponseCache:
+    cache = LLMResponseCache.from_env()
+    if args.llm_cache:
+        cache.path = args.llm_cache
+    if args.replay:
+        cache.mode = "replay"
+    elif args.no_llm_cache:
+        cache.mode = "off"
+    set_response_cache(cache)
+    return cache
+
+
+def _checkpointer(args: argparse.Namespace) -> SessionCheckpointer:
+    checkpointer = SessionCheckpointer.from_env()
+    if args.sessions_db:
+        checkpointer.path = args.sessions_db
+    return checkpointer
+
+
+def _warm_up(app: CICoachApp) -> None:
+    try:
+        app.warm_up()
+    except EnvironmentError:
+        # Missing credentials are reported on the first turn instead.
+        pass
+
+
+def _print_delta(streamed: list[str], delta: str) -> None:
+    if not streamed:
+        print("Coach: ", end="", flush=True)
+    streamed.append(delta)
+    print(delta, end="", flush=True)
+
+
+def _finish_response(streamed: list[str], response: str) -> None:
+    """Print whatever part of the final response was not already streamed."""
+
+    shown = "".join(streamed)
+    if not shown:
+        print(f"Coach: {response}\n")
+    elif response.startswith(shown):
+        print(f"{response[len(shown):]}\n")
+    else:
+        print(f"\nCoach: {response}\n")
+
+
 def main(argv: list[str] | None = None) -> None:
     args = parse_args(argv)
-    app = CICoachApp()
+    policy = TurnPolicy.chained(args.max_hops) if args.chain else TurnPolicy.from_env()
+    if args.list_sessions:
+        for session in _checkpointer(args).sessions():
+            updated = datetime.fromtimestamp(session["updated_at"]).strftime("%Y-%m-%d %H:%M")
+            print(f"{session['session_id']}\tcheckpoint {session['seq']}\tupdated {updated}")
+        return
+
+    # Imported here so --help and --list-sessions do not load the graph and its dependencies.
+    from .app import CICoachApp
 
-    print("Unified CI Coach ready. Paste CSV data inside triple backticks to load datasets.")
-    print("Type :reset to start over, :state to export current state, or :quit to exit.\n")
+    cache = _configure_cache(args)
+    if args.session:
+        app = CICoachApp.resume(args.session, _checkpointer(args), policy=policy)
+    else:
+        app = CICoachApp(policy=policy)
+    if cache.mode != "replay":
+        threading.Thread(target=_warm_up, args=(app,), daemon=True).start()
+
+    print(
+        "Unified CI Coach ready. Paste CSV data inside triple backticks or use :load <path> "
+        "to load datasets."
+    )
+    if args.session:
+        turns = sum(1 for message in app.state.messages if message.role == "user")
+        if turns:
+            print(f"Resumed session {args.session} after {turns} turn{'s' if turns != 1 else ''}.")
+        else:
+            print(f"Started session {args.session}.")
+    print(
+        "Type :load <path> to load a CSV/TSV/JSON/XLSX file, :reset to start over, :state to "
+        "export current state, :export <process_map|fishbone|vsm> [format] to save a diagram, "
+        ":metrics for runtime metrics, or :quit to exit.\n"
+    )
+    for path in args.load:
+        _load(app, path, args)
 
     try:
         while True:
-            user_input = input("You: ").strip()
+            user_input = _read_message()
             if not user_input:
                 continue
             if user_input.lower() in {":quit", ":exit"}:
@@ -38,19 +228,54 @@ def main(argv: list[str] | None = None) -> None:
                 app.reset()
                 print("Coach: Session reset. How can I help next?")
                 continue
+            if user_input.lower() == ":metrics":
+                print(json.dumps(app.metrics(), indent=2))
+                continue
+            if user_input.lower().startswith(":load"):
+                try:
+                    load_args = _load_parser().parse_args(shlex.split(user_input)[1:])
+                except (argparse.ArgumentError, ValueError):
+                    print(f"Coach: {LOAD_USAGE}\n")
+                    continue
+                except SystemExit:
+                    # argparse has already printed the usage error.
+                    continue
+                _load(app, load_args.path, load_args, load_args.name)
+                continue
+            if user_input.lower().startswith(":export"):
+                export_args = user_input.split()[1:]
+                if not 1 <= len(export_args) <= 2:
+                    print(f"Coach: {EXPORT_USAGE}\n")
+                    continue
+                try:
+                    path = app.export_diagram(*export_args)
+                except ValueError as exc:
+                    print(f"Coach: {exc}\n")
+                    continue
+                print(f"Coach: Exported the {export_args[0].replace('_', ' ')} to {path}\n")
+                continue
             if user_input.lower() == ":state":
                 state = app.export_state()
                 print(json.dumps(state, indent=2, default=str))
                 continue
 
-            response = app.send(user_input)
-            print(f"Coach: {response}\n")
+            streamed: list[str] = []
+            try:
+                response = app.send(user_input, on_token=lambda delta: _print_delta(streamed, delta))
+            except CacheMissError as exc:
+                print(f"{chr(10) if streamed else ''}Coach: {exc}\n")
+                continue
+            _finish_response(streamed, response)
     except (KeyboardInterrupt, EOFError):
         print("\nSession ended.")
 
     if args.transcript:
         args.transcript.write_text(json.dumps(app.export_state(), indent=2, default=str))
         print(f"Transcript saved to {args.transcript}")
+    if args.session:
+        # Fold in any background summary still running before the final checkpoint.
+        app.export_state()
+        app.checkpoint()
 
 
 if __name__ == "__main__":  # pragma: no cover - CLI entry point
@@ -2,243 +2,806 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict
-
-from langchain.schema import SystemMessage
-
-from .charts import ChartRenderer, ChartSpec
-from .conversation import build_state_summary, to_langchain_messages
-from .diagrams import render_fishbone, render_process_map
-from .json_utils import extract_json
-from .llm import get_llm
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema import BaseMessage, SystemMessage
+
+from .artifacts import artifacts_dir
+from .charts import (
+    CHART_DPI,
+    MAX_POINTS as CHART_MAX_POINTS,
+    RENDERER_VERSION as CHART_RENDERER_VERSION,
+    ChartSpec,
+    control_limits,
+    render_chart,
+)
+from .conversation import (
+    ARTIFACT_LABELS,
+    build_context_window,
+    build_state_summary,
+    bump_version,
+    count_message_tokens,
+    format_transcript,
+)
+from .dataset_store import DatasetHandle, get_dataset_store
+from .diagram_diff import diff_fishbone, diff_process_map, diff_vsm
+from .diagrams import (
+    DIAGRAM_DPI,
+    RENDERER_VERSION as DIAGRAM_RENDERER_VERSION,
+    get_diagram_renderer,
+)
+from .json_utils import MessageFieldStreamer, extract_json
+from .llm import get_llm, get_registry
+from .llm_cache import get_response_cache
+from .policy import TurnPolicy
+from .process_mining import ProcessDiscovery, discover_process_map, event_log_columns, is_event_log
+from .profiles import describe_profile, resolve_chart_spec
 from .prompts import (
     A3_PROMPT,
     CHART_PROMPT,
     FISHBONE_PROMPT,
     FIVE_WHYS_PROMPT,
     KAIZEN_PROMPT,
+    PROCESS_DISCOVERY_PROMPT,
     PROCESS_MAP_PROMPT,
     PROBLEM_PROMPT,
     SIPOC_PROMPT,
+    SUMMARY_PROMPT,
     SUPERVISOR_PROMPT,
     VALUE_PROP_PROMPT,
 )
-from .state import CIState, append_message
-
-
-def _prepare_conversation(ci_state: CIState) -> Dict[str, Any]:
-    conversation = to_langchain_messages(ci_state)
-    summary = build_state_summary(ci_state)
+from .render_cache import get_render_cache
+from .render_pool import get_render_pool
+from .router import NODE_GUIDANCE, get_router
+from .state import CIState, GraphState, Message, message_update
+from .vsm import DEFAULT_AVAILABLE_MIN, compute_vsm, is_stage_table, stage_columns
+
+SUPERVISOR_TEMPERATURE = 0.0
+COACH_TEMPERATURE = 0.1
+
+# Artifacts each node sees in full; everything else is summarised compactly. The A3 coach
+# composes from every artifact, so it gets all of them except the VSM, whose stage table can
+# run to thousands of rows; its compact summary carries the headline metrics.
+NODE_FOCUS = {
+    "problem": ("problem_statement",),
+    "value_prop": ("value_proposition",),
+    "sipoc": ("sipoc",),
+    "process_map": ("process_map",),
+    "fishbone": ("fishbone",),
+    "five_whys": ("five_whys", "fishbone"),
+    "a3": tuple(name for name in ARTIFACT_LABELS if name != "vsm"),
+    "kaizen": ("kaizen_plan",),
+    "charts": ("spc",),
+}
+
+
+def _dataset_profiles(ci_state: CIState) -> Dict[str, Dict[str, Any]]:
+    store = get_dataset_store()
+    return {name: store.profile(handle) for name, handle in ci_state.datasets.items()}
+
+
+def _prepare_conversation(ci_state: CIState, node: str) -> Dict[str, Any]:
+    window = build_context_window(ci_state)
+    summary = build_state_summary(ci_state, NODE_FOCUS.get(node, ()))
     conversation_with_summary = [SystemMessage(content=f"Context summary:\n{summary}")]
-    conversation_with_summary.extend(conversation)
-    return {
+    conversation_with_summary.extend(window.messages)
+    inputs = {
         "conversation": conversation_with_summary,
         "latest_message": ci_state.latest_user_message or "",
     }
+    if node == "charts":
+        profiles = _dataset_profiles(ci_state)
+        inputs["dataset_profiles"] = "\n".join(
+            describe_profile(name, profile) for name, profile in profiles.items()
+        )
+    return inputs
 
 
-def supervisor_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    if not ci_state.latest_user_message:
-        return ci_state.to_dict()
-
-    llm = get_llm(temperature=0.0)
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = SUPERVISOR_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
-
-    ci_state.intent = data.get("updated_intent", ci_state.intent)
-    ci_state.mode = data.get("mode", ci_state.mode)
-    ci_state.router_decision = data.get("next_node", "problem")
-    ci_state.suggested_next_steps = data.get("suggested_next", [])
-    ci_state.audit_log.append(
+_token_sink: ContextVar[Callable[[str], None] | None] = ContextVar("ci_coach_token_sink", default=None)
+
+
+@contextmanager
+def streaming(sink: Callable[[str], None] | None) -> Iterator[None]:
+    """Stream the ``message`` text of coach replies to ``sink`` while the block runs."""
+
+    token = _token_sink.set(sink)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+def _stream_completion(
+    messages: List[BaseMessage], node: str, temperature: float, sink: Callable[[str], None]
+) -> str:
+    extractor = MessageFieldStreamer()
+    parts: List[str] = []
+    for chunk in get_llm(temperature=temperature, node=node).stream(messages):
+        parts.append(chunk.content)
+        if delta := extractor.feed(chunk.content):
+            sink(delta)
+    return "".join(parts)
+
+
+def _complete(
+    messages: List[BaseMessage], node: str, temperature: float, stream: bool = False
+) -> str:
+    sink = _token_sink.get() if stream else None
+
+    def call() -> str:
+        if sink is not None:
+            return _stream_completion(messages, node, temperature, sink)
+        return get_llm(temperature=temperature, node=node).invoke(messages).content
+
+    return get_response_cache().complete(messages, get_registry().model_for(node), temperature, call)
+
+
+async def _astream_completion(
+    messages: List[BaseMessage], node: str, temperature: float, sink: Callable[[str], None]
+) -> str:
+    extractor = MessageFieldStreamer()
+    parts: List[str] = []
+    async for chunk in get_llm(temperature=temperature, node=node).astream(messages):
+        parts.append(chunk.content)
+        if delta := extractor.feed(chunk.content):
+            sink(delta)
+    return "".join(parts)
+
+
+async def _acomplete(
+    messages: List[BaseMessage], node: str, temperature: float, stream: bool = False
+) -> str:
+    sink = _token_sink.get() if stream else None
+
+    async def call() -> str:
+        if sink is not None:
+            return await _astream_completion(messages, node, temperature, sink)
+        return (await get_llm(temperature=temperature, node=node).ainvoke(messages)).content
+
+    return await get_response_cache().acomplete(
+        messages, get_registry().model_for(node), temperature, call
+    )
+
+
+def _invoke_llm(
+    ci_state: CIState,
+    prompt: ChatPromptTemplate,
+    node: str,
+    temperature: float = COACH_TEMPERATURE,
+    stream: bool = True,
+    inputs: Dict[str, str] | None = None,
+) -> Dict[str, Any]:
+    """Run ``prompt`` against the conversation and return the parsed JSON reply.
+
+    When a ``streaming`` sink is active the reply's ``message`` text is forwarded as it
+    arrives; the structured fields are still parsed from the complete response. ``inputs``
+    fills any prompt variables beyond the conversation.
+    """
+
+    prompt_inputs = {**_prepare_conversation(ci_state, node), **(inputs or {})}
+    messages = prompt.format_messages(**prompt_inputs)
+    content = _complete(messages, node, temperature, stream)
+    ci_state.turn_llm_calls += 1
+    ci_state.turn_prompt_tokens = [*ci_state.turn_prompt_tokens, count_message_tokens(messages)]
+    return extract_json(content)
+
+
+async def _ainvoke_llm(
+    ci_state: CIState,
+    prompt: ChatPromptTemplate,
+    node: str,
+    temperature: float = COACH_TEMPERATURE,
+    stream: bool = True,
+    inputs: Dict[str, str] | None = None,
+) -> Dict[str, Any]:
+    """Async variant of :func:`_invoke_llm` using ``ainvoke``/``astream``."""
+
+    prompt_inputs = {**_prepare_conversation(ci_state, node), **(inputs or {})}
+    messages = prompt.format_messages(**prompt_inputs)
+    content = await _acomplete(messages, node, temperature, stream)
+    ci_state.turn_llm_calls += 1
+    ci_state.turn_prompt_tokens = [*ci_state.turn_prompt_tokens, count_message_tokens(messages)]
+    return extract_json(content)
+
+
+def _coach_update(
+    ci_state: CIState,
+    message: str,
+    audit: List[Dict[str, Any]] | None = None,
+    **changes: Any,
+) -> GraphState:
+    """Return a coach's graph update: changed fields, the reply and the hop accounting."""
+
+    update: GraphState = message_update("assistant", message)
+    if audit:
+        update["audit_log"] = [*audit, *update["audit_log"]]
+    update.update(changes)
+    versions = {
+        name: bump_version(ci_state.artifact_versions.get(name), value)
+        for name, value in changes.items()
+        if name in ARTIFACT_LABELS
+    }
+    if versions:
+        update["artifact_versions"] = versions
+    update["pending_response"] = message
+    update["turn_hops"] = ci_state.turn_hops + 1
+    update["turn_llm_calls"] = ci_state.turn_llm_calls
+    update["turn_prompt_tokens"] = ci_state.turn_prompt_tokens
+    return update
+
+
+def summarise_history(summary: str, messages: List[Message]) -> str:
+    """Fold ``messages`` into the rolling conversation ``summary`` with one LLM call."""
+
+    prompt = SUMMARY_PROMPT.format_messages(
+        summary=summary or "(none yet)",
+        transcript=format_transcript(messages),
+    )
+    return _complete(prompt, "summary", SUPERVISOR_TEMPERATURE).strip()
+
+
+def _fast_route(ci_state: CIState) -> GraphState | None:
+    router = get_router()
+    # Only the first pass of a turn is routed locally; chained passes need the LLM to
+    # decide whether another coach should run.
+    if router is None or ci_state.turn_hops:
+        return None
+    fast = router.route(ci_state.latest_user_message)
+    if fast is None:
+        return None
+    intent, suggested = NODE_GUIDANCE[fast.node]
+    return {
+        "router_decision": fast.node,
+        "intent": intent,
+        # Keyword and table rules fire on explicit requests, so the user wants that tool now.
+        "mode": "quick" if fast.path == "rules" else ci_state.mode,
+        "suggested_next_steps": list(suggested),
+        "audit_log": [
+            {
+                "node": "supervisor",
+                "decision": fast.node,
+                "intent": intent,
+                "route_path": fast.path,
+                "confidence": round(fast.confidence, 3),
+                "latency_ms": round(fast.latency_ms, 3),
+                "user_message": ci_state.latest_user_message,
+            }
+        ],
+    }
+
+
+def _budget_exhausted(ci_state: CIState) -> GraphState | None:
+    policy = TurnPolicy.from_dict(ci_state.turn_policy)
+    if policy.can_call_llm(ci_state.turn_llm_calls):
+        return None
+    return {
+        "router_decision": "idle",
+        "audit_log": [
+            {"node": "supervisor", "decision": "idle", "reason": "llm_call_budget_exhausted"}
+        ],
+    }
+
+
+def _supervisor_update(ci_state: CIState, data: Dict[str, Any], start: float) -> GraphState:
+    update: GraphState = {
+        "intent": data.get("updated_intent", ci_state.intent),
+        "mode": data.get("mode", ci_state.mode),
+        "router_decision": data.get("next_node", "problem"),
+        "suggested_next_steps": data.get("suggested_next", []),
+        "turn_llm_calls": ci_state.turn_llm_calls,
+        "turn_prompt_tokens": ci_state.turn_prompt_tokens,
+    }
+    update["audit_log"] = [
         {
             "node": "supervisor",
-            "decision": ci_state.router_decision,
-            "intent": ci_state.intent,
+            "decision": update["router_decision"],
+            "intent": update["intent"],
             "assistant_message": data.get("assistant_message"),
+            "route_path": "llm",
+            "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+            "user_message": ci_state.latest_user_message,
         }
+    ]
+    if update["router_decision"] == "idle" and not ci_state.turn_hops:
+        update["pending_response"] = data.get("assistant_message")
+    return update
+
+
+def supervisor_node(state: GraphState) -> GraphState:
+    ci_state = CIState.from_graph_state(state)
+    if not ci_state.latest_user_message:
+        return {}
+    update = _fast_route(ci_state) or _budget_exhausted(ci_state)
+    if update is not None:
+        return update
+
+    start = time.perf_counter()
+    data = _invoke_llm(
+        ci_state, SUPERVISOR_PROMPT, "supervisor", SUPERVISOR_TEMPERATURE, stream=False
+    )
+    return _supervisor_update(ci_state, data, start)
+
+
+async def asupervisor_node(state: GraphState) -> GraphState:
+    ci_state = CIState.from_graph_state(state)
+    if not ci_state.latest_user_message:
+        return {}
+    if "```" in ci_state.latest_user_message:
+        # Routing a pasted table samples its rows; keep that off the event loop.
+        update = await asyncio.to_thread(_fast_route, ci_state)
+    else:
+        update = _fast_route(ci_state)
+    update = update or _budget_exhausted(ci_state)
+    if update is not None:
+        return update
+
+    start = time.perf_counter()
+    data = await _ainvoke_llm(
+        ci_state, SUPERVISOR_PROMPT, "supervisor", SUPERVISOR_TEMPERATURE, stream=False
+    )
+    return _supervisor_update(ci_state, data, start)
+
+
+CoachUpdate = Callable[[CIState, Dict[str, Any]], GraphState]
+
+# Renders run in the render pool's worker processes; async turns only need a thread to
+# wait on the result without blocking the event loop.
+_render_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ci-coach-render-wait")
+
+
+async def _run_blocking(function: Callable[..., Any], *args: Any) -> Any:
+    # run_in_executor does not carry context variables over; the session's artifacts
+    # directory is one of them.
+    context = copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_render_executor, context.run, function, *args)
+
+
+async def _run_render(build_update: CoachUpdate, ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    return await _run_blocking(build_update, ci_state, data)
+
+
+def _cached_render(
+    kind: str,
+    key: Dict[str, Any],
+    label: str,
+    render: Callable[..., Any],
+    *args: Any,
+    suffix: str = ".png",
+    pooled: bool = True,
+) -> Path:
+    """Return the render for ``key`` in the session's artifacts directory, rendering it on a miss.
+
+    Hits are linked out of the shared render cache and fresh renders are linked into it, so
+    the returned path belongs to the session and survives cache eviction. Matplotlib renders
+    run in the render pool; text formats are cheap and pure Python, so ``pooled=False``
+    renders them in the calling thread.
+    """
+
+    cache = get_render_cache()
+    cached = cache.path_for(kind, key, label, suffix)
+    path = artifacts_dir() / cached.name
+    if path.exists() or (cache.get(cached) and cache.fetch(cached, path)):
+        return path
+    if pooled:
+        get_render_pool().render(render, *args, path=path)
+    else:
+        render(*args, path=path)
+    cache.add(cached, source=path)
+    return path
+
+
+def render_diagram(kind: str, artifact: Dict[str, Any], fmt: str | None = None) -> Path:
+    """Return the path of the ``kind`` diagram of ``artifact`` in ``fmt``, rendering it if needed.
+
+    ``fmt`` defaults to ``CI_COACH_DIAGRAM_FORMAT`` (``svg``); see ``diagrams.DIAGRAM_RENDERERS``.
+    """
+
+    renderer = get_diagram_renderer(fmt)
+    key: Dict[str, Any] = {"version": DIAGRAM_RENDERER_VERSION, "format": renderer.format, "artifact": artifact}
+    if not renderer.text:
+        key["dpi"] = DIAGRAM_DPI
+    return _cached_render(
+        kind, key, "", renderer.render, kind, artifact, suffix=renderer.suffix, pooled=not renderer.text
+    )
+
+
+def _coach_nodes(
+    prompt: ChatPromptTemplate, node: str, build_update: CoachUpdate, renders: bool = False
+) -> Tuple[Callable[[GraphState], GraphState], Callable[[GraphState], Awaitable[GraphState]]]:
+    """Return the sync and async graph nodes for a coach.
+
+    ``build_update`` turns the parsed LLM reply into the coach's graph update. Coaches that
+    render diagrams set ``renders`` so the async node runs that step off the event loop.
+    """
+
+    def sync_node(state: GraphState) -> GraphState:
+        ci_state = CIState.from_graph_state(state)
+        return build_update(ci_state, _invoke_llm(ci_state, prompt, node))
+
+    async def async_node(state: GraphState) -> GraphState:
+        ci_state = CIState.from_graph_state(state)
+        data = await _ainvoke_llm(ci_state, prompt, node)
+        if not renders:
+            return build_update(ci_state, data)
+        return await _run_render(build_update, ci_state, data)
+
+    sync_node.__name__ = sync_node.__qualname__ = f"{node}_node"
+    async_node.__name__ = async_node.__qualname__ = f"a{node}_node"
+    return sync_node, async_node
+
+
+def _problem_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    return _coach_update(
+        ci_state,
+        data.get("message", "Here is the refreshed problem statement."),
+        problem_statement=data.get("problem_statement", ci_state.problem_statement),
+        problem_metrics=data.get("metrics", ci_state.problem_metrics),
+        problem_scope=data.get("scope", ci_state.problem_scope),
+        ci_opportunities=data.get("ci_opportunities", ci_state.ci_opportunities),
+    )
+
+
+def _value_prop_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    return _coach_update(
+        ci_state,
+        data.get("message", "Value proposition updated."),
+        value_proposition={
+            "stakeholders": data.get("stakeholders", []),
+            "impact": data.get("impact", {}),
+            "requirements": data.get("requirements", {}),
+        },
+    )
+
+
+def _sipoc_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    return _coach_update(
+        ci_state,
+        data.get("message", "SIPOC drafted."),
+        sipoc={
+            "suppliers": data.get("suppliers", []),
+            "inputs": data.get("inputs", []),
+            "process_steps": data.get("process_steps", []),
+            "outputs": data.get("outputs", []),
+            "customers": data.get("customers", []),
+        },
     )
-    return ci_state.to_dict()
-
-
-def problem_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    llm = get_llm()
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = PROBLEM_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
-
-    ci_state.problem_statement = data.get("problem_statement", ci_state.problem_statement)
-    ci_state.problem_metrics = data.get("metrics", ci_state.problem_metrics)
-    ci_state.problem_scope = data.get("scope", ci_state.problem_scope)
-    ci_state.ci_opportunities = data.get("ci_opportunities", ci_state.ci_opportunities)
-    message = data.get("message", "Here is the refreshed problem statement.")
-    append_message(ci_state, "assistant", message)
-    ci_state.pending_response = message
-    return ci_state.to_dict()
-
-
-def value_prop_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    llm = get_llm()
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = VALUE_PROP_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
-
-    ci_state.value_proposition = {
-        "stakeholders": data.get("stakeholders", []),
-        "impact": data.get("impact", {}),
-        "requirements": data.get("requirements", {}),
-    }
-    message = data.get("message", "Value proposition updated.")
-    append_message(ci_state, "assistant", message)
-    ci_state.pending_response = message
-    return ci_state.to_dict()
-
-
-def sipoc_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    llm = get_llm()
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = SIPOC_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
-
-    ci_state.sipoc = {
-        "suppliers": data.get("suppliers", []),
-        "inputs": data.get("inputs", []),
-        "process_steps": data.get("process_steps", []),
-        "outputs": data.get("outputs", []),
-        "customers": data.get("customers", []),
-    }
-    message = data.get("message", "SIPOC drafted.")
-    append_message(ci_state, "assistant", message)
-    ci_state.pending_response = message
-    return ci_state.to_dict()
 
 
-def process_map_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    llm = get_llm()
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = PROCESS_MAP_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
+DIAGRAM_DIFFS = {"process_map": diff_process_map, "fishbone": diff_fishbone, "vsm": diff_vsm}
+DIAGRAM_TITLES = {"process_map": "Process map", "fishbone": "Fishbone", "vsm": "Value stream map"}
 
-    ci_state.process_map = {
+
+def _latest_diagram(ci_state: CIState, kind: str) -> Path | None:
+    """The session's most recent ``kind`` diagram, if its file still exists."""
+
+    for diagram in reversed(ci_state.diagrams):
+        path = Path(diagram)
+        if path.name.startswith(f"{kind}_") and path.exists():
+            return path
+    return None
+
+
+def _diagram_update(ci_state: CIState, kind: str, artifact: Dict[str, Any], message: str) -> GraphState:
+    """Store a redrafted diagram artifact, rendering it only when it differs from the last draft.
+
+    The diff against the previous draft is added to the reply and the audit log, and
+    ``diagram_stats`` counts renders and skipped no-op redrafts for the session.
+    """
+
+    title = DIAGRAM_TITLES[kind]
+    diff = DIAGRAM_DIFFS[kind](getattr(ci_state, kind), artifact)
+    changes: GraphState = {kind: artifact}
+    audit: List[Dict[str, Any]] = []
+    if diff.baseline:
+        audit.append({"node": kind, "diff": diff.to_dict()})
+        message += f"\n{title} {'unchanged' if diff.unchanged else 'updated: ' + diff.describe()}."
+
+    previous = _latest_diagram(ci_state, kind) if diff.unchanged else None
+    if previous is not None:
+        changes["diagram_stats"] = {"unchanged": ci_state.diagram_stats.get("unchanged", 0) + 1}
+        message += f"\n{title} diagram is still current at {previous}."
+        return _coach_update(ci_state, message, audit, **changes)
+    try:
+        diagram_path = render_diagram(kind, artifact)
+        changes["diagrams"] = [str(diagram_path)]
+        changes["diagram_stats"] = {"rendered": ci_state.diagram_stats.get("rendered", 0) + 1}
+        message += f"\n{title} diagram exported to {diagram_path}."
+    except Exception as exc:  # pragma: no cover - rendering errors logged in audit
+        audit.append({"node": kind, "error": str(exc)})
+    return _coach_update(ci_state, message, audit, **changes)
+
+
+def _process_map_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    process_map = {
         "roles": data.get("roles", []),
         "steps": data.get("steps", []),
         "edges": data.get("edges", []),
         "systems": data.get("systems", []),
     }
-    message = data.get("message", "Process map drafted.")
-    try:
-        diagram_path = render_process_map(ci_state.process_map)
-        ci_state.diagrams.append(str(diagram_path))
-        message += f"\nProcess map diagram exported to {diagram_path}."
-    except Exception as exc:  # pragma: no cover - rendering errors logged in audit
-        ci_state.audit_log.append({"node": "process_map", "error": str(exc)})
-    append_message(ci_state, "assistant", message)
-    ci_state.pending_response = message
-    return ci_state.to_dict()
-
+    return _diagram_update(ci_state, "process_map", process_map, data.get("message", "Process map drafted."))
+
+
+DISCOVERY_CACHE_SIZE = 8
+
+_discoveries: "OrderedDict[Tuple[str, str | None], ProcessDiscovery]" = OrderedDict()
+_discoveries_lock = threading.Lock()
+# Whether each stored dataset, by hash, is an event log; verdicts are tiny, so many are kept.
+EVENT_LOG_CACHE_SIZE = 1024
+_event_logs: "OrderedDict[str, bool]" = OrderedDict()
+
+
+def _is_event_log(handle: Dict[str, Any]) -> bool:
+    """Whether a stored dataset is an event log by its columns and its rows; cached per hash."""
+
+    names = DatasetHandle.from_dict(handle).column_names
+    if not is_event_log(names):
+        return False
+    with _discoveries_lock:
+        if handle["hash"] in _event_logs:
+            _event_logs.move_to_end(handle["hash"])
+            return _event_logs[handle["hash"]]
+    columns = event_log_columns(names)
+    events = get_dataset_store().load(handle, columns=[columns[name] for name in ("case", "activity", "timestamp")])
+    verdict = is_event_log(events.columns, events)
+    with _discoveries_lock:
+        _event_logs[handle["hash"]] = verdict
+        if len(_event_logs) > EVENT_LOG_CACHE_SIZE:
+            _event_logs.popitem(last=False)
+    return verdict
+
+
+def _event_log(ci_state: CIState) -> Tuple[str, Dict[str, Any]] | None:
+    """The session's newest dataset that is an event log, with its handle."""
+
+    for name, handle in reversed(ci_state.datasets.items()):
+        if _is_event_log(handle):
+            return name, handle
+    return None
+
+
+def _discover(handle: Dict[str, Any]) -> ProcessDiscovery:
+    """Mine an event log dataset, reusing the result while the data and settings are unchanged."""
+
+    key = (handle["hash"], os.getenv("CI_COACH_MINING_MAX_ACTIVITIES"))
+    with _discoveries_lock:
+        if key in _discoveries:
+            _discoveries.move_to_end(key)
+            return _discoveries[key]
+    columns = event_log_columns(DatasetHandle.from_dict(handle).column_names)
+    discovery = discover_process_map(get_dataset_store().load(handle, columns=list(columns.values())))
+    with _discoveries_lock:
+        _discoveries[key] = discovery
+        if len(_discoveries) > DISCOVERY_CACHE_SIZE:
+            _discoveries.popitem(last=False)
+    return discovery
+
+
+def _discovery_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    """Store the process map mined from an event log; the LLM reply only narrates it."""
+
+    discovery: ProcessDiscovery = data["discovery"]
+    message = data.get("message") or discovery.describe()
+    message += (
+        f"\nProcess map mined from {data['dataset']}: {discovery.events:,} events in "
+        f"{discovery.cases:,} cases."
+    )
+    update = _diagram_update(ci_state, "process_map", discovery.process_map, message)
+    audit = {"node": "process_map", "dataset": data["dataset"], "discovery": discovery.to_dict()}
+    update["audit_log"] = [audit, *update["audit_log"]]
+    return update
 
-def fishbone_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    llm = get_llm()
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = FISHBONE_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
 
-    ci_state.fishbone = {
+def _fishbone_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    fishbone = {
         "categories": data.get("categories", []),
         "effect": data.get("effect", ci_state.problem_statement or "Problem"),
     }
-    message = data.get("message", "Fishbone diagram drafted.")
+    return _diagram_update(ci_state, "fishbone", fishbone, data.get("message", "Fishbone diagram drafted."))
+
+
+_NUMBER = r"(\d[\d,]*(?:\.\d+)?)"
+_TIME_UNIT = r"(min(?:ute)?s?|h(?:ou)?rs?|h)\b"
+# "450 minutes available", "available time: 7.5 h"; matched before demand so its minutes
+# are not read as a demand.
+_AVAILABLE_PATTERN = re.compile(
+    rf"{_NUMBER}\s*{_TIME_UNIT}\s+(?:of\s+)?available|available(?:\s+time)?\s*(?:of|is|:|=)?\s*{_NUMBER}\s*{_TIME_UNIT}"
+)
+# "50 lots per day", "demand 50/day", "120 units a day".
+_DEMAND_PATTERN = re.compile(rf"{_NUMBER}\s*(?!min|h(?:ou)?r)(?:[a-z]+\s+){{0,2}}?(?:per|/|a|each)\s*day\b")
+
+
+def _vsm_request(message: str) -> Tuple[float | None, float | None]:
+    """The daily demand and available minutes per day stated in ``message``, if any."""
+
+    text = message.lower()
+    available = None
+    if match := _AVAILABLE_PATTERN.search(text):
+        value, unit = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+        available = float(value.replace(",", "")) * (60 if unit.startswith("h") else 1)
+        text = text[: match.start()] + text[match.end() :]
+    demand = _DEMAND_PATTERN.search(text)
+    return (float(demand.group(1).replace(",", "")) if demand else None), available
+
+
+def _turn_datasets(ci_state: CIState) -> List[str]:
+    """Datasets loaded or pasted since the previous turn, or named in the latest message."""
+
+    names = []
+    for entry in reversed(ci_state.audit_log):
+        if entry.get("node") == "turn":
+            break
+        if entry.get("node") == "dataset_ingest":
+            names.append(entry["dataset"])
+    message = ci_state.latest_user_message or ""
+    names.extend(name for name in ci_state.datasets if re.search(rf"\b{re.escape(name)}\b", message))
+    return names
+
+
+def _vsm_stages(ci_state: CIState) -> Tuple[Any, str] | None:
+    """Stages for the VSM and where they came from.
+
+    A stage table (see :func:`~ci_coach.vsm.is_stage_table`) loaded this turn or named in
+    the message wins, then the stages of the current VSM, then the newest stage table loaded
+    earlier, then process map steps that carry ``ct_min``.
+    """
+
+    store = get_dataset_store()
+    tables = [
+        name
+        for name, handle in reversed(ci_state.datasets.items())
+        if is_stage_table(DatasetHandle.from_dict(handle).column_names)
+    ]
+    recent = _turn_datasets(ci_state)
+    fresh = [name for name in tables if name in recent]
+    if fresh or (tables and not ci_state.vsm.get("stages")):
+        name = (fresh or tables)[0]
+        handle = ci_state.datasets[name]
+        columns = DatasetHandle.from_dict(handle).column_names
+        return store.load(handle, columns=list(stage_columns(columns).values())), name
+    if ci_state.vsm.get("stages"):
+        return ci_state.vsm["stages"], "the current value stream map"
+    steps = [step for step in ci_state.process_map.get("steps") or [] if isinstance(step, dict)]
+    if any("ct_min" in step for step in steps):
+        return steps, "the process map"
+    return None
+
+
+def _vsm_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    """Compute the value stream metrics and render the map, without an LLM call."""
+
+    source = _vsm_stages(ci_state)
+    if source is None:
+        message = (
+            "I need the value stream stages to compute the VSM. Paste a CSV in a code block with one "
+            "row per stage (stage, ct_min, wt_min, wip, and optionally family and demand_per_day) "
+            'and tell me the daily demand, e.g. "50 lots per day".'
+        )
+        return _coach_update(ci_state, message)
+    stages, origin = source
+    demand, available = _vsm_request(ci_state.latest_user_message or "")
     try:
-        diagram_path = render_fishbone(ci_state.fishbone)
-        ci_state.diagrams.append(str(diagram_path))
-        message += f"\nFishbone diagram exported to {diagram_path}."
-    except Exception as exc:
-        ci_state.audit_log.append({"node": "fishbone", "error": str(exc)})
-    append_message(ci_state, "assistant", message)
-    ci_state.pending_response = message
-    return ci_state.to_dict()
-
-
-def five_whys_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    llm = get_llm()
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = FIVE_WHYS_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
-
-    ci_state.five_whys = data.get("chains", ci_state.five_whys)
-    message = data.get("message", "5-Whys analysis drafted.")
-    append_message(ci_state, "assistant", message)
-    ci_state.pending_response = message
-    return ci_state.to_dict()
-
-
-def a3_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    llm = get_llm()
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = A3_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
-
-    ci_state.a3 = {
-        "summary": data.get("summary"),
-        "background": data.get("background"),
-        "current_state": data.get("current_state"),
-        "analysis": data.get("analysis"),
-        "countermeasures": data.get("countermeasures"),
-        "plan": data.get("plan"),
-        "follow_up": data.get("follow_up"),
-    }
-    message = data.get("message", "A3 composed.")
-    append_message(ci_state, "assistant", message)
-    ci_state.pending_response = message
-    return ci_state.to_dict()
-
-
-def kaizen_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    llm = get_llm()
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = KAIZEN_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
-
-    ci_state.kaizen_plan = data.get("backlog", ci_state.kaizen_plan)
-    ci_state.audit_log.append({"node": "kaizen", "pilot_plan": data.get("pilot_plan")})
-    message = data.get("message", "Kaizen backlog drafted.")
-    append_message(ci_state, "assistant", message)
-    ci_state.pending_response = message
-    return ci_state.to_dict()
-
-
-def charts_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    ci_state = CIState.from_dict(state)
-    if not ci_state.datasets:
-        message = "I didn't detect a dataset. Please paste a CSV in a code block."
-        append_message(ci_state, "assistant", message)
-        ci_state.pending_response = message
-        return ci_state.to_dict()
+        result = compute_vsm(
+            stages,
+            demand_per_day=demand if demand is not None else ci_state.vsm.get("default_demand_per_day"),
+            available_min_per_day=available or ci_state.vsm.get("available_min_per_day") or DEFAULT_AVAILABLE_MIN,
+            name=ci_state.vsm.get("name") or (origin if origin in ci_state.datasets else ""),
+        )
+    except ValueError as exc:
+        return _coach_update(
+            ci_state, f"Unable to compute the value stream map: {exc}", [{"node": "vsm", "error": str(exc)}]
+        )
+    message = f"Value stream metrics from {origin}: {result.describe()}"
+    return _diagram_update(ci_state, "vsm", result.to_dict(), message)
+
+
+def vsm_node(state: GraphState) -> GraphState:
+    return _vsm_update(CIState.from_graph_state(state), {})
+
+
+async def avsm_node(state: GraphState) -> GraphState:
+    return await _run_render(_vsm_update, CIState.from_graph_state(state), {})
 
-    llm = get_llm()
-    prompt_inputs = _prepare_conversation(ci_state)
-    messages = CHART_PROMPT.format_messages(**prompt_inputs)
-    response = llm.invoke(messages)
-    data = extract_json(response.content)
 
+def _five_whys_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    return _coach_update(
+        ci_state,
+        data.get("message", "5-Whys analysis drafted."),
+        five_whys=data.get("chains", ci_state.five_whys),
+    )
+
+
+def _a3_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    return _coach_update(
+        ci_state,
+        data.get("message", "A3 composed."),
+        a3={
+            "summary": data.get("summary"),
+            "background": data.get("background"),
+            "current_state": data.get("current_state"),
+            "analysis": data.get("analysis"),
+            "countermeasures": data.get("countermeasures"),
+            "plan": data.get("plan"),
+            "follow_up": data.get("follow_up"),
+        },
+    )
+
+
+def _kaizen_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    return _coach_update(
+        ci_state,
+        data.get("message", "Kaizen backlog drafted."),
+        [{"node": "kaizen", "pilot_plan": data.get("pilot_plan")}],
+        kaizen_plan=data.get("backlog", ci_state.kaizen_plan),
+    )
+
+
+problem_node, aproblem_node = _coach_nodes(PROBLEM_PROMPT, "problem", _problem_update)
+value_prop_node, avalue_prop_node = _coach_nodes(VALUE_PROP_PROMPT, "value_prop", _value_prop_update)
+sipoc_node, asipoc_node = _coach_nodes(SIPOC_PROMPT, "sipoc", _sipoc_update)
+fishbone_node, afishbone_node = _coach_nodes(FISHBONE_PROMPT, "fishbone", _fishbone_update, renders=True)
+five_whys_node, afive_whys_node = _coach_nodes(FIVE_WHYS_PROMPT, "five_whys", _five_whys_update)
+a3_node, aa3_node = _coach_nodes(A3_PROMPT, "a3", _a3_update)
+kaizen_node, akaizen_node = _coach_nodes(KAIZEN_PROMPT, "kaizen", _kaizen_update)
+
+
+def process_map_node(state: GraphState) -> GraphState:
+    """Draft the process map with the LLM, or mine it from the session's newest event log."""
+
+    ci_state = CIState.from_graph_state(state)
+    event_log = _event_log(ci_state)
+    if event_log is None:
+        return _process_map_update(ci_state, _invoke_llm(ci_state, PROCESS_MAP_PROMPT, "process_map"))
+    name, handle = event_log
+    discovery = _discover(handle)
+    data = _invoke_llm(
+        ci_state, PROCESS_DISCOVERY_PROMPT, "process_map", inputs={"discovery": discovery.describe()}
+    )
+    return _discovery_update(ci_state, {**data, "discovery": discovery, "dataset": name})
+
+
+async def aprocess_map_node(state: GraphState) -> GraphState:
+    ci_state = CIState.from_graph_state(state)
+    event_log = _event_log(ci_state)
+    if event_log is None:
+        data = await _ainvoke_llm(ci_state, PROCESS_MAP_PROMPT, "process_map")
+        return await _run_render(_process_map_update, ci_state, data)
+    name, handle = event_log
+    # Mining a large log takes seconds; keep it off the event loop like rendering.
+    discovery = await _run_blocking(_discover, handle)
+    data = await _ainvoke_llm(
+        ci_state, PROCESS_DISCOVERY_PROMPT, "process_map", inputs={"discovery": discovery.describe()}
+    )
+    return await _run_render(_discovery_update, ci_state, {**data, "discovery": discovery, "dataset": name})
+
+
+def _no_dataset_update(ci_state: CIState) -> GraphState:
+    message = "I didn't detect a dataset. Please paste a CSV in a code block."
+    return _coach_update(ci_state, message)
+
+
+def _spc_summary(ci_state: CIState, spec: ChartSpec) -> Tuple[str, Dict[str, Any], str]:
+    # Limits and rule checks use every row, read in the parent so the reply can cite them.
+    handle = ci_state.datasets[spec.dataset_name]
+    columns = list(dict.fromkeys([spec.secondary_column, spec.value_column]))
+    labels, result = control_limits(get_dataset_store().load(handle, columns=columns), spec)
+    return f"{spec.dataset_name}:{spec.value_column}", result.to_dict(labels), result.describe()
+
+
+def _charts_update(ci_state: CIState, data: Dict[str, Any]) -> GraphState:
+    subgroup_size = data.get("subgroup_size")
     spec = ChartSpec(
         dataset_name=data.get("dataset_name", next(iter(ci_state.datasets))),
         chart_type=data.get("chart_type", "histogram"),
@@ -246,21 +809,68 @@ def charts_node(state: Dict[str, Any]) -> Dict[str, Any]:
         category_column=data.get("category_column"),
         secondary_column=data.get("secondary_column"),
         title=data.get("title", "CI Chart"),
+        subgroup_size=int(subgroup_size) if str(subgroup_size or "").isdigit() else None,
     )
 
-    renderer = ChartRenderer(ci_state.datasets)
+    changes: GraphState = {}
+    audit: List[Dict[str, Any]] = []
+    # Repair near-miss dataset/column names locally instead of another planner round trip.
+    spec, repairs = resolve_chart_spec(spec, ci_state.datasets, _dataset_profiles(ci_state))
+    if repairs:
+        audit.append({"node": "charts", "column_repairs": repairs})
     try:
-        chart_path = renderer.render(spec)
-        ci_state.charts.append(str(chart_path))
+        spc_summary = None
+        if spec.chart_type.lower() == "control" and spec.secondary_column:
+            spc_key, spc_result, spc_summary = _spc_summary(ci_state, spec)
+            changes["spc"] = {**ci_state.spc, spc_key: spc_result}
+            audit.append({"node": "charts", "spc": {spc_key: spc_result}})
+        handle = ci_state.datasets.get(spec.dataset_name) or {}
+        key = {
+            "version": CHART_RENDERER_VERSION,
+            "dpi": CHART_DPI,
+            "max_points": CHART_MAX_POINTS,
+            "dataset": handle.get("hash"),
+            "spec": asdict(spec),
+        }
+        chart_path = _cached_render(
+            "chart",
+            key,
+            spec.chart_type,
+            render_chart,
+            dict(ci_state.datasets),
+            spec,
+            str(get_dataset_store().root),
+        )
+        changes["charts"] = [str(chart_path)]
         message = data.get(
             "message",
             f"Chart created at {chart_path}.",
         )
+        for repair in repairs:
+            if repair["to"] and repair["from"]:
+                message += f"\nUsed {repair['to']!r} for {repair['field']} (asked for {repair['from']!r})."
+            elif repair["to"]:
+                message += f"\nUsed {repair['to']!r} for {repair['field']}."
+        if spc_summary:
+            message += f"\n{spc_summary}"
         message += f"\nChart saved to {chart_path}."
     except Exception as exc:
         message = f"Unable to render chart: {exc}"
-        ci_state.audit_log.append({"node": "charts", "error": str(exc)})
+        audit.append({"node": "charts", "error": str(exc)})
+
+    return _coach_update(ci_state, message, audit, **changes)
 
-    append_message(ci_state, "assistant", message)
-    ci_state.pending_response = message
-    return ci_state.to_dict()
+
+def charts_node(state: GraphState) -> GraphState:
+    ci_state = CIState.from_graph_state(state)
+    if not ci_state.datasets:
+        return _no_dataset_update(ci_state)
+    return _charts_update(ci_state, _invoke_llm(ci_state, CHART_PROMPT, "charts"))
+
+
+async def acharts_node(state: GraphState) -> GraphState:
+    ci_state = CIState.from_graph_state(state)
+    if not ci_state.datasets:
+        return _no_dataset_update(ci_state)
+    data = await _ainvoke_llm(ci_state, CHART_PROMPT, "charts")
+    return await _run_render(_charts_update, ci_state, data)
@@ -2,52 +2,338 @@
 
 from __future__ import annotations
 
-from typing import List
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
 
 from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
 
 from .state import CIState, Message
 
+# Approximate per-message framing cost (role markers, separators) in chat completions.
+MESSAGE_TOKEN_OVERHEAD = 4
+DEFAULT_CONTEXT_TOKENS = 3000
+DEFAULT_CONTEXT_TURNS = 6
+# User turns that must age out of the window before the rolling summary is updated again.
+DEFAULT_SUMMARY_TURNS = 4
+
+
+def _heuristic_token_count(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=1)
+def _token_counter() -> Callable[[str], int]:
+    # tiktoken downloads its encodings on first use, so it is opt-in to keep offline runs fast.
+    if os.getenv("CI_COACH_TOKENIZER", "").lower() == "tiktoken":
+        try:
+            import tiktoken
+
+            encoding = tiktoken.get_encoding("o200k_base")
+            return lambda text: len(encoding.encode(text))
+        except Exception:
+            pass
+    return _heuristic_token_count
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Return the token count for ``text`` (approximate unless ``CI_COACH_TOKENIZER=tiktoken``)."""
+
+    return _token_counter()(text)
+
+
+def count_message_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Return the prompt token count for formatted chat messages."""
+
+    return sum(count_tokens(str(m.content)) + MESSAGE_TOKEN_OVERHEAD for m in messages)
+
+
+def _to_langchain(msg: Message) -> BaseMessage:
+    if msg.role == "system":
+        return SystemMessage(content=msg.content)
+    if msg.role == "assistant":
+        return AIMessage(content=msg.content)
+    return HumanMessage(content=msg.content)
+
 
 def to_langchain_messages(state: CIState) -> List[BaseMessage]:
     """Convert stored conversation history to LangChain messages."""
 
+    return [_to_langchain(msg) for msg in state.messages]
+
+
+@dataclass
+class ContextWindow:
+    """The part of the history sent verbatim, plus the rolling summary of older turns.
+
+    ``start`` is the first message sent verbatim. ``aged_out`` is where the most recent
+    turns begin: messages before it are due to be folded into the summary, and until they
+    are, those from ``start`` onwards are still sent.
+    """
+
+    messages: List[BaseMessage]
+    start: int
+    tokens: int
+    aged_out: int = 0
+
+
+def build_context_window(
+    state: CIState,
+    max_tokens: int | None = None,
+    max_turns: int | None = None,
+) -> ContextWindow:
+    """Select the most recent turns that fit the token budget.
+
+    Walks the history backwards from the newest message, so the cost is bounded by the window
+    rather than the session length. Messages before ``state.summarized_upto`` are represented
+    only by ``state.conversation_summary``; the newest message is always kept. Turns past
+    ``max_turns`` that the summary does not cover yet are still included while they fit the
+    budget, so context is not lost while a summary is pending.
+    """
+
+    if max_tokens is None:
+        max_tokens = int(os.getenv("CI_COACH_CONTEXT_TOKENS", DEFAULT_CONTEXT_TOKENS))
+    if max_turns is None:
+        max_turns = int(os.getenv("CI_COACH_CONTEXT_TURNS", DEFAULT_CONTEXT_TURNS))
+
+    history = state.messages
     converted: List[BaseMessage] = []
-    for msg in state.messages:
-        if msg.role == "system":
-            converted.append(SystemMessage(content=msg.content))
-        elif msg.role == "assistant":
-            converted.append(AIMessage(content=msg.content))
-        else:
-            converted.append(HumanMessage(content=msg.content))
-    return converted
+    used = 0
+    if state.conversation_summary:
+        summary = SystemMessage(content=f"Earlier conversation (summarised):\n{state.conversation_summary}")
+        used = count_tokens(summary.content) + MESSAGE_TOKEN_OVERHEAD
+        converted.append(summary)
+
+    start = len(history)
+    aged_out: int | None = None
+    turns = 0
+    floor = min(state.summarized_upto, len(history))
+    for idx in range(len(history) - 1, floor - 1, -1):
+        msg = history[idx]
+        cost = count_tokens(msg.content) + MESSAGE_TOKEN_OVERHEAD
+        if start < len(history) and used + cost > max_tokens:
+            break
+        if msg.role == "user":
+            if turns == max_turns and aged_out is None:
+                aged_out = start
+            turns += 1
+        used += cost
+        start = idx
+
+    converted.extend(_to_langchain(msg) for msg in history[start:])
+    return ContextWindow(
+        messages=converted, start=start, tokens=used, aged_out=start if aged_out is None else aged_out
+    )
+
+
+def summary_due(state: CIState, window: ContextWindow, every: int | None = None) -> bool:
+    """Whether the rolling summary should be updated to cover ``window.aged_out``.
+
+    That is when ``every`` user turns (``CI_COACH_SUMMARY_EVERY``) have aged out of the
+    recent window since the last summary, or sooner once the token budget has started to
+    drop unsummarised messages from the prompt.
+    """
+
+    if every is None:
+        every = int(os.getenv("CI_COACH_SUMMARY_EVERY", DEFAULT_SUMMARY_TURNS))
+    if window.aged_out <= state.summarized_upto:
+        return False
+    if window.start > state.summarized_upto:
+        return True
+    pending = state.messages[state.summarized_upto : window.aged_out]
+    return sum(msg.role == "user" for msg in pending) >= every
+
+
+def format_transcript(messages: Sequence[Message]) -> str:
+    """Render messages as a plain ``role: content`` transcript for summarisation."""
+
+    return "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+
+
+ARTIFACT_LABELS = {
+    "problem_statement": "Problem Statement",
+    "value_proposition": "Value Proposition",
+    "sipoc": "SIPOC",
+    "process_map": "Process Map",
+    "fishbone": "Fishbone",
+    "five_whys": "5-Whys",
+    "a3": "A3",
+    "kaizen_plan": "Kaizen Plan",
+    "spc": "SPC Results",
+    "vsm": "Value Stream Map",
+}
+
+SUMMARY_CACHE_SIZE = 256
+_LIST_PREVIEW = 6
+_TEXT_PREVIEW = 160
+
+_summary_cache: "OrderedDict[Tuple[str, str, bool], str]" = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+
+def content_hash(value: Any) -> str:
+    """Return a stable hash of an artifact's JSON content."""
+
+    encoded = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def bump_version(previous: Dict[str, Any] | None, value: Any) -> Dict[str, Any]:
+    """Return the version record for a newly written artifact value."""
+
+    digest = content_hash(value)
+    if previous and previous.get("hash") == digest:
+        return previous
+    return {"version": (previous or {}).get("version", 0) + 1, "hash": digest}
+
+
+def _truncate(text: Any, limit: int = _TEXT_PREVIEW) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _names(items: Iterable[Any], key: str) -> str:
+    items = list(items)
+    names = [_truncate(item.get(key, "?") if isinstance(item, dict) else item, 40) for item in items[:_LIST_PREVIEW]]
+    if len(items) > _LIST_PREVIEW:
+        names.append(f"+{len(items) - _LIST_PREVIEW} more")
+    return ", ".join(names)
+
+
+def _compact_value_proposition(value: Dict[str, Any]) -> str:
+    stakeholders = value.get("stakeholders") or []
+    must_have = (value.get("requirements") or {}).get("must_have") or []
+    return f"{len(stakeholders)} stakeholders ({_names(stakeholders, 'name')}); {len(must_have)} must-haves"
+
+
+def _compact_sipoc(value: Dict[str, Any]) -> str:
+    counts = " ".join(
+        f"{key[0].upper()}:{len(value.get(key) or [])}"
+        for key in ("suppliers", "inputs", "process_steps", "outputs", "customers")
+    )
+    return f"{counts}; steps: {_names(value.get('process_steps') or [], 'name')}"
+
+
+def _compact_process_map(value: Dict[str, Any]) -> str:
+    steps = value.get("steps") or []
+    return (
+        f"{len(steps)} steps across {len(value.get('roles') or [])} roles, "
+        f"{len(value.get('edges') or [])} edges; steps: {_names(steps, 'name')}"
+    )
+
+
+def _compact_fishbone(value: Dict[str, Any]) -> str:
+    categories = value.get("categories") or []
+    bones = ", ".join(
+        f"{category.get('name', '?')} ({len(category.get('causes') or [])})" for category in categories
+    )
+    return f"effect '{_truncate(value.get('effect', ''), 60)}'; categories: {bones}"
+
+
+def _compact_five_whys(value: List[Dict[str, Any]]) -> str:
+    roots = [
+        (chain.get("whys") or [{}])[-1].get("statement", "?") for chain in value if isinstance(chain, dict)
+    ]
+    return f"{len(value)} chains; deepest whys: {_names(roots, 'statement')}"
+
+
+def _compact_a3(value: Dict[str, Any]) -> str:
+    filled = [key for key, section in value.items() if section]
+    return f"sections: {', '.join(filled) or 'none'}; summary: {_truncate(value.get('summary') or '')}"
+
+
+def _compact_kaizen(value: List[Dict[str, Any]]) -> str:
+    return f"{len(value)} countermeasures: {_names(value, 'idea')}"
+
+
+def _compact_spc(value: Dict[str, Any]) -> str:
+    charts = []
+    for key, result in list(value.items())[:_LIST_PREVIEW]:
+        rules = sorted({violation["rule"] for violation in result.get("violations") or []})
+        status = "in control" if result.get("in_control") else f"signals on rules {rules or 'dispersion'}"
+        charts.append(f"{key} {result.get('chart', '?')} {status}")
+    return "; ".join(charts)
+
+
+def _compact_vsm(value: Dict[str, Any]) -> str:
+    takt = value.get("takt_min")
+    summary = (
+        f"{len(value.get('stages') or [])} stages, lead time {value.get('lead_time_min')} min, "
+        f"{(value.get('pct_va') or 0):.1%} VA, takt {takt if takt is not None else '?'} min, "
+        f"bottleneck {value.get('bottleneck_stage_id')}"
+    )
+    if value.get("families"):
+        summary = f"{len(value['families'])} families, longest {value.get('family')!r}: {summary}"
+    return summary
+
+
+_COMPACT_SUMMARISERS: Dict[str, Callable[[Any], str]] = {
+    "problem_statement": _truncate,
+    "value_proposition": _compact_value_proposition,
+    "sipoc": _compact_sipoc,
+    "process_map": _compact_process_map,
+    "fishbone": _compact_fishbone,
+    "five_whys": _compact_five_whys,
+    "a3": _compact_a3,
+    "kaizen_plan": _compact_kaizen,
+    "spc": _compact_spc,
+    "vsm": _compact_vsm,
+}
+
+
+def summarise_artifact(name: str, value: Any, digest: str | None = None, full: bool = False) -> str:
+    """Return the prompt line for one artifact, cached by content hash and detail level."""
+
+    key = (name, digest or content_hash(value), full)
+    with _summary_cache_lock:
+        cached = _summary_cache.get(key)
+        if cached is not None:
+            _summary_cache.move_to_end(key)
+            return cached
+
+    if full:
+        body = value if isinstance(value, str) else json.dumps(value, default=str, ensure_ascii=False)
+    else:
+        try:
+            body = _COMPACT_SUMMARISERS[name](value)
+        except (AttributeError, TypeError, KeyError):
+            body = _truncate(value)
+    line = f"{ARTIFACT_LABELS[name]}: {body}"
+
+    with _summary_cache_lock:
+        _summary_cache[key] = line
+        if len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+    return line
+
 
+def build_state_summary(state: CIState, focus: Iterable[str] = ()) -> str:
+    """Return a textual summary of the known artifacts for prompting.
 
-def build_state_summary(state: CIState) -> str:
-    """Return a textual summary of the known artifacts for prompting."""
+    Artifacts named in ``focus`` are rendered in full; the rest use a compact summary. Both
+    are cached by the artifact's content hash from ``state.artifact_versions``, so unchanged
+    artifacts are not re-serialised on every node invocation.
+    """
 
+    focus = set(focus)
     sections = []
-    if state.problem_statement:
-        sections.append(f"Problem Statement: {state.problem_statement}")
-    if state.value_proposition:
-        sections.append(f"Value Proposition: {state.value_proposition}")
-    if state.sipoc:
-        sections.append(f"SIPOC: {state.sipoc}")
-    if state.process_map:
-        sections.append(f"Process Map: {state.process_map}")
-    if state.fishbone:
-        sections.append(f"Fishbone: {state.fishbone}")
-    if state.five_whys:
-        sections.append(f"5-Whys: {state.five_whys}")
-    if state.a3:
-        sections.append(f"A3: {state.a3}")
-    if state.kaizen_plan:
-        sections.append(f"Kaizen Plan: {state.kaizen_plan}")
+    for name in ARTIFACT_LABELS:
+        value = getattr(state, name)
+        if not value:
+            continue
+        digest = (state.artifact_versions.get(name) or {}).get("hash")
+        sections.append(summarise_artifact(name, value, digest, full=name in focus))
     if state.datasets:
         dataset_names = ", ".join(state.datasets.keys())
         sections.append(f"Datasets available: {dataset_names}")
     if state.charts:
-        sections.append(f"Charts generated: {state.charts}")
+        sections.append(f"Charts generated ({len(state.charts)}), latest: {', '.join(state.charts[-3:])}")
     if state.diagrams:
-        sections.append(f"Diagrams generated: {state.diagrams}")
+        sections.append(f"Diagrams generated ({len(state.diagrams)}), latest: {', '.join(state.diagrams[-3:])}")
     return "\n".join(sections) if sections else "No artifacts captured yet."
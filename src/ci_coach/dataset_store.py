@@ -0,0 +1,233 @@
+"""Content-addressed columnar storage for datasets shared in the conversation.
+
+Ingested DataFrames are written once per content hash as uncompressed Arrow IPC files, next
+to a JSON column profile (see :mod:`ci_coach.profiles`), and the conversation state carries
+only a small handle (name, hash, schema, row count). Readers memory-map the file and materialise just the columns they need, so a session's memory use
+does not grow with the size of the datasets it references, and the same CSV pasted twice
+(or into two sessions) is stored once.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+import pandas as pd
+import pyarrow as pa
+
+from .artifacts import default_artifacts_dir
+from .profiles import PROFILE_VERSION, profile_frame
+
+
+def dataset_hash(df: pd.DataFrame) -> str:
+    """Return a content hash of a DataFrame covering values, index, columns and dtypes."""
+
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class DatasetHandle:
+    """Lightweight reference to a stored dataset, kept in ``CIState.datasets``."""
+
+    name: str
+    hash: str
+    rows: int
+    columns: List[Dict[str, str]] = field(default_factory=list)
+    bytes: int = 0
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column["name"] for column in self.columns]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "DatasetHandle":
+        return cls(
+            name=data["name"],
+            hash=data["hash"],
+            rows=data.get("rows", 0),
+            columns=list(data.get("columns", [])),
+            bytes=data.get("bytes", 0),
+        )
+
+
+class DatasetStore:
+    """Write DataFrames as Arrow IPC files named by content hash; read them memory-mapped."""
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+        self.writes = 0
+        self.dedup_hits = 0
+        self.reads = 0
+        self.profiles_computed = 0
+
+    @classmethod
+    def from_env(cls) -> "DatasetStore":
+        """Build a store rooted at ``CI_COACH_DATASETS`` (default ``artifacts/datasets``)."""
+
+        return cls(os.getenv("CI_COACH_DATASETS", str(default_artifacts_dir() / "datasets")))
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / f"{digest}.arrow"
+
+    def profile_path_for(self, digest: str) -> Path:
+        return self.root / f"{digest}.profile.json"
+
+    def put(self, name: str, df: pd.DataFrame) -> DatasetHandle:
+        """Store ``df`` (once per content hash) and return its handle."""
+
+        digest = dataset_hash(df)
+        path = self.path_for(digest)
+        with self._lock:
+            if path.exists():
+                self.dedup_hits += 1
+            else:
+                self.root.mkdir(parents=True, exist_ok=True)
+                table = pa.Table.from_pandas(df, preserve_index=True)
+                tmp = path.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+                with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+                os.replace(tmp, path)
+                self.writes += 1
+        # Profile while the frame is still in memory rather than re-reading it later.
+        self._store_profile(digest, df)
+        return DatasetHandle(
+            name=name,
+            hash=digest,
+            rows=len(df),
+            columns=[{"name": str(c), "dtype": str(t)} for c, t in df.dtypes.items()],
+            bytes=path.stat().st_size,
+        )
+
+    def load(
+        self, handle: DatasetHandle | Mapping[str, Any], columns: Sequence[str] | None = None
+    ) -> pd.DataFrame:
+        """Return the dataset (or just ``columns``) as a DataFrame.
+
+        The Arrow file is memory-mapped, so unrequested columns are never read into memory.
+        """
+
+        if not isinstance(handle, DatasetHandle):
+            handle = DatasetHandle.from_dict(handle)
+        path = self.path_for(handle.hash)
+        if not path.exists():
+            raise FileNotFoundError(
+                f"Stored data for dataset {handle.name!r} ({handle.hash[:12]}) is missing."
+            )
+        if columns is not None:
+            missing = [column for column in columns if column not in handle.column_names]
+            if missing:
+                raise KeyError(
+                    f"Column(s) {missing} not in dataset {handle.name!r}. Available: {handle.column_names}"
+                )
+
+        with pa.memory_map(str(path), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                index_columns = _index_columns(table)
+                table = table.select([*dict.fromkeys([*columns, *index_columns])])
+            df = table.to_pandas()
+        self.reads += 1
+        return df
+
+    def profile(self, handle: DatasetHandle | Mapping[str, Any]) -> Dict[str, Any]:
+        """Return the column profile of a stored dataset, computing it at most once per hash."""
+
+        if not isinstance(handle, DatasetHandle):
+            handle = DatasetHandle.from_dict(handle)
+        return self._cached_profile(handle.hash) or self._store_profile(handle.hash, self.load(handle))
+
+    def _cached_profile(self, digest: str) -> Dict[str, Any] | None:
+        with self._lock:
+            profile = self._profiles.get(digest)
+        if profile is not None:
+            return profile
+        try:
+            profile = json.loads(self.profile_path_for(digest).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if profile.get("version") != PROFILE_VERSION:
+            return None
+        with self._lock:
+            self._profiles[digest] = profile
+        return profile
+
+    def _store_profile(self, digest: str, df: pd.DataFrame) -> Dict[str, Any]:
+        cached = self._cached_profile(digest)
+        if cached is not None:
+            return cached
+        profile = profile_frame(df)
+        path = self.profile_path_for(digest)
+        tmp = path.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(profile, default=str), encoding="utf-8")
+        os.replace(tmp, path)
+        with self._lock:
+            self._profiles[digest] = profile
+            self.profiles_computed += 1
+        return profile
+
+    def stats(self) -> Dict[str, Any]:
+        files = list(self.root.glob("*.arrow")) if self.root.exists() else []
+        return {
+            "datasets": len(files),
+            "bytes": sum(path.stat().st_size for path in files),
+            "writes": self.writes,
+            "dedup_hits": self.dedup_hits,
+            "reads": self.reads,
+            "profiles_computed": self.profiles_computed,
+        }
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Delete stored datasets whose hash is not in ``keep``; return how many were removed."""
+
+        keep = set(keep)
+        removed = 0
+        for path in self.root.glob("*.arrow"):
+            if path.stem not in keep:
+                path.unlink(missing_ok=True)
+                self.profile_path_for(path.stem).unlink(missing_ok=True)
+                with self._lock:
+                    self._profiles.pop(path.stem, None)
+                removed += 1
+        return removed
+
+
+def _index_columns(table: pa.Table) -> List[str]:
+    # Stored index levels appear as ordinary columns named in the pandas metadata.
+    metadata = table.schema.pandas_metadata or {}
+    return [name for name in metadata.get("index_columns", []) if isinstance(name, str)]
+
+
+_STORE: DatasetStore | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_dataset_store() -> DatasetStore:
+    """Return the process-wide dataset store, configured from the environment on first use."""
+
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = DatasetStore.from_env()
+        return _STORE
+
+
+def set_dataset_store(store: DatasetStore) -> None:
+    """Replace the process-wide dataset store."""
+
+    global _STORE
+    with _STORE_LOCK:
+        _STORE = store
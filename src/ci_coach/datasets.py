@@ -3,9 +3,15 @@
 from __future__ import annotations
 
 import io
+import os
 import re
-from typing import Dict, List, Tuple
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
 
@@ -31,7 +37,7 @@ def extract_datasets(message: str) -> List[Tuple[str, pd.DataFrame]]:
         except Exception:
             continue
 
-        datasets.append((f"dataset_{index}", df))
+        datasets.append((f"dataset_{index}", downcast_frame(df)))
     return datasets
 
 
@@ -40,3 +46,288 @@ def dataframe_preview(df: pd.DataFrame, max_rows: int = 5) -> str:
 
     preview = df.head(max_rows).to_markdown(index=False)
     return preview
+
+
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_MAX_ROWS = 1_000_000
+CATEGORY_RATIO = 0.5
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".tab": "tsv",
+    ".txt": "csv",
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".xlsx": "xlsx",
+    ".xlsm": "xlsx",
+}
+
+
+@dataclass
+class IngestStats:
+    """Throughput and memory figures for one bulk load."""
+
+    source: str
+    mode: str
+    rows_read: int = 0
+    rows_kept: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    memory_mb: float = 0.0
+    # How far the process's resident memory rose above its level when the load started,
+    # sampled after every chunk; other work running at the same time is included.
+    peak_rss_increase_mb: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "rows_per_second": round(self.rows_per_second, 1)}
+
+    def describe(self) -> str:
+        kept = "" if self.mode == "full" else f" -> {self.rows_kept:,} rows ({self.mode})"
+        return (
+            f"{self.rows_read:,} rows{kept} in {self.seconds:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/s, {self.memory_mb:.1f} MB in memory, "
+            f"peak RSS +{self.peak_rss_increase_mb:.0f} MB)"
+        )
+
+
+def downcast_frame(df: pd.DataFrame, category_ratio: float = CATEGORY_RATIO) -> pd.DataFrame:
+    """Shrink column dtypes without losing information.
+
+    Integers go to the smallest integer type that holds them, floats to ``float32`` only
+    when every value survives the round trip, and text columns with few distinct values
+    (at most ``category_ratio`` of the rows) become categoricals.
+    """
+
+    converted = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            converted[column] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+            narrowed = series.astype(np.float32)
+            if ((narrowed.astype(series.dtype) == series) | series.isna()).all():
+                converted[column] = narrowed
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if len(series) and series.nunique(dropna=True) <= category_ratio * len(series):
+                converted[column] = series.astype("category")
+    return df.assign(**converted) if converted else df
+
+
+def _format_for(path: Path, fmt: str | None) -> str:
+    if fmt:
+        return fmt.lower()
+    try:
+        return FILE_FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Cannot infer the format of {path.name!r}; expected one of {sorted(FILE_FORMATS)}."
+        ) from None
+
+
+def _xlsx_chunks(source: Any, chunk_rows: int, sheet: str | int | None) -> Iterator[pd.DataFrame]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise ImportError("Loading .xlsx files requires openpyxl (pip install 'ci-coach[xlsx]').") from exc
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet or workbook.sheetnames[0]]
+        rows = worksheet.iter_rows(values_only=True)
+        header = [str(value) for value in next(rows, ())]
+        batch: List[Tuple[Any, ...]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=header).infer_objects()
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header).infer_objects()
+    finally:
+        workbook.close()
+
+
+def iter_chunks(
+    source: Any,
+    fmt: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    sheet: str | int | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield ``source`` (a path or binary file object) as DataFrames of ``chunk_rows`` rows.
+
+    CSV, TSV and JSON Lines stream through pandas' chunked readers; XLSX streams rows through
+    openpyxl's read-only mode. A plain JSON document has no row boundaries and is parsed
+    whole.
+    """
+
+    if fmt in {"csv", "tsv"}:
+        yield from pd.read_csv(source, sep="\t" if fmt == "tsv" else ",", chunksize=chunk_rows)
+    elif fmt == "jsonl":
+        yield from pd.read_json(source, lines=True, chunksize=chunk_rows)
+    elif fmt == "json":
+        yield pd.read_json(source)
+    elif fmt == "xlsx":
+        yield from _xlsx_chunks(source, chunk_rows, sheet)
+    else:
+        raise ValueError(f"Unsupported dataset format {fmt!r}.")
+
+
+class _Reservoir:
+    """Uniform random sample of at most ``capacity`` rows over a stream of chunks (Algorithm R)."""
+
+    def __init__(self, capacity: int, seed: int = 0) -> None:
+        self.capacity = capacity
+        self.seen = 0
+        self.rows: pd.DataFrame | None = None
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        chunk = chunk.assign(_row=np.arange(self.seen, self.seen + len(chunk)))
+        free = max(self.capacity - self.seen, 0)
+        head, tail = chunk.iloc[:free], chunk.iloc[free:]
+        self.seen += len(chunk)
+        if len(head):
+            self.rows = head if self.rows is None else pd.concat([self.rows, head], ignore_index=True)
+        if not len(tail):
+            return
+
+        # Row i (0-based over the whole stream) replaces a random slot with probability k/(i+1).
+        draws = self._rng.integers(0, tail["_row"].to_numpy() + 1)
+        accepted = np.flatnonzero(draws < self.capacity)
+        if not len(accepted):
+            return
+        slots = draws[accepted]
+        # When several rows of one chunk land in the same slot, the last one wins, exactly
+        # as if they had been processed one at a time.
+        _, last = np.unique(slots[::-1], return_index=True)
+        winners = accepted[::-1][last]
+        victims = slots[::-1][last]
+        keep = np.ones(len(self.rows), dtype=bool)
+        keep[victims] = False
+        self.rows = pd.concat([self.rows[keep], tail.iloc[winners]], ignore_index=True)
+
+    def result(self) -> pd.DataFrame:
+        if self.rows is None:
+            return pd.DataFrame()
+        return self.rows.sort_values("_row").drop(columns="_row").reset_index(drop=True)
+
+
+class _Aggregator:
+    """Combine per-chunk group statistics so only one row per group is kept in memory."""
+
+    def __init__(self, keys: Sequence[str]) -> None:
+        self.keys = list(keys)
+        self.partial: pd.DataFrame | None = None
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        missing = [key for key in self.keys if key not in chunk.columns]
+        if missing:
+            raise KeyError(f"Aggregation column(s) {missing} not found. Available: {list(chunk.columns)}")
+        values = [
+            column
+            for column in chunk.columns
+            if column not in self.keys and pd.api.types.is_numeric_dtype(chunk[column])
+        ]
+        grouped = chunk.groupby(self.keys, dropna=False, observed=True)
+        stats = grouped[values].agg(["count", "sum", "min", "max"]) if values else None
+        sizes = grouped.size().rename(("rows", "count"))
+        part = sizes.to_frame() if stats is None else stats.join(sizes)
+        if self.partial is not None:
+            part = pd.concat([self.partial, part])
+        # Counts and sums add up across chunks; minima and maxima combine with themselves.
+        how = {column: column[1] if column[1] in {"min", "max"} else "sum" for column in part.columns}
+        self.partial = part.groupby(level=list(range(len(self.keys))), dropna=False).agg(how)
+
+    def result(self) -> pd.DataFrame:
+        if self.partial is None:
+            return pd.DataFrame(columns=self.keys)
+        frame = self.partial[[("rows", "count")]].copy()
+        values = [name for name, stat in self.partial.columns if stat == "sum"]
+        for name in values:
+            for stat in ("count", "sum", "min", "max"):
+                frame[(name, stat)] = self.partial[(name, stat)]
+            frame[(name, "mean")] = frame[(name, "sum")] / frame[(name, "count")]
+        frame.columns = ["rows" if name == "rows" else f"{name}_{stat}" for name, stat in frame.columns]
+        return frame.reset_index()
+
+
+def _max_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rss_mb() -> float:
+    """Current resident set size, or the lifetime peak where only that is available."""
+
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        # Without /proc the increase is how far this load raised the high-water mark.
+        return _max_rss_mb()
+
+
+def load_dataset(
+    source: str | Path | BinaryIO,
+    fmt: str | None = None,
+    *,
+    chunk_rows: int | None = None,
+    max_rows: int | None = None,
+    aggregate_by: Sequence[str] | None = None,
+    sheet: str | int | None = None,
+    seed: int = 0,
+) -> Tuple[pd.DataFrame, IngestStats]:
+    """Stream a CSV/TSV/JSON/XLSX source into a compact DataFrame.
+
+    Files are parsed in chunks of ``chunk_rows`` rows and downcast as they arrive, so memory
+    is bounded by what is kept rather than by the file size:
+
+    * by default every row is kept while the total stays within ``max_rows``; beyond that a
+      uniform random sample of ``max_rows`` rows (in original order) is kept instead;
+    * with ``aggregate_by`` each chunk is reduced to per-group count/sum/min/max/mean of the
+      numeric columns, so arbitrarily large files fit in memory.
+
+    ``source`` may be a path or a binary file object such as ``sys.stdin.buffer``.
+    """
+
+    chunk_rows = chunk_rows or int(os.getenv("CI_COACH_INGEST_CHUNK_ROWS", DEFAULT_CHUNK_ROWS))
+    max_rows = max_rows or int(os.getenv("CI_COACH_INGEST_MAX_ROWS", DEFAULT_MAX_ROWS))
+    if isinstance(source, (str, Path)):
+        path = Path(source)
+        fmt = _format_for(path, fmt)
+        source, label = str(path), path.name
+    else:
+        fmt, label = (fmt or "csv").lower(), "<stdin>"
+
+    start = time.perf_counter()
+    sink: _Aggregator | _Reservoir = _Aggregator(aggregate_by) if aggregate_by else _Reservoir(max_rows, seed)
+    stats = IngestStats(source=label, mode="aggregate" if aggregate_by else "full")
+    baseline = peak = _rss_mb()
+    for chunk in iter_chunks(source, fmt, chunk_rows, sheet):
+        stats.chunks += 1
+        stats.rows_read += len(chunk)
+        sink.add(downcast_frame(chunk, category_ratio=0.0))
+        peak = max(peak, _rss_mb())
+
+    df = downcast_frame(sink.result())
+    peak = max(peak, _rss_mb())
+    if not aggregate_by and stats.rows_read > max_rows:
+        stats.mode = "sample"
+    stats.rows_kept = len(df)
+    stats.seconds = time.perf_counter() - start
+    stats.memory_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+    stats.peak_rss_increase_mb = round(peak - baseline, 1)
+    return df, stats
@@ -0,0 +1,210 @@
+"""Structural diffs of process-map, fishbone and value stream artifacts between coach turns.
+
+The process map and fishbone coaches redraft their whole artifact every time they run, and
+the LLM often returns the previous structure again, or with a step or cause changed.
+:func:`diff_process_map`, :func:`diff_fishbone` and :func:`diff_vsm` compare two drafts item
+by item (roles, steps and edges by id; categories by name and causes by statement; value
+stream stages by family and id) so the coaches can skip rendering an unchanged diagram and
+tell the user what changed::
+
+    diff_process_map(previous, current).describe()
+    # 'added 2 steps, removed 1 edge (lanes: QC, Warehouse)'
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+_PLURALS = {"category": "categories"}
+# What ``DiagramDiff.affected`` lists, per diagram kind.
+_SCOPES = {"process_map": "lanes", "fishbone": "categories", "vsm": "families"}
+
+
+@dataclass
+class DiagramDiff:
+    """Counts of added, removed and changed items, by item type, between two drafts."""
+
+    kind: str
+    added: Dict[str, int] = field(default_factory=dict)
+    removed: Dict[str, int] = field(default_factory=dict)
+    changed: Dict[str, int] = field(default_factory=dict)
+    # Lanes (process maps), categories (fishbones) or product families (value stream maps)
+    # holding an added, removed or changed item.
+    affected: List[str] = field(default_factory=list)
+    # False when the drafts are identical, including order.
+    modified: bool = True
+    # False when the drafts had no previous version to compare with.
+    baseline: bool = True
+
+    @property
+    def unchanged(self) -> bool:
+        return self.baseline and not self.modified
+
+    def describe(self) -> str:
+        """Summarise the diff for the user, e.g. ``added 2 steps, removed 1 edge``."""
+
+        if not self.baseline:
+            return "first draft"
+        if not self.modified:
+            return "no changes"
+        parts = [
+            f"{verb} {' and '.join(_count(count, noun) for noun, count in counts.items())}"
+            for verb, counts in (("added", self.added), ("removed", self.removed), ("changed", self.changed))
+            if counts
+        ]
+        summary = ", ".join(parts) or "reordered items"
+        if self.affected:
+            summary += f" ({_SCOPES[self.kind]}: {', '.join(self.affected)})"
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed,
+            "affected": self.affected,
+            "summary": self.describe(),
+        }
+
+
+def _count(count: int, noun: str) -> str:
+    return f"{count} {noun if count == 1 else _PLURALS.get(noun, noun + 's')}"
+
+
+def _keyed(items: Iterable[Any], key: Callable[[Mapping[str, Any], int], Hashable]) -> Dict[Hashable, Mapping[str, Any]]:
+    keyed: Dict[Hashable, Mapping[str, Any]] = {}
+    for position, item in enumerate(items or []):
+        if isinstance(item, Mapping):
+            keyed.setdefault(key(item, position), item)
+    return keyed
+
+
+def _compare(
+    diff: DiagramDiff, noun: str, old: Dict[Hashable, Any], new: Dict[Hashable, Any]
+) -> Tuple[List[Hashable], List[Hashable], List[Hashable]]:
+    """Record the counts for one item type and return the added, removed and changed keys."""
+
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = [key for key in new if key in old and new[key] != old[key]]
+    for counts, keys in ((diff.added, added), (diff.removed, removed), (diff.changed, changed)):
+        if keys:
+            counts[noun] = len(keys)
+    return added, removed, changed
+
+
+def _lane(step: Mapping[str, Any], roles: Mapping[Hashable, Mapping[str, Any]]) -> str:
+    role_id = str(step.get("role_id") or "")
+    return str((roles.get(role_id) or {}).get("name") or role_id or "Unassigned")
+
+
+def _edge_key(edge: Mapping[str, Any], position: int) -> Hashable:
+    return str(edge.get("from")), str(edge.get("to"))
+
+
+def diff_process_map(previous: Optional[Mapping[str, Any]], current: Mapping[str, Any]) -> DiagramDiff:
+    """Diff two ``process_map`` drafts: roles and steps by ``id``, edges by ``from``/``to``."""
+
+    diff = DiagramDiff("process_map", modified=dict(previous or {}) != dict(current), baseline=bool(previous))
+    if not diff.baseline or not diff.modified:
+        return diff
+    previous = previous or {}
+
+    old_roles = _keyed(previous.get("roles"), lambda role, i: str(role.get("id", i)))
+    new_roles = _keyed(current.get("roles"), lambda role, i: str(role.get("id", i)))
+    old_steps = _keyed(previous.get("steps"), lambda step, i: str(step.get("id", i)))
+    new_steps = _keyed(current.get("steps"), lambda step, i: str(step.get("id", i)))
+    old_edges = _keyed(previous.get("edges"), _edge_key)
+    new_edges = _keyed(current.get("edges"), _edge_key)
+
+    roles = _compare(diff, "lane", old_roles, new_roles)
+    steps = _compare(diff, "step", old_steps, new_steps)
+    edges = _compare(diff, "edge", old_edges, new_edges)
+    old_systems = {str(system): system for system in previous.get("systems") or []}
+    new_systems = {str(system): system for system in current.get("systems") or []}
+    _compare(diff, "system", old_systems, new_systems)
+
+    def lanes_of(step_id: Hashable) -> List[str]:
+        # A step that moved lanes affects both the lane it left and the one it joined.
+        lanes = [_lane(old_steps[step_id], old_roles)] if step_id in old_steps else []
+        return lanes + ([_lane(new_steps[step_id], new_roles)] if step_id in new_steps else [])
+
+    affected: Dict[str, None] = {}
+    for role_id in (key for keys in roles for key in keys):
+        role = new_roles.get(role_id) or old_roles[role_id]
+        affected[str(role.get("name") or role_id)] = None
+    for step_id in (key for keys in steps for key in keys):
+        affected.update(dict.fromkeys(lanes_of(step_id)))
+    for source, target in (key for keys in edges for key in keys):
+        affected.update(dict.fromkeys(lanes_of(source) + lanes_of(target)))
+    diff.affected = sorted(affected)
+    return diff
+
+
+def _category_name(category: Mapping[str, Any], position: int) -> str:
+    return str(category.get("name", f"Category {position + 1}"))
+
+
+def _causes(fishbone: Mapping[str, Any]) -> Dict[Hashable, Mapping[str, Any]]:
+    keyed: Dict[Hashable, Mapping[str, Any]] = {}
+    for position, category in enumerate(fishbone.get("categories") or []):
+        if not isinstance(category, Mapping):
+            continue
+        name = _category_name(category, position)
+        for cause_position, cause in enumerate(category.get("causes") or []):
+            if isinstance(cause, Mapping):
+                keyed.setdefault((name, str(cause.get("statement", cause_position))), cause)
+    return keyed
+
+
+def diff_fishbone(previous: Optional[Mapping[str, Any]], current: Mapping[str, Any]) -> DiagramDiff:
+    """Diff two ``fishbone`` drafts: categories by ``name``, causes by category and ``statement``."""
+
+    diff = DiagramDiff("fishbone", modified=dict(previous or {}) != dict(current), baseline=bool(previous))
+    if not diff.baseline or not diff.modified:
+        return diff
+    previous = previous or {}
+
+    if previous.get("effect") != current.get("effect"):
+        diff.changed["effect statement"] = 1
+    # A category counts as changed only when its own fields are; cause edits count as causes.
+    old_categories = {
+        key: {name: value for name, value in category.items() if name != "causes"}
+        for key, category in _keyed(previous.get("categories"), _category_name).items()
+    }
+    new_categories = {
+        key: {name: value for name, value in category.items() if name != "causes"}
+        for key, category in _keyed(current.get("categories"), _category_name).items()
+    }
+    categories = _compare(diff, "category", old_categories, new_categories)
+    causes = _compare(diff, "cause", _causes(previous), _causes(current))
+
+    affected: Dict[str, None] = dict.fromkeys(str(key) for keys in categories for key in keys)
+    affected.update(dict.fromkeys(category for keys in causes for category, _ in keys))
+    diff.affected = sorted(affected)
+    return diff
+
+
+def _stage_key(stage: Mapping[str, Any], position: int) -> Hashable:
+    return str(stage.get("family", "")), str(stage.get("id", position))
+
+
+def diff_vsm(previous: Optional[Mapping[str, Any]], current: Mapping[str, Any]) -> DiagramDiff:
+    """Diff two ``vsm`` drafts: stages by ``family`` and ``id``, plus demand and available time.
+
+    The metrics are derived from these inputs, so they are not compared themselves.
+    """
+
+    diff = DiagramDiff("vsm", modified=dict(previous or {}) != dict(current), baseline=bool(previous))
+    if not diff.baseline or not diff.modified:
+        return diff
+    previous = previous or {}
+
+    for name, noun in (("demand_per_day", "demand"), ("available_min_per_day", "available time")):
+        if previous.get(name) != current.get(name):
+            diff.changed[noun] = 1
+    old_stages = _keyed(previous.get("stages"), _stage_key)
+    stages = _compare(diff, "stage", old_stages, _keyed(current.get("stages"), _stage_key))
+    diff.affected = sorted({family for keys in stages for family, _ in keys if family})
+    return diff
@@ -1,137 +1,857 @@
-"""Diagram rendering for process maps and fishbone analysis."""
+"""Diagram rendering for process maps, fishbone analysis and value stream maps.
+
+Diagrams can be written as SVG, Mermaid or Graphviz DOT source, all generated as text
+without importing matplotlib, or rasterised to PNG through matplotlib when a PNG is asked
+for. :func:`get_diagram_renderer` returns the backend for a format.
+"""
 
 from __future__ import annotations
 
 import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from .artifacts import artifacts_dir, pyplot, save_figure, write_text
+from .fishbone_layout import LINE_EM, MAX_DEPTH, SEGMENT_STYLES, fishbone_layout, wrap_label
+from .process_graph import ProcessGraph, map_layout
+
+# Bump when a change to the drawing code changes the output, so cached renders are redone.
+RENDERER_VERSION = 5
+DIAGRAM_DPI = 150
+DEFAULT_DIAGRAM_FORMAT = "svg"
+
+# Process map geometry, in data units (one unit per lane row).
+COLUMN_WIDTH = 2.6
+LANE_LABEL_WIDTH = 1.8
+BOX_MARGIN = 0.15
+LABEL_WIDTH = 18
+INCHES_PER_UNIT = 0.75
+MAX_FIGURE_INCHES = 60
+MIN_LABEL_POINTS = 4
+# PNG encoding time grows with the pixel count, so large diagrams are saved at a lower DPI.
+MAX_DIAGRAM_PIXELS = 12_000_000
+# SVG pixels per data unit, matching the PNG's scale at 96 pixels per inch.
+SVG_UNIT_PX = 72
+# Value stream map geometry, in inches: one row per product family, stages left to right,
+# each stage a box preceded by its inventory triangle, with the timeline ladder beneath.
+VSM_PITCH = 2.0
+VSM_BOX_WIDTH = 1.3
+VSM_BOX_HEIGHT = 0.6
+VSM_ROW_HEIGHT = 2.45
+VSM_LABEL_WIDTH = 1.9
+VSM_POINTS = 8.0
+VSM_COLOURS = {"box": "#e8f1fb", "edge": "#1f77b4", "over_takt": "#fdd9b5", "bottleneck": "#d62728"}
 
-import matplotlib.pyplot as plt
-from matplotlib.patches import FancyBboxPatch
 
-ARTIFACTS_DIR = Path(os.getenv("CI_COACH_ARTIFACTS", "artifacts"))
-ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+def _dpi(fig: Any) -> float:
+    width, height = fig.get_size_inches()
+    return min(DIAGRAM_DPI, (MAX_DIAGRAM_PIXELS / (width * height)) ** 0.5)
 
 
-def render_process_map(process_map: Dict) -> Path:
-    """Render a simple left-to-right process map diagram."""
+def render_process_map(process_map: Dict, path: Path | None = None) -> Path:
+    """Render a swimlane process map to ``path``.
 
-    steps: List[Dict] = process_map.get("steps", [])
-    roles = {role["id"]: role["name"] for role in process_map.get("roles", [])}
+    Steps are placed by :func:`~ci_coach.process_graph.layered_layout`: one lane per role,
+    columns by distance from the start, and rework loops drawn as dashed arcs. Boxes and
+    arrows are drawn as single collections, so large maps stay quick to render.
+    """
 
-    if not steps:
+    graph, layout = map_layout(process_map)
+    if not len(graph):
         raise ValueError("No steps found in process map definition.")
 
-    fig, ax = plt.subplots(figsize=(max(10, len(steps) * 2.5), 4))
+    from matplotlib.collections import LineCollection, PatchCollection
+    from matplotlib.patches import FancyBboxPatch
+
+    plt = pyplot()
+    width = COLUMN_WIDTH * layout.columns + LANE_LABEL_WIDTH
+    # Headroom above the first lane for rework arcs.
+    headroom = 0.8 if layout.back_edge.any() else 0.1
+    height = layout.rows + headroom
+    # Beyond the size cap the whole drawing, text included, is scaled down together.
+    scale = min(1.0, MAX_FIGURE_INCHES / (max(width, height) * INCHES_PER_UNIT))
+    fig, ax = plt.subplots(
+        figsize=(max(6.0, width * INCHES_PER_UNIT * scale), max(2.5, height * INCHES_PER_UNIT * scale))
+    )
+    fig.subplots_adjust(left=0.01, right=0.99, bottom=0.01, top=0.99)
     ax.axis("off")
+    fontsize = 9 * scale
+    # Text dominates render time (a few ms per label) and is unreadable once the map has been
+    # shrunk this far, so very large maps are drawn as boxes and arrows only.
+    labelled = fontsize >= MIN_LABEL_POINTS
 
-    lane_positions = {role_id: idx for idx, role_id in enumerate(roles)}
-    num_lanes = max(len(lane_positions), 1)
-
-    for idx, step in enumerate(steps):
-        role_id = step.get("role_id")
-        lane_idx = lane_positions.get(role_id, 0)
-        x = idx * 2.5 + 1
-        y = (num_lanes - lane_idx) * 1.5
-        box = FancyBboxPatch(
-            (x, y),
-            2.2,
-            0.9,
-            boxstyle="round,pad=0.2",
-            linewidth=1.2,
-            edgecolor="#1f77b4",
-            facecolor="#e8f1fb",
-        )
-        ax.add_patch(box)
+    for lane, (top, rows) in enumerate(zip(layout.lane_top, layout.lane_height)):
+        ax.axhspan(-top, -(top + rows), color="#f4f7fb" if lane % 2 == 0 else "white", zorder=0)
         ax.text(
-            x + 1.1,
-            y + 0.45,
-            step.get("name", "Step"),
-            ha="center",
+            0.1,
+            -(top + rows / 2),
+            wrap_label(graph.lane_names[lane], 14),
+            ha="left",
             va="center",
-            fontsize=10,
-            wrap=True,
+            fontsize=max(fontsize, MIN_LABEL_POINTS) * 1.1,
+            fontweight="bold",
+            color="#555555",
         )
+
+    # Step boxes: top-left corners in data units, one row per step.
+    x = LANE_LABEL_WIDTH + layout.column * COLUMN_WIDTH + BOX_MARGIN
+    y = -(layout.row + 1) + BOX_MARGIN
+    box_width, box_height = COLUMN_WIDTH - 2 * BOX_MARGIN, 1 - 2 * BOX_MARGIN
+    boxes = [
+        FancyBboxPatch((bx, by), box_width, box_height, boxstyle="round,pad=0.02,rounding_size=0.08")
+        for bx, by in zip(x.tolist(), y.tolist())
+    ]
+    ax.add_collection(
+        PatchCollection(boxes, facecolor="#e8f1fb", edgecolor="#1f77b4", linewidth=1.0, zorder=2)
+    )
+    for step, bx, by in zip(graph.steps if labelled else [], x.tolist(), y.tolist()):
         ax.text(
-            x + 1.1,
-            y + 1.0,
-            roles.get(role_id, ""),
+            bx + box_width / 2,
+            by + box_height / 2,
+            wrap_label(step.get("name", "Step"), LABEL_WIDTH),
             ha="center",
-            va="bottom",
-            fontsize=8,
-            color="#555555",
+            va="center",
+            fontsize=fontsize,
+            zorder=3,
         )
 
-    for edge in process_map.get("edges", []):
-        try:
-            start_idx = next(i for i, s in enumerate(steps) if s["id"] == edge["from"])
-            end_idx = next(i for i, s in enumerate(steps) if s["id"] == edge["to"])
-        except StopIteration:
-            continue
-        start_x = start_idx * 2.5 + 3.2
-        end_x = end_idx * 2.5 + 1
-        start_y = (num_lanes - lane_positions.get(steps[start_idx].get("role_id"), 0)) * 1.5 + 0.45
-        end_y = (num_lanes - lane_positions.get(steps[end_idx].get("role_id"), 0)) * 1.5 + 0.45
-        ax.annotate(
-            "",
-            xy=(end_x, end_y),
-            xytext=(start_x, start_y),
-            arrowprops=dict(arrowstyle="->", color="#1f77b4", lw=1.2),
+    centre_y = y + box_height / 2
+    forward = ~layout.back_edge
+    sources, targets = graph.sources, graph.targets
+    if forward.any():
+        start_x = x[sources[forward]] + box_width
+        start_y = centre_y[sources[forward]]
+        ax.quiver(
+            start_x,
+            start_y,
+            x[targets[forward]] - start_x,
+            centre_y[targets[forward]] - start_y,
+            angles="xy",
+            scale_units="xy",
+            scale=1,
+            units="dots",
+            width=1.5 * scale,
+            headwidth=5,
+            headlength=6,
+            color="#1f77b4",
+            zorder=1,
+        )
+    if layout.back_edge.any():
+        # Rework loops arc over the boxes from the end of a step back to an earlier one.
+        back_sources, back_targets = sources[layout.back_edge], targets[layout.back_edge]
+        t = np.linspace(0, 1, 16)[:, None]
+        x0, x1 = x[back_sources] + box_width / 2, x[back_targets] + box_width / 2
+        y0, y1 = y[back_sources] + box_height, y[back_targets] + box_height
+        lift = 0.4 + 0.1 * np.abs(layout.column[back_sources] - layout.column[back_targets])
+        arc_x = (1 - t) * x0 + t * x1
+        arc_y = (1 - t) * y0 + t * y1 + 4 * lift * t * (1 - t)
+        ax.add_collection(
+            LineCollection(
+                np.stack([arc_x.T, arc_y.T], axis=-1),
+                colors="#d62728",
+                linestyles="--",
+                linewidths=1.0,
+                zorder=4,
+            )
+        )
+        ax.quiver(
+            arc_x[-2],
+            arc_y[-2],
+            arc_x[-1] - arc_x[-2],
+            arc_y[-1] - arc_y[-2],
+            angles="xy",
+            scale_units="xy",
+            scale=1,
+            units="dots",
+            width=1.5 * scale,
+            headwidth=5,
+            headlength=6,
+            color="#d62728",
+            zorder=4,
         )
+
+    for edge_id, edge in enumerate(graph.edges if labelled else []):
         if note := edge.get("note"):
+            source, target = sources[edge_id], targets[edge_id]
             ax.text(
-                (start_x + end_x) / 2,
-                (start_y + end_y) / 2 + 0.2,
-                note,
+                (x[source] + box_width + x[target]) / 2,
+                (centre_y[source] + centre_y[target]) / 2 + 0.05,
+                wrap_label(note, 16, 1),
                 ha="center",
                 va="bottom",
-                fontsize=8,
+                fontsize=fontsize * 0.85,
                 color="#555555",
+                zorder=5,
             )
 
-    ax.set_ylim(0, (num_lanes + 2) * 1.5)
-    artifact_path = ARTIFACTS_DIR / "process_map.png"
-    fig.tight_layout()
-    fig.savefig(artifact_path, dpi=150)
+    ax.set_xlim(0, width)
+    ax.set_ylim(-layout.rows, headroom)
+    artifact_path = path or artifacts_dir() / "process_map.png"
+    save_figure(fig, artifact_path, _dpi(fig))
     plt.close(fig)
     return artifact_path
 
 
-def render_fishbone(fishbone: Dict) -> Path:
-    """Render a fishbone diagram based on categories and causes."""
+def render_fishbone(fishbone: Dict, path: Path | None = None) -> Path:
+    """Render a fishbone diagram to ``path``, laid out by :func:`~ci_coach.fishbone_layout.fishbone_layout`.
 
-    categories = fishbone.get("categories", [])
-    if not categories:
-        raise ValueError("Fishbone definition missing categories.")
+    Bones and ribs are drawn as one line collection. Text dominates render time, so labels
+    are wrapped and truncated by the layout, and cause labels are dropped once the diagram
+    is shrunk past legibility.
+    """
+
+    from matplotlib.collections import LineCollection
+    from matplotlib.patches import FancyBboxPatch
 
-    fig, ax = plt.subplots(figsize=(10, max(5, len(categories) * 1.5)))
+    layout = fishbone_layout(fishbone)
+    plt = pyplot()
+    scale = min(1.0, MAX_FIGURE_INCHES / max(layout.width, layout.height))
+    fig = plt.figure(figsize=(layout.width * scale, layout.height * scale))
+    ax = fig.add_axes((0, 0, 1, 1))
     ax.axis("off")
+    ax.set_xlim(0, layout.width)
+    ax.set_ylim(0, layout.height)
+
+    colours, widths = zip(*SEGMENT_STYLES)
+    kinds = layout.segment_kind
+    ax.add_collection(
+        LineCollection(
+            layout.segments.reshape(-1, 2, 2),
+            colors=[colours[kind] for kind in kinds],
+            linewidths=[widths[kind] * scale for kind in kinds],
+        )
+    )
+    x, y, box_width, box_height = layout.effect_box
+    ax.add_patch(
+        FancyBboxPatch(
+            (x, y), box_width, box_height, boxstyle="round,pad=0,rounding_size=0.08", facecolor="#e8f1fb", edgecolor="#1f77b4"
+        )
+    )
+    ha = {"start": "left", "middle": "center", "end": "right"}
+    # Legibility is judged at the saved resolution, which drops for very large diagrams.
+    dpi = _dpi(fig)
+    for label in layout.labels:
+        points = label.points * scale
+        if points * dpi / DIAGRAM_DPI < MIN_LABEL_POINTS and label.kind in {"cause", "evidence"}:
+            continue
+        ax.text(
+            label.x,
+            label.y,
+            label.text,
+            ha=ha[label.anchor],
+            va="center",
+            fontsize=max(points, MIN_LABEL_POINTS),
+            fontweight="bold" if label.kind in {"effect", "category"} else "normal",
+            color="#555555" if label.kind == "evidence" else "black",
+            linespacing=LINE_EM,
+        )
 
-    spine_x = [0.5, 9.5]
-    spine_y = [len(categories) / 2, len(categories) / 2]
-    ax.plot(spine_x, spine_y, color="#1f77b4", linewidth=2)
+    artifact_path = path or artifacts_dir() / "fishbone.png"
+    save_figure(fig, artifact_path, dpi)
+    plt.close(fig)
+    return artifact_path
 
-    for idx, category in enumerate(categories):
-        direction = -1 if idx % 2 == 0 else 1
-        base_y = spine_y[0] + direction * (idx + 1) * 0.6
-        ax.plot(
-            [2.0, 8.5],
-            [spine_y[0], base_y],
-            color="#1f77b4",
-            linewidth=1.5,
+
+def _minutes(value: Any) -> str:
+    value = float(value or 0)
+    return f"{value:,.0f}" if abs(value) >= 100 else f"{value:.3g}"
+
+
+def _vsm_stages(vsm: Dict) -> Tuple[List[Dict], List[str], Dict[str, Dict], List[bool]]:
+    """Stages, each stage's family, family summaries and bottleneck flags of the VSM JSON."""
+
+    stages = [stage for stage in vsm.get("stages") or [] if isinstance(stage, dict)]
+    if not stages:
+        raise ValueError("No stages found in value stream map.")
+    families = [str(stage.get("family", "")) for stage in stages]
+    if vsm.get("families"):
+        summaries = {str(summary.get("family", "")): summary for summary in vsm["families"]}
+    else:
+        summaries = {family: vsm for family in set(families)}
+    bottleneck = [
+        str(stage.get("id")) == str((summaries.get(family) or {}).get("bottleneck_stage_id"))
+        for stage, family in zip(stages, families)
+    ]
+    return stages, families, summaries, bottleneck
+
+
+def _vsm_summary(family: str, summary: Dict, name: str = "") -> str:
+    lines = [wrap_label(family or name or "Value stream", 20, 2), f"LT {_minutes(summary.get('lead_time_min'))} min"]
+    if summary.get("pct_va") is not None:
+        lines.append(f"VA {float(summary['pct_va']):.1%}")
+    if summary.get("takt_min") is not None:
+        lines.append(f"Takt {_minutes(summary['takt_min'])} min")
+    return "\n".join(lines)
+
+
+@dataclass
+class _VSMLayout:
+    """Value stream map geometry in inches, y down, shared by the PNG and SVG backends."""
+
+    width: float
+    height: float
+    stages: List[Dict]
+    # Top-left corner of each stage's box, and whether it starts its family's row.
+    x: np.ndarray
+    y: np.ndarray
+    first: np.ndarray
+    bottleneck: np.ndarray
+    over_takt: np.ndarray
+    # Top of each family's row and its label: the family name and headline metrics.
+    rows: List[Tuple[float, str]]
+
+
+def _vsm_layout(vsm: Dict) -> _VSMLayout:
+    stages, families, summaries, bottleneck = _vsm_stages(vsm)
+    codes: Dict[str, int] = {}
+    row = np.array([codes.setdefault(family, len(codes)) for family in families])
+    # Each stage's position within its family's row, in stage order.
+    counts = np.bincount(row)
+    order = np.argsort(row, kind="stable")
+    position = np.empty(len(row), dtype=int)
+    position[order] = np.arange(len(row)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return _VSMLayout(
+        width=VSM_LABEL_WIDTH + counts.max() * VSM_PITCH + 0.2,
+        height=len(codes) * VSM_ROW_HEIGHT,
+        stages=stages,
+        x=VSM_LABEL_WIDTH + position * VSM_PITCH + (VSM_PITCH - VSM_BOX_WIDTH),
+        y=row * VSM_ROW_HEIGHT + 0.35,
+        first=position == 0,
+        bottleneck=np.array(bottleneck),
+        over_takt=np.array([bool(stage.get("over_takt")) for stage in stages]),
+        rows=[
+            (code * VSM_ROW_HEIGHT, _vsm_summary(family, summaries.get(family) or {}, vsm.get("name", "")))
+            for family, code in codes.items()
+        ],
+    )
+
+
+def _vsm_geometry(layout: _VSMLayout) -> Dict[str, np.ndarray]:
+    """Arrays of the map's lines and marks, one entry per stage, from its box corner."""
+
+    x, y = layout.x, layout.y
+    gap = VSM_PITCH - VSM_BOX_WIDTH
+    high = y + VSM_BOX_HEIGHT + 0.85
+    low = high + 0.3
+    # Timeline ladder: the wait before the stage on the upper level, its cycle time below.
+    ladder = np.stack(
+        [
+            np.stack([x - gap, high, x, high], axis=1),
+            np.stack([x, high, x, low], axis=1),
+            np.stack([x, low, x + VSM_BOX_WIDTH, low], axis=1),
+            np.stack([x + VSM_BOX_WIDTH, low, x + VSM_BOX_WIDTH, high], axis=1),
+        ],
+        axis=1,
+    ).reshape(-1, 4)
+    triangle_x, triangle_y = x - gap / 2, y + VSM_BOX_HEIGHT * 0.65
+    return {
+        "ladder": ladder,
+        "high": high,
+        "low": low,
+        "triangle_x": triangle_x,
+        "triangle_y": triangle_y,
+        "triangles": np.stack(
+            [
+                np.stack([triangle_x, triangle_y - 0.16], axis=1),
+                np.stack([triangle_x - 0.16, triangle_y + 0.12], axis=1),
+                np.stack([triangle_x + 0.16, triangle_y + 0.12], axis=1),
+            ],
+            axis=1,
+        ),
+        # Push arrows from the previous stage's box, above the inventory triangle.
+        "arrows": np.stack([x - gap, y + 0.12, x, y + 0.12], axis=1)[~layout.first],
+    }
+
+
+def _vsm_labels(layout: _VSMLayout, geometry: Dict[str, np.ndarray]) -> Iterator[Tuple[float, float, str, float]]:
+    """``(x, y, text, points)`` of every stage label, centred on ``(x, y)``."""
+
+    gap = VSM_PITCH - VSM_BOX_WIDTH
+    columns = zip(
+        layout.stages,
+        layout.x.tolist(),
+        layout.y.tolist(),
+        geometry["triangle_x"].tolist(),
+        geometry["high"].tolist(),
+        geometry["low"].tolist(),
+    )
+    for stage, x, y, triangle_x, high, low in columns:
+        yield x + VSM_BOX_WIDTH / 2, y + VSM_BOX_HEIGHT / 2, wrap_label(stage.get("name", "Stage"), 16), VSM_POINTS
+        yield triangle_x, y + VSM_BOX_HEIGHT + 0.12, _minutes(stage.get("wip")), VSM_POINTS * 0.85
+        data = f"CT {_minutes(stage.get('ct_min'))} min\nWT {_minutes(stage.get('wt_min'))} min"
+        yield x + VSM_BOX_WIDTH / 2, y + VSM_BOX_HEIGHT + 0.4, data, VSM_POINTS * 0.85
+        yield x - gap / 2, high - 0.12, _minutes(stage.get("wt_min")), VSM_POINTS * 0.85
+        yield x + VSM_BOX_WIDTH / 2, low + 0.12, _minutes(stage.get("ct_min")), VSM_POINTS * 0.85
+
+
+def _vsm_fills(layout: _VSMLayout) -> Tuple[List[str], List[str]]:
+    fills = [VSM_COLOURS["over_takt" if over else "box"] for over in layout.over_takt.tolist()]
+    edges = [VSM_COLOURS["bottleneck" if flag else "edge"] for flag in layout.bottleneck.tolist()]
+    return fills, edges
+
+
+def render_vsm(vsm: Dict, path: Path | None = None) -> Path:
+    """Render a value stream map to ``path``: one row per product family, with its timeline.
+
+    Stages slower than takt are shaded and the bottleneck is outlined in red. Boxes,
+    triangles and lines are single collections; stage labels are dropped once the map is
+    shrunk past legibility, leaving the family summaries.
+    """
+
+    from matplotlib.collections import LineCollection, PatchCollection, PolyCollection
+    from matplotlib.patches import Rectangle
+
+    layout = _vsm_layout(vsm)
+    geometry = _vsm_geometry(layout)
+    plt = pyplot()
+    scale = min(1.0, MAX_FIGURE_INCHES / max(layout.width, layout.height))
+    fig = plt.figure(figsize=(layout.width * scale, layout.height * scale))
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.axis("off")
+    ax.set_xlim(0, layout.width)
+    ax.set_ylim(layout.height, 0)
+
+    for index, (top, label) in enumerate(layout.rows):
+        ax.axhspan(top, top + VSM_ROW_HEIGHT, color="#f4f7fb" if index % 2 == 0 else "white", zorder=0)
+        ax.text(
+            0.1,
+            top + VSM_ROW_HEIGHT / 2,
+            label,
+            ha="left",
+            va="center",
+            fontsize=max(9 * scale, MIN_LABEL_POINTS),
+            fontweight="bold",
+            color="#555555",
+            linespacing=LINE_EM,
         )
-        ax.text(8.8, base_y, category.get("name", "Category"), fontsize=11, va="center")
-        for c_idx, cause in enumerate(category.get("causes", [])):
-            cy = base_y + direction * (c_idx + 1) * 0.4
-            ax.plot([4.0, 7.0], [base_y, cy], color="#4c78a8", linewidth=1)
-            label = cause.get("statement", "Cause")
-            if evidence := cause.get("evidence"):
-                label += f"\nEvidence: {evidence}"
-            ax.text(7.1, cy, label, fontsize=9, va="center")
-
-    ax.text(0.4, spine_y[0], fishbone.get("effect", "Problem"), fontsize=12, va="center")
-    artifact_path = ARTIFACTS_DIR / "fishbone.png"
-    fig.tight_layout()
-    fig.savefig(artifact_path, dpi=150)
+    fills, edges = _vsm_fills(layout)
+    boxes = [Rectangle((bx, by), VSM_BOX_WIDTH, VSM_BOX_HEIGHT) for bx, by in zip(layout.x.tolist(), layout.y.tolist())]
+    widths = np.where(layout.bottleneck, 2.5, 1.0) * scale
+    ax.add_collection(PatchCollection(boxes, facecolors=fills, edgecolors=edges, linewidths=widths, zorder=2))
+    ax.add_collection(
+        PolyCollection(geometry["triangles"], facecolors="#fff3bf", edgecolors="#8c6d1f", linewidths=scale, zorder=2)
+    )
+    ax.add_collection(
+        LineCollection(geometry["ladder"].reshape(-1, 2, 2), colors="#333333", linewidths=scale, zorder=1)
+    )
+    arrows = geometry["arrows"]
+    if len(arrows):
+        ax.quiver(
+            arrows[:, 0],
+            arrows[:, 1],
+            arrows[:, 2] - arrows[:, 0],
+            arrows[:, 3] - arrows[:, 1],
+            angles="xy",
+            scale_units="xy",
+            scale=1,
+            units="dots",
+            width=1.5 * scale,
+            headwidth=5,
+            headlength=6,
+            color=VSM_COLOURS["edge"],
+            zorder=1,
+        )
+
+    # Legibility is judged at the saved resolution, which drops for very large maps.
+    dpi = _dpi(fig)
+    if VSM_POINTS * 0.85 * scale * dpi / DIAGRAM_DPI >= MIN_LABEL_POINTS:
+        for x, y, text, points in _vsm_labels(layout, geometry):
+            ax.text(x, y, text, ha="center", va="center", fontsize=points * scale, linespacing=LINE_EM, zorder=3)
+
+    artifact_path = path or artifacts_dir() / "vsm.png"
+    save_figure(fig, artifact_path, dpi)
     plt.close(fig)
     return artifact_path
+
+
+# Text-native backends -------------------------------------------------------------------
+
+
+def _xml(text: Any) -> str:
+    return escape(str(text), {'"': "&quot;"})
+
+
+def _svg_text(x: float, y: float, text: str, size: float, anchor: str = "middle", **attributes: str) -> str:
+    """SVG ``<text>`` with one ``<tspan>`` per line, vertically centred on ``y``."""
+
+    lines = text.split("\n")
+    extra = "".join(f' {name.replace("_", "-")}="{value}"' for name, value in attributes.items())
+    first = y - (len(lines) - 1) * size * 0.6
+    spans = "".join(
+        f'<tspan x="{x:.1f}" y="{first + i * size * 1.2:.1f}">{_xml(line)}</tspan>' for i, line in enumerate(lines)
+    )
+    return (
+        f'<text font-size="{size:.1f}" text-anchor="{anchor}" dominant-baseline="central"{extra}>{spans}</text>'
+    )
+
+
+def _svg_document(width: float, height: float, body: List[str]) -> str:
+    return "\n".join(
+        [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+            f'viewBox="0 0 {width:.1f} {height:.1f}" font-family="DejaVu Sans, Arial, sans-serif">',
+            "<defs>",
+            *(
+                f'<marker id="{name}" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="7" markerHeight="7" '
+                f'orient="auto"><path d="M0,0 L10,5 L0,10 z" fill="{colour}"/></marker>'
+                for name, colour in (("arrow", "#1f77b4"), ("rework", "#d62728"))
+            ),
+            "</defs>",
+            '<rect width="100%" height="100%" fill="white"/>',
+            *body,
+            "</svg>",
+            "",
+        ]
+    )
+
+
+def process_map_svg(process_map: Dict) -> str:
+    """SVG for a swimlane process map, with the same layout as the PNG and no matplotlib."""
+
+    graph, layout = map_layout(process_map)
+    if not len(graph):
+        raise ValueError("No steps found in process map definition.")
+    u = SVG_UNIT_PX
+    headroom = 0.8 if layout.back_edge.any() else 0.1
+    width = (COLUMN_WIDTH * layout.columns + LANE_LABEL_WIDTH) * u
+    height = (layout.rows + headroom) * u
+
+    body: List[str] = []
+    for lane, (top, rows) in enumerate(zip(layout.lane_top.tolist(), layout.lane_height.tolist())):
+        fill = "#f4f7fb" if lane % 2 == 0 else "white"
+        band_top = (headroom + top) * u
+        body.append(f'<rect x="0" y="{band_top:.1f}" width="{width:.1f}" height="{rows * u:.1f}" fill="{fill}"/>')
+        name = wrap_label(graph.lane_names[lane], 14)
+        centre = band_top + rows * u / 2
+        body.append(_svg_text(0.1 * u, centre, name, 13, "start", font_weight="bold", fill="#555555"))
+
+    box_width, box_height = (COLUMN_WIDTH - 2 * BOX_MARGIN) * u, (1 - 2 * BOX_MARGIN) * u
+    x = ((LANE_LABEL_WIDTH + layout.column * COLUMN_WIDTH + BOX_MARGIN) * u).tolist()
+    y = ((headroom + layout.row + BOX_MARGIN) * u).tolist()
+    back = layout.back_edge.tolist()
+    for edge_id, (source, target) in enumerate(zip(graph.sources.tolist(), graph.targets.tolist())):
+        if back[edge_id]:
+            # Rework loops arc over the boxes, from the top of a step back to an earlier one.
+            x0, x1 = x[source] + box_width / 2, x[target] + box_width / 2
+            lift = (0.4 + 0.1 * abs(int(layout.column[source]) - int(layout.column[target]))) * u
+            body.append(
+                f'<path d="M{x0:.1f},{y[source]:.1f} Q{(x0 + x1) / 2:.1f},{min(y[source], y[target]) - 2 * lift:.1f} '
+                f'{x1:.1f},{y[target]:.1f}" fill="none" stroke="#d62728" stroke-dasharray="5,4" '
+                f'marker-end="url(#rework)"/>'
+            )
+            continue
+        x0, y0 = x[source] + box_width, y[source] + box_height / 2
+        x1, y1 = x[target], y[target] + box_height / 2
+        body.append(
+            f'<line x1="{x0:.1f}" y1="{y0:.1f}" x2="{x1:.1f}" y2="{y1:.1f}" stroke="#1f77b4" '
+            f'marker-end="url(#arrow)"/>'
+        )
+        if note := graph.edges[edge_id].get("note"):
+            body.append(_svg_text((x0 + x1) / 2, (y0 + y1) / 2 - 8, wrap_label(note, 16, 1), 10, fill="#555555"))
+
+    for step, bx, by in zip(graph.steps, x, y):
+        body.append(
+            f'<rect x="{bx:.1f}" y="{by:.1f}" width="{box_width:.1f}" height="{box_height:.1f}" rx="6" '
+            f'fill="#e8f1fb" stroke="#1f77b4"/>'
+        )
+        body.append(_svg_text(bx + box_width / 2, by + box_height / 2, wrap_label(step.get("name", "Step"), LABEL_WIDTH), 12))
+    return _svg_document(width, height, body)
+
+
+def fishbone_svg(fishbone: Dict) -> str:
+    """SVG for a fishbone diagram, with the same layout as the PNG."""
+
+    layout = fishbone_layout(fishbone)
+    u = SVG_UNIT_PX
+    top = layout.height
+    x, y, box_width, box_height = layout.effect_box
+    body = [
+        f'<line x1="{x0 * u:.1f}" y1="{(top - y0) * u:.1f}" x2="{x1 * u:.1f}" y2="{(top - y1) * u:.1f}" '
+        f'stroke="{SEGMENT_STYLES[kind][0]}" stroke-width="{SEGMENT_STYLES[kind][1]:.1f}"/>'
+        for (x0, y0, x1, y1), kind in zip(layout.segments.tolist(), layout.segment_kind.tolist())
+    ]
+    body.append(
+        f'<rect x="{x * u:.1f}" y="{(top - y - box_height) * u:.1f}" width="{box_width * u:.1f}" '
+        f'height="{box_height * u:.1f}" rx="6" fill="#e8f1fb" stroke="#1f77b4"/>'
+    )
+    for label in layout.labels:
+        attributes = {"font_weight": "bold"} if label.kind in {"effect", "category"} else {}
+        if label.kind == "evidence":
+            attributes["fill"] = "#555555"
+        body.append(_svg_text(label.x * u, (top - label.y) * u, label.text, label.points, label.anchor, **attributes))
+    return _svg_document(layout.width * u, layout.height * u, body)
+
+
+def vsm_svg(vsm: Dict) -> str:
+    """SVG for a value stream map, with the same layout as the PNG."""
+
+    layout = _vsm_layout(vsm)
+    geometry = _vsm_geometry(layout)
+    u = SVG_UNIT_PX
+    width = layout.width * u
+    body: List[str] = []
+    for index, (top, label) in enumerate(layout.rows):
+        fill = "#f4f7fb" if index % 2 == 0 else "white"
+        band = f'<rect x="0" y="{top * u:.1f}" width="{width:.1f}" height="{VSM_ROW_HEIGHT * u:.1f}"'
+        body.append(f'{band} fill="{fill}"/>')
+        centre = (top + VSM_ROW_HEIGHT / 2) * u
+        body.append(_svg_text(0.1 * u, centre, label, 11, "start", font_weight="bold", fill="#555555"))
+    body.extend(
+        f'<line x1="{x0 * u:.1f}" y1="{y0 * u:.1f}" x2="{x1 * u:.1f}" y2="{y1 * u:.1f}" stroke="#333333"/>'
+        for x0, y0, x1, y1 in geometry["ladder"].tolist()
+    )
+    body.extend(
+        f'<line x1="{x0 * u:.1f}" y1="{y0 * u:.1f}" x2="{x1 * u:.1f}" y2="{y1 * u:.1f}" stroke="#1f77b4" '
+        f'marker-end="url(#arrow)"/>'
+        for x0, y0, x1, y1 in geometry["arrows"].tolist()
+    )
+    body.extend(
+        '<polygon points="' + " ".join(f"{px * u:.1f},{py * u:.1f}" for px, py in triangle) + '" '
+        'fill="#fff3bf" stroke="#8c6d1f"/>'
+        for triangle in geometry["triangles"].tolist()
+    )
+    fills, edges = _vsm_fills(layout)
+    boxes = zip(layout.x.tolist(), layout.y.tolist(), fills, edges, layout.bottleneck.tolist())
+    for bx, by, fill, edge, bottleneck in boxes:
+        body.append(
+            f'<rect x="{bx * u:.1f}" y="{by * u:.1f}" width="{VSM_BOX_WIDTH * u:.1f}" '
+            f'height="{VSM_BOX_HEIGHT * u:.1f}" fill="{fill}" stroke="{edge}" stroke-width="{2.5 if bottleneck else 1}"/>'
+        )
+    body.extend(_svg_text(x * u, y * u, text, points) for x, y, text, points in _vsm_labels(layout, geometry))
+    return _svg_document(width, layout.height * u, body)
+
+
+def _mermaid_text(text: Any) -> str:
+    return " ".join(str(text).split()).replace('"', "#quot;")
+
+
+def process_map_mermaid(process_map: Dict) -> str:
+    """Mermaid flowchart source: one subgraph per lane, rework loops as dotted links."""
+
+    graph = ProcessGraph.from_map(process_map)
+    if not len(graph):
+        raise ValueError("No steps found in process map definition.")
+    back = graph.back_edges().tolist()
+    lines = ["flowchart LR"]
+    members: Dict[int, List[int]] = {}
+    for position, lane in enumerate(graph.lane.tolist()):
+        members.setdefault(lane, []).append(position)
+    for lane, positions in members.items():
+        lines.append(f'  subgraph lane{lane}["{_mermaid_text(graph.lane_names[lane])}"]')
+        lines.extend(f'    n{p}["{_mermaid_text(graph.steps[p].get("name", "Step"))}"]' for p in positions)
+        lines.append("  end")
+    for edge_id, (source, target) in enumerate(zip(graph.sources.tolist(), graph.targets.tolist())):
+        arrow = "-.->" if back[edge_id] else "-->"
+        note = graph.edges[edge_id].get("note")
+        label = f'|"{_mermaid_text(note)}"|' if note else ""
+        lines.append(f"  n{source} {arrow}{label} n{target}")
+    return "\n".join(lines) + "\n"
+
+
+def _cause_tree(causes: Any, parent: str, depth: int = 0) -> Iterator[Tuple[str, str, str]]:
+    """``(node id, parent id, statement)`` for causes and their sub-causes, depth first."""
+
+    for position, cause in enumerate(causes or []):
+        if not isinstance(cause, dict):
+            cause = {"statement": cause}
+        node = f"{parent}_{position}"
+        yield node, parent, str(cause.get("statement", "Cause"))
+        if depth + 1 < MAX_DEPTH:
+            yield from _cause_tree(cause.get("causes"), node, depth + 1)
+
+
+def fishbone_mermaid(fishbone: Dict) -> str:
+    """Mermaid flowchart source with causes feeding categories feeding the effect."""
+
+    categories = fishbone.get("categories", [])
+    if not categories:
+        raise ValueError("Fishbone definition missing categories.")
+    lines = ["flowchart LR", f'  effect["{_mermaid_text(fishbone.get("effect", "Problem"))}"]']
+    for idx, category in enumerate(categories):
+        lines.append(f'  c{idx}["{_mermaid_text(category.get("name", "Category"))}"] --> effect')
+        for node, parent, statement in _cause_tree(category.get("causes"), f"c{idx}"):
+            lines.append(f'  {node}["{_mermaid_text(statement)}"] --> {parent}')
+    return "\n".join(lines) + "\n"
+
+
+def _vsm_members(families: List[str]) -> Dict[str, List[int]]:
+    members: Dict[str, List[int]] = {}
+    for position, family in enumerate(families):
+        members.setdefault(family, []).append(position)
+    return members
+
+
+def vsm_mermaid(vsm: Dict) -> str:
+    """Mermaid flowchart source: one subgraph per product family, stages in flow order."""
+
+    stages, families, summaries, bottleneck = _vsm_stages(vsm)
+    lines = [
+        "flowchart LR",
+        f"  classDef bottleneck stroke:{VSM_COLOURS['bottleneck']},stroke-width:3px",
+        f"  classDef over_takt fill:{VSM_COLOURS['over_takt']}",
+    ]
+    for index, (family, positions) in enumerate(_vsm_members(families).items()):
+        summary = _vsm_summary(family, summaries.get(family) or {}, vsm.get("name", "")).replace("\n", " · ")
+        lines.append(f'  subgraph f{index}["{_mermaid_text(summary)}"]')
+        for p in positions:
+            stage = stages[p]
+            label = (
+                f"{_mermaid_text(stage.get('name', 'Stage'))}<br/>CT {_minutes(stage.get('ct_min'))} min · "
+                f"WT {_minutes(stage.get('wt_min'))} min · WIP {_minutes(stage.get('wip'))}"
+            )
+            lines.append(f'    s{p}["{label}"]')
+        lines.append("  end")
+        lines.extend(f"  s{source} --> s{target}" for source, target in zip(positions, positions[1:]))
+    for p, stage in enumerate(stages):
+        if stage.get("over_takt"):
+            lines.append(f"  class s{p} over_takt")
+        if bottleneck[p]:
+            lines.append(f"  class s{p} bottleneck")
+    return "\n".join(lines) + "\n"
+
+
+def _dot_text(text: Any) -> str:
+    return " ".join(str(text).split()).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def process_map_dot(process_map: Dict) -> str:
+    """Graphviz DOT source: one cluster per lane, rework loops dashed and not constraining rank."""
+
+    graph = ProcessGraph.from_map(process_map)
+    if not len(graph):
+        raise ValueError("No steps found in process map definition.")
+    back = graph.back_edges().tolist()
+    lines = [
+        "digraph process_map {",
+        "  rankdir=LR;",
+        '  node [shape=box, style="rounded,filled", fillcolor="#e8f1fb", color="#1f77b4"];',
+        '  edge [color="#1f77b4"];',
+    ]
+    members: Dict[int, List[int]] = {}
+    for position, lane in enumerate(graph.lane.tolist()):
+        members.setdefault(lane, []).append(position)
+    for lane, positions in members.items():
+        lines.append(f'  subgraph cluster_{lane} {{ label="{_dot_text(graph.lane_names[lane])}";')
+        lines.extend(f'    n{p} [label="{_dot_text(graph.steps[p].get("name", "Step"))}"];' for p in positions)
+        lines.append("  }")
+    for edge_id, (source, target) in enumerate(zip(graph.sources.tolist(), graph.targets.tolist())):
+        attributes = ['style=dashed, color="#d62728", constraint=false'] if back[edge_id] else []
+        if note := graph.edges[edge_id].get("note"):
+            attributes.append(f'label="{_dot_text(note)}"')
+        suffix = f" [{', '.join(attributes)}]" if attributes else ""
+        lines.append(f"  n{source} -> n{target}{suffix};")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def fishbone_dot(fishbone: Dict) -> str:
+    """Graphviz DOT source with causes feeding categories feeding the effect, right to left."""
+
+    categories = fishbone.get("categories", [])
+    if not categories:
+        raise ValueError("Fishbone definition missing categories.")
+    lines = [
+        "digraph fishbone {",
+        "  rankdir=LR;",
+        '  node [shape=plaintext];',
+        f'  effect [shape=box, label="{_dot_text(fishbone.get("effect", "Problem"))}"];',
+    ]
+    for idx, category in enumerate(categories):
+        lines.append(f'  c{idx} [shape=box, style=rounded, label="{_dot_text(category.get("name", "Category"))}"];')
+        lines.append(f"  c{idx} -> effect;")
+        for node, parent, statement in _cause_tree(category.get("causes"), f"c{idx}"):
+            lines.append(f'  {node} [label="{_dot_text(statement)}"];')
+            lines.append(f"  {node} -> {parent};")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def vsm_dot(vsm: Dict) -> str:
+    """Graphviz DOT source: one cluster per product family, the bottleneck outlined in red."""
+
+    stages, families, summaries, bottleneck = _vsm_stages(vsm)
+    lines = [
+        "digraph vsm {",
+        "  rankdir=LR;",
+        f'  node [shape=box, style=filled, fillcolor="{VSM_COLOURS["box"]}", color="{VSM_COLOURS["edge"]}"];',
+        f'  edge [color="{VSM_COLOURS["edge"]}"];',
+    ]
+    for index, (family, positions) in enumerate(_vsm_members(families).items()):
+        summary = _vsm_summary(family, summaries.get(family) or {}, vsm.get("name", "")).split("\n")
+        title = "\\n".join(_dot_text(line) for line in summary)
+        lines.append(f'  subgraph cluster_{index} {{ label="{title}";')
+        for p in positions:
+            stage = stages[p]
+            label = "\\n".join(
+                [
+                    _dot_text(stage.get("name", "Stage")),
+                    f"CT {_minutes(stage.get('ct_min'))} min  WT {_minutes(stage.get('wt_min'))} min",
+                    f"WIP {_minutes(stage.get('wip'))}",
+                ]
+            )
+            attributes = [f'label="{label}"']
+            if bottleneck[p]:
+                attributes.append(f'color="{VSM_COLOURS["bottleneck"]}", penwidth=2.5')
+            if stage.get("over_takt"):
+                attributes.append(f'fillcolor="{VSM_COLOURS["over_takt"]}"')
+            lines.append(f"    s{p} [{', '.join(attributes)}];")
+        lines.append("  }")
+        lines.extend(f"  s{source} -> s{target};" for source, target in zip(positions, positions[1:]))
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+@dataclass(frozen=True)
+class DiagramRenderer:
+    """One output format for process maps, fishbones and value stream maps.
+
+    Text formats (``svg``, ``mermaid``, ``dot``) are produced directly as strings, without
+    matplotlib; ``png`` rasterises through matplotlib and is only used when asked for.
+    """
+
+    format: str
+    suffix: str
+    process_map: Callable[..., Any]
+    fishbone: Callable[..., Any]
+    vsm: Callable[..., Any]
+    text: bool = True
+
+    def render(self, kind: str, artifact: Dict, path: Path | None = None) -> Path:
+        """Write ``artifact`` (a ``process_map``, ``fishbone`` or ``vsm``) to ``path`` in this format."""
+
+        if kind not in DIAGRAM_KINDS:
+            raise ValueError(f"Unknown diagram kind {kind!r}; expected one of {', '.join(DIAGRAM_KINDS)}.")
+        path = path or artifacts_dir() / f"{kind}{self.suffix}"
+        draw = getattr(self, kind)
+        if not self.text:
+            return draw(artifact, path)
+        write_text(path, draw(artifact))
+        return path
+
+
+DIAGRAM_KINDS = ("process_map", "fishbone", "vsm")
+DIAGRAM_RENDERERS = {
+    renderer.format: renderer
+    for renderer in (
+        DiagramRenderer("svg", ".svg", process_map_svg, fishbone_svg, vsm_svg),
+        DiagramRenderer("mermaid", ".mmd", process_map_mermaid, fishbone_mermaid, vsm_mermaid),
+        DiagramRenderer("dot", ".dot", process_map_dot, fishbone_dot, vsm_dot),
+        DiagramRenderer("png", ".png", render_process_map, render_fishbone, render_vsm, text=False),
+    )
+}
+
+
+def get_diagram_renderer(fmt: str | None = None) -> DiagramRenderer:
+    """Return the renderer for ``fmt``, defaulting to ``CI_COACH_DIAGRAM_FORMAT`` (``svg``)."""
+
+    fmt = (fmt or os.getenv("CI_COACH_DIAGRAM_FORMAT", DEFAULT_DIAGRAM_FORMAT)).lower()
+    try:
+        return DIAGRAM_RENDERERS[fmt]
+    except KeyError:
+        raise ValueError(
+            f"Unknown diagram format {fmt!r}; expected one of {', '.join(DIAGRAM_RENDERERS)}."
+        ) from None
@@ -0,0 +1,120 @@
+"""Data reduction ahead of plotting, so chart render time does not grow with row count.
+
+Matplotlib's cost is proportional to the number of artists and vertices it draws, and a
+PNG a few hundred pixels wide cannot show more than a few thousand points anyway. These
+helpers reduce a column to what the chart actually needs, in vectorised numpy:
+
+* :func:`lttb` - Largest-Triangle-Three-Buckets selection for line (run) charts, which keeps
+  the visual shape of the series;
+* :func:`minmax_indices` - per-bucket minimum and maximum, for control charts where every
+  extreme point must stay visible against the limits;
+* :func:`binned_histogram` - bin counts from ``np.histogram`` instead of handing every value
+  to seaborn;
+* :func:`box_stats` - quartiles, whiskers and a bounded set of outliers for ``Axes.bxp``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+MAX_HISTOGRAM_BINS = 100
+MAX_FLIERS = 500
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Return the indices of ``n_out`` points chosen by Largest-Triangle-Three-Buckets.
+
+    ``x`` must be numeric and sorted. The first and last points are always kept; each
+    bucket in between contributes the point forming the largest triangle with the point
+    kept from the previous bucket and the mean of the next bucket.
+    """
+
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of each bucket, used as the third vertex for the bucket before it.
+    sums_x = np.add.reduceat(x[1 : n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1 : n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs(
+            (ax - mean_x[bucket + 1]) * (y[start:stop] - ay) - (ax - x[start:stop]) * (mean_y[bucket + 1] - ay)
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Return sorted indices of the minimum and maximum of ``n_out // 2`` equal buckets."""
+
+    n = len(y)
+    buckets = max(n_out // 2, 1)
+    if n <= n_out or n < buckets:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    size = n // buckets
+    body = y[: size * buckets].reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    picks = [offsets + np.nanargmin(body, axis=1), offsets + np.nanargmax(body, axis=1)]
+    if size * buckets < n:
+        tail = y[size * buckets :]
+        picks.append(np.array([size * buckets + np.nanargmin(tail), size * buckets + np.nanargmax(tail)]))
+    picks.append(np.array([0, n - 1]))
+    return np.unique(np.concatenate(picks))
+
+
+def binned_histogram(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(counts, edges)`` using the Freedman-Diaconis bin width, capped at 100 bins."""
+
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return np.zeros(0), np.zeros(1)
+    q1, q3 = np.percentile(values, [25, 75])
+    low, high = values.min(), values.max()
+    width = 2 * (q3 - q1) / np.cbrt(values.size)
+    bins = int(np.ceil((high - low) / width)) if width > 0 else 15
+    bins = int(np.clip(bins, 15, MAX_HISTOGRAM_BINS))
+    return np.histogram(values, bins=bins, range=(low, high) if high > low else None)
+
+
+def box_stats(values: np.ndarray, label: str = "") -> Dict[str, Any]:
+    """Return the ``Axes.bxp`` statistics of ``values`` with 1.5 IQR whiskers.
+
+    Quartiles come from one ``np.quantile`` call. Outliers are capped at 500: the most extreme
+    values on each side are kept and the rest are evenly thinned.
+    """
+
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    fliers = np.sort(values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)])
+    if fliers.size > MAX_FLIERS:
+        keep = np.unique(np.linspace(0, fliers.size - 1, MAX_FLIERS).astype(np.int64))
+        fliers = fliers[keep]
+    return {
+        "label": label,
+        "med": median,
+        "q1": q1,
+        "q3": q3,
+        "whislo": inside.min() if inside.size else q1,
+        "whishi": inside.max() if inside.size else q3,
+        "fliers": fliers,
+        "mean": values.mean(),
+    }
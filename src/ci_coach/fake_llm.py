@@ -0,0 +1,201 @@
+"""Deterministic offline chat model for benchmarks and end-to-end runs without network access.
+
+Select it with ``CI_COACH_LLM_PROVIDER=fake``. Each prompt is answered with a canned JSON body
+chosen from the system prompt of the calling node, after an optional simulated latency
+(``CI_COACH_FAKE_LATENCY_MS``), so the full graph, caching and streaming paths can be
+exercised without an API key.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from .router import match_rules
+
+CANNED_RESPONSES: Dict[str, Dict[str, Any]] = {
+    "Problem Statement Coach": {
+        "problem_statement": "Reduce raw material release lead time from 3.2 to 2.0 days by Q4.",
+        "metrics": [{"name": "Release lead time", "current": "3.2 days", "target": "2.0 days"}],
+        "scope": {"in_scope": ["QC release"], "out_of_scope": ["Supplier audits"]},
+        "ci_opportunities": [{"title": "Queue triage", "description": "Prioritise urgent lots."}],
+        "message": "Here is a SMART problem statement with a baseline and target.",
+    },
+    "Value Proposition Coach": {
+        "stakeholders": [{"name": "Production", "pain_points": ["Idle lines"], "desired_outcomes": ["On-time release"]}],
+        "impact": {"problem_impact": "Line stoppages", "opportunity_gain": "Higher OEE"},
+        "requirements": {"must_have": ["Traceability"], "nice_to_have": ["Dashboards"]},
+        "message": "Value proposition drafted for Production.",
+    },
+    "SIPOC Coach": {
+        "suppliers": ["Vendor"],
+        "inputs": ["Raw material", "CoA"],
+        "process_steps": ["Receive", "Sample", "Test", "Review", "Release"],
+        "outputs": ["Released lot"],
+        "customers": ["Production"],
+        "message": "SIPOC drafted with five steps.",
+    },
+    "Process Map Coach": {
+        "roles": [{"id": "r1", "name": "Warehouse"}, {"id": "r2", "name": "QC"}],
+        "steps": [
+            {"id": "s1", "name": "Receive lot", "role_id": "r1"},
+            {"id": "s2", "name": "Sample", "role_id": "r2"},
+            {"id": "s3", "name": "Test", "role_id": "r2"},
+            {"id": "s4", "name": "Release", "role_id": "r2"},
+        ],
+        "edges": [
+            {"from": "s1", "to": "s2"},
+            {"from": "s2", "to": "s3"},
+            {"from": "s3", "to": "s4", "note": "pass"},
+        ],
+        "systems": [{"name": "LIMS", "purpose": "Test results"}],
+        "message": "Process map drafted; the QC testing queue looks like the bottleneck.",
+    },
+    "Process Discovery Narrator": {
+        "message": "The mined map follows Receive, Sample, Test and Release; the Test to Retest loop is the "
+        "first place to look.",
+    },
+    "Fishbone Coach": {
+        "effect": "Slow material release",
+        "categories": [
+            {"name": "Methods", "causes": [{"statement": "No queue triage", "evidence": "FIFO only"}]},
+            {"name": "Machines", "causes": [{"statement": "HPLC downtime", "evidence": ""}]},
+        ],
+        "message": "Fishbone drafted; please share evidence for the Machines causes.",
+    },
+    "5-Whys Coach": {
+        "chains": [
+            {
+                "problem": "Lots wait for testing",
+                "whys": [
+                    {"level": 1, "statement": "Analysts are busy", "evidence": ""},
+                    {"level": 2, "statement": "Urgent lots are not prioritised", "evidence": ""},
+                    {"level": 3, "statement": "No triage rule exists", "evidence": ""},
+                ],
+            }
+        ],
+        "message": "One why-chain ending at a missing triage rule.",
+    },
+    "A3 Coach": {
+        "summary": "Cut release lead time with LIMS queue triage.",
+        "background": "Production delays due to QC release lag.",
+        "current_state": {"lead_time_days": 3.2},
+        "analysis": {"fishbone_ids": [], "why_chains": []},
+        "countermeasures": [{"id": "c1", "idea": "LIMS queue triage", "impact": "High", "effort": "Medium"}],
+        "plan": [{"task": "Implement triage", "owner": "QC Lead", "due": "2025-11-15"}],
+        "follow_up": [{"metric": "Lead time", "target": "-25%"}],
+        "message": "A3 composed from the captured artifacts.",
+    },
+    "Kaizen Coach": {
+        "backlog": [
+            {
+                "idea": "LIMS queue triage",
+                "owner": "QC Lead",
+                "impact": "High",
+                "effort": "Medium",
+                "due_date": "2025-11-15",
+                "pdsa_stage": "Plan",
+            }
+        ],
+        "pilot_plan": "Pilot triage on one product family for two weeks.",
+        "sustainment_plan": "Weekly review of lead time.",
+        "message": "Kaizen backlog drafted with one pilot.",
+    },
+    "Chart Planner": {
+        "dataset_name": "dataset_1",
+        "chart_type": "histogram",
+        "value_column": "cycle_time",
+        "title": "Cycle time distribution",
+        "message": "Here is the cycle time distribution.",
+    },
+}
+
+
+def canned_response(messages: List[BaseMessage]) -> str:
+    """Return the scripted JSON reply for a formatted node prompt."""
+
+    system = str(messages[0].content) if messages else ""
+    if "running summary" in system:
+        return "Summary: the team is working on QC release lead time."
+    if "Supervisor" in system:
+        latest = str(messages[-2].content) if len(messages) > 1 else ""
+        decision = match_rules(latest)
+        return json.dumps(
+            {
+                "next_node": decision.node if decision else "problem",
+                "assistant_message": "On it.",
+                "updated_intent": "Improve QC release lead time.",
+                "suggested_next": ["Map the process", "Build a fishbone", "Chart cycle times"],
+                "mode": "guided",
+            }
+        )
+    for marker, payload in CANNED_RESPONSES.items():
+        if marker in system:
+            return json.dumps(payload)
+    return json.dumps({"message": "Noted."})
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers every node prompt with canned JSON after a fixed latency."""
+
+    latency_s: float = 0.0
+    chunk_size: int = 16
+
+    @property
+    def _llm_type(self) -> str:
+        return "ci-coach-scripted"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=canned_response(messages)))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=canned_response(messages)))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        text = canned_response(messages)
+        for start in range(0, len(text), self.chunk_size):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[start : start + self.chunk_size]))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        text = canned_response(messages)
+        for start in range(0, len(text), self.chunk_size):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[start : start + self.chunk_size]))
@@ -0,0 +1,230 @@
+"""Fishbone (Ishikawa) layout: space-allocating bones, nested causes and measured labels.
+
+:func:`fishbone_layout` turns the ``fishbone`` JSON produced by the fishbone coach
+(``effect``, ``categories`` with ``causes``; a cause may carry its own ``causes`` as
+sub-causes) into geometry in inches, shared by the PNG and SVG backends:
+
+1. every cause becomes a row; its statement is wrapped and truncated to a few lines and its
+   evidence to one, and the row is as tall as its text;
+2. each category's bone is as long as its rows need, and as wide as its longest label, so a
+   category with thirty causes gets thirty rows of room instead of overlapping its neighbour;
+3. categories alternate above and below the spine, and each pair gets a slot along the
+   spine as wide as the wider of the two, running from the effect's head to the tail.
+
+Sub-causes hang off a stem parallel to the bone, one :data:`STEM_OFFSET` further out per
+level, down to :data:`MAX_DEPTH` levels. Text is measured from the character count and an
+average glyph width, which keeps the layout free of font lookups and matplotlib.
+"""
+
+from __future__ import annotations
+
+import textwrap
+from dataclasses import dataclass
+from typing import Any, List, Mapping, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+# Font sizes in points and text measurement, as fractions of the font size.
+EFFECT_POINTS = 11.0
+CATEGORY_POINTS = 10.0
+CAUSE_POINTS = 8.0
+EVIDENCE_POINTS = 7.0
+CHAR_EM = 0.55
+LINE_EM = 1.3
+# Wrapping: characters per line and lines per label.
+CAUSE_CHARS = 32
+CAUSE_LINES = 2
+EFFECT_CHARS = 18
+EFFECT_LINES = 4
+CATEGORY_CHARS = 22
+MAX_DEPTH = 3
+# Geometry in inches.
+SLANT = 0.45
+RIB_LENGTH = 0.3
+STEM_OFFSET = RIB_LENGTH / 2
+LABEL_GAP = 0.05
+ROW_GAP = 0.06
+BONE_START = 0.15
+SLOT_GAP = 0.3
+HEAD_GAP = 0.2
+MARGIN = 0.2
+
+# Segment kinds, indexing SEGMENT_STYLES: (colour, line width in points).
+SPINE, BONE, RIB, STEM = range(4)
+SEGMENT_STYLES = (("#1f77b4", 2.5), ("#1f77b4", 1.5), ("#4c78a8", 1.0), ("#4c78a8", 0.8))
+
+
+def wrap_label(text: Any, width: int, lines: int = 2) -> str:
+    """Wrap ``text`` to ``width`` characters, truncating with an ellipsis after ``lines`` lines."""
+
+    wrapped = textwrap.wrap(" ".join(str(text).split()), width) or [""]
+    if len(wrapped) > lines:
+        wrapped = wrapped[:lines]
+        wrapped[-1] = wrapped[-1][: width - 1] + "…"
+    return "\n".join(wrapped)
+
+
+def text_size(text: str, points: float) -> Tuple[float, float]:
+    """Approximate width and height of ``text`` in inches at ``points``."""
+
+    lines = text.split("\n")
+    return max(len(line) for line in lines) * points * CHAR_EM / 72, len(lines) * points * LINE_EM / 72
+
+
+class FishboneLabel(NamedTuple):
+    """A label anchored at ``(x, y)``: ``anchor`` is ``start``, ``middle`` or ``end``, ``y`` its centre."""
+
+    x: float
+    y: float
+    text: str
+    points: float
+    anchor: str
+    kind: str  # effect, category, cause or evidence
+
+
+@dataclass
+class FishboneLayout:
+    """Fishbone geometry in inches, y up, with the origin at the bottom-left corner."""
+
+    width: float
+    height: float
+    # One row per line, ``(x0, y0, x1, y1)``, with its kind (``SPINE``, ``BONE``, ...).
+    segments: np.ndarray
+    segment_kind: np.ndarray
+    labels: List[FishboneLabel]
+    # ``(x, y, width, height)`` of the effect's box at the head of the spine.
+    effect_box: Tuple[float, float, float, float]
+    causes: int = 0
+
+
+class _Row(NamedTuple):
+    depth: int
+    parent: int  # index of the parent row, -1 for causes on the bone
+    statement: str
+    evidence: str
+    height: float
+
+
+def _rows(causes: Sequence[Any], depth: int = 0, parent: int = -1, rows: List[_Row] | None = None) -> List[_Row]:
+    """Flatten causes and their sub-causes, depth first, into label rows."""
+
+    rows = [] if rows is None else rows
+    for cause in causes or []:
+        if not isinstance(cause, Mapping):
+            cause = {"statement": cause}
+        statement = wrap_label(cause.get("statement", "Cause"), CAUSE_CHARS, CAUSE_LINES)
+        evidence = cause.get("evidence")
+        evidence = wrap_label(f"Evidence: {evidence}", CAUSE_CHARS, 1) if evidence else ""
+        height = text_size(statement, CAUSE_POINTS)[1] + ROW_GAP
+        if evidence:
+            height += text_size(evidence, EVIDENCE_POINTS)[1]
+        rows.append(_Row(depth, parent, statement, evidence, height))
+        if depth + 1 < MAX_DEPTH:
+            _rows(cause.get("causes") or [], depth + 1, len(rows) - 1, rows)
+    return rows
+
+
+@dataclass
+class _Bone:
+    """One category laid out around its attachment point on the spine, y measured outward."""
+
+    name: str
+    name_height: float
+    rows: List[_Row]
+    centres: List[float]
+    length: float
+    # Extent left of the attachment point, and right of it (the category label can overhang).
+    left: float
+    right: float
+
+
+def _bone(category: Mapping[str, Any], position: int) -> _Bone:
+    name = wrap_label(category.get("name", f"Category {position + 1}"), CATEGORY_CHARS, 2)
+    rows = _rows(category.get("causes") or [])
+    centres, offset = [], BONE_START
+    for row in rows:
+        centres.append(offset + row.height / 2)
+        offset += row.height
+    length = offset + ROW_GAP
+    name_width, name_height = text_size(name, CATEGORY_POINTS)
+    left = SLANT * length + name_width / 2
+    for row, centre in zip(rows, centres):
+        label_width = max(text_size(row.statement, CAUSE_POINTS)[0], text_size(row.evidence, EVIDENCE_POINTS)[0])
+        left = max(left, SLANT * centre + row.depth * STEM_OFFSET + RIB_LENGTH + LABEL_GAP + label_width)
+    return _Bone(name, name_height, rows, centres, length, left, max(0.0, name_width / 2 - SLANT * length))
+
+
+def fishbone_layout(fishbone: Mapping[str, Any]) -> FishboneLayout:
+    """Lay out ``fishbone``: bones sized by their causes, alternating above and below the spine."""
+
+    categories = [category for category in fishbone.get("categories") or [] if isinstance(category, Mapping)]
+    if not categories:
+        raise ValueError("Fishbone definition missing categories.")
+    bones = [_bone(category, position) for position, category in enumerate(categories)]
+
+    effect = wrap_label(fishbone.get("effect", "Problem"), EFFECT_CHARS, EFFECT_LINES)
+    effect_width, effect_height = text_size(effect, EFFECT_POINTS)
+    effect_width, effect_height = effect_width + 0.3, effect_height + 0.2
+
+    # Attachment points along the spine, from the head towards the tail; y = 0 is the spine.
+    attach: List[float] = []
+    x = -HEAD_GAP
+    for slot in range(0, len(bones), 2):
+        pair = bones[slot : slot + 2]
+        x -= max(bone.right for bone in pair)
+        attach.extend([x] * len(pair))
+        x -= max(bone.left for bone in pair) + SLOT_GAP
+
+    segments: List[Tuple[float, float, float, float]] = []
+    kinds: List[int] = []
+    labels: List[FishboneLabel] = []
+    for index, (bone, xa) in enumerate(zip(bones, attach)):
+        side = 1 if index % 2 == 0 else -1
+        tip_x, tip_y = xa - SLANT * bone.length, side * (bone.length + bone.name_height / 2)
+        segments.append((xa, 0.0, tip_x, side * bone.length))
+        kinds.append(BONE)
+        labels.append(FishboneLabel(tip_x, tip_y, bone.name, CATEGORY_POINTS, "middle", "category"))
+        # Evidence sits under its statement on either side of the spine, so each rib is
+        # centred on its statement rather than on the whole row.
+        statement_heights = [text_size(row.statement, CAUSE_POINTS)[1] for row in bone.rows]
+        ribs = [
+            side * centre + (row.height - ROW_GAP - statement_height) / 2
+            for row, centre, statement_height in zip(bone.rows, bone.centres, statement_heights)
+        ]
+        for row_index, (row, centre, rib) in enumerate(zip(bone.rows, bone.centres, ribs)):
+            # Ribs start on the bone (depth 0) or on their parent's stem, parallel to the bone.
+            anchor = xa - SLANT * centre - row.depth * STEM_OFFSET
+            segments.append((anchor - RIB_LENGTH, rib, anchor, rib))
+            kinds.append(RIB)
+            text_x = anchor - RIB_LENGTH - LABEL_GAP
+            labels.append(FishboneLabel(text_x, rib, row.statement, CAUSE_POINTS, "end", "cause"))
+            if row.evidence:
+                evidence_y = rib - (row.height - ROW_GAP) / 2
+                labels.append(FishboneLabel(text_x, evidence_y, row.evidence, EVIDENCE_POINTS, "end", "evidence"))
+            children = [child for child in range(row_index + 1, len(bone.rows)) if bone.rows[child].parent == row_index]
+            if children:
+                stem = (row.depth + 1) * STEM_OFFSET
+                last = children[-1]
+                segments.append(
+                    (xa - SLANT * centre - stem, rib, xa - SLANT * bone.centres[last] - stem, ribs[last])
+                )
+                kinds.append(STEM)
+
+    tail = min(x + SLOT_GAP, -HEAD_GAP)
+    segments.append((tail, 0.0, 0.0, 0.0))
+    kinds.append(SPINE)
+    labels.append(FishboneLabel(effect_width / 2, 0.0, effect, EFFECT_POINTS, "middle", "effect"))
+
+    above = max([effect_height / 2] + [bone.length + bone.name_height for bone in bones[0::2]])
+    below = max([effect_height / 2] + [bone.length + bone.name_height for bone in bones[1::2]])
+    shift_x, shift_y = MARGIN - tail, MARGIN + below
+    array = np.array(segments, dtype=float) + np.array([shift_x, shift_y, shift_x, shift_y])
+    return FishboneLayout(
+        width=shift_x + effect_width + MARGIN,
+        height=above + below + 2 * MARGIN,
+        segments=array,
+        segment_kind=np.array(kinds, dtype=np.int8),
+        labels=[label._replace(x=label.x + shift_x, y=label.y + shift_y) for label in labels],
+        effect_box=(shift_x, shift_y - effect_height / 2, effect_width, effect_height),
+        causes=sum(len(bone.rows) for bone in bones),
+    )
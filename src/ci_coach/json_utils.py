@@ -36,3 +36,92 @@ def extract_json(response: str) -> Dict[str, Any]:
         raise ValueError(
             f"Failed to decode JSON from response snippet. Original response: {response}"
         ) from exc
+
+
+_SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class MessageFieldStreamer:
+    """Incrementally extract one top-level string field from streamed JSON.
+
+    Coach replies are JSON objects whose ``message`` field is the user-facing text. ``feed``
+    accepts raw chunks as they arrive and returns the newly decoded characters of that field,
+    so the text can be shown before the object is complete. Text before the opening brace
+    (for example a code fence) is ignored; the structured fields are parsed separately with
+    ``extract_json`` once the response has finished.
+    """
+
+    def __init__(self, field: str = "message") -> None:
+        self.field = field
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = ""
+        self._expect_key = False
+        self._token: list[str] = []
+        self._last_key: str | None = None
+        self._capturing = False
+        self._high_surrogate = ""
+
+    def feed(self, chunk: str) -> str:
+        emitted: list[str] = []
+        for char in chunk:
+            if self._in_string:
+                self._consume_string_char(char, emitted)
+            elif char == '"':
+                self._in_string = True
+                self._token = []
+                self._capturing = (
+                    not self.done
+                    and self._depth == 1
+                    and not self._expect_key
+                    and self._last_key == self.field
+                )
+            elif char in "{[":
+                self._depth += 1
+                self._expect_key = char == "{" and self._depth == 1
+            elif char in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and char == ",":
+                self._expect_key = True
+            elif self._depth == 1 and char == ":":
+                self._expect_key = False
+        return "".join(emitted)
+
+    def _consume_string_char(self, char: str, emitted: list[str]) -> None:
+        if self._escape:
+            self._escape += char
+            if self._escape[1] == "u" and len(self._escape) < 6:
+                return
+            if self._escape[1] == "u":
+                decoded = chr(int(self._escape[2:], 16))
+                if 0xD800 <= ord(decoded) <= 0xDBFF:
+                    # Wait for the low half of a surrogate pair before emitting.
+                    self._high_surrogate = decoded
+                    self._escape = ""
+                    return
+                if self._high_surrogate:
+                    pair = (self._high_surrogate + decoded).encode("utf-16", "surrogatepass")
+                    decoded = pair.decode("utf-16")
+                    self._high_surrogate = ""
+            else:
+                decoded = _SIMPLE_ESCAPES.get(self._escape[1], self._escape[1])
+            self._escape = ""
+            self._emit(decoded, emitted)
+        elif char == "\\":
+            self._escape = char
+        elif char == '"':
+            self._in_string = False
+            if self._capturing:
+                self._capturing = False
+                self.done = True
+            elif self._depth == 1 and self._expect_key:
+                self._last_key = "".join(self._token)
+        else:
+            self._emit(char, emitted)
+
+    def _emit(self, text: str, emitted: list[str]) -> None:
+        if self._capturing:
+            emitted.append(text)
+        elif self._depth == 1 and self._expect_key:
+            self._token.append(text)
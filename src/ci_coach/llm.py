@@ -3,23 +3,174 @@
 from __future__ import annotations
 
 import os
-from functools import lru_cache
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, Tuple
 
-from langchain_openai import ChatOpenAI
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
 
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
 
-@lru_cache(maxsize=1)
-def get_llm(model: str | None = None, temperature: float = 0.1) -> ChatOpenAI:
-    """Return a shared ``ChatOpenAI`` instance configured from environment variables."""
+ClientKey = Tuple[str, float, str]
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class LLMRegistry:
+    """Keep one long-lived ``ChatOpenAI`` client per (model, temperature, node).
+
+    All clients share a single ``httpx`` connection pool so keep-alive connections are reused
+    across the Supervisor and every coach. The model for a node can be overridden with a
+    ``CI_COACH_MODEL_<NODE>`` environment variable (for example ``CI_COACH_MODEL_SUPERVISOR``),
+    falling back to ``CI_COACH_MODEL`` and then ``gpt-4o-mini``.
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[ClientKey, BaseChatModel] = {}
+        self._lock = threading.Lock()
+        self._http_client: httpx.Client | None = None
+        self._async_http_client: httpx.AsyncClient | None = None
+        self.created: Counter[ClientKey] = Counter()
+        self.lookups = 0
+        self.warmed_up = False
+
+    @staticmethod
+    def model_for(node: str | None = None) -> str:
+        """Return the configured model name for ``node``."""
+
+        if node:
+            override = os.getenv(f"CI_COACH_MODEL_{node.upper()}")
+            if override:
+                return override
+        return os.getenv("CI_COACH_MODEL", DEFAULT_MODEL)
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise EnvironmentError(
-            "OPENAI_API_KEY environment variable is required to run the CI Coach."
+    @staticmethod
+    def _http_limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=_env_int("CI_COACH_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=_env_int("CI_COACH_HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=float(_env_int("CI_COACH_HTTP_KEEPALIVE_SECONDS", 120)),
         )
 
-    return ChatOpenAI(
-        api_key=api_key,
-        model=model or os.getenv("CI_COACH_MODEL", "gpt-4o-mini"),
-        temperature=temperature,
-    )
+    def _shared_http_client(self) -> httpx.Client:
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                limits=self._http_limits(), timeout=httpx.Timeout(60.0, connect=10.0)
+            )
+        return self._http_client
+
+    def _shared_async_http_client(self) -> httpx.AsyncClient:
+        # Used by ``ainvoke``/``astream``; pooled connections belong to the loop that opened them.
+        if self._async_http_client is None:
+            self._async_http_client = httpx.AsyncClient(
+                limits=self._http_limits(), timeout=httpx.Timeout(60.0, connect=10.0)
+            )
+        return self._async_http_client
+
+    def get(
+        self,
+        node: str | None = None,
+        temperature: float = 0.1,
+        model: str | None = None,
+    ) -> BaseChatModel:
+        """Return the shared client for ``node``, creating it on first use."""
+
+        model = model or self.model_for(node)
+        key: ClientKey = (model, float(temperature), node or "default")
+        with self._lock:
+            self.lookups += 1
+            client = self._clients.get(key)
+            if client is None:
+                client = self._create(model, temperature)
+                self._clients[key] = client
+                self.created[key] += 1
+        return client
+
+    def _create(self, model: str, temperature: float) -> BaseChatModel:
+        if os.getenv("CI_COACH_LLM_PROVIDER", "openai").lower() == "fake":
+            from .fake_llm import ScriptedChatModel
+
+            latency_ms = float(os.getenv("CI_COACH_FAKE_LATENCY_MS", "0"))
+            return ScriptedChatModel(latency_s=latency_ms / 1000)
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise EnvironmentError(
+                "OPENAI_API_KEY environment variable is required to run the CI Coach."
+            )
+
+        # langchain_openai (and the openai SDK) take about a second to import; offline and
+        # replay sessions never need them.
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            api_key=api_key,
+            model=model,
+            temperature=temperature,
+            http_client=self._shared_http_client(),
+            http_async_client=self._shared_async_http_client(),
+        )
+
+    def warm_up(self, nodes: Iterable[Tuple[str, float]]) -> None:
+        """Create clients for ``(node, temperature)`` pairs and open a pooled connection.
+
+        Intended to run at startup, typically on a background thread, so the first turn does
+        not pay for client construction or the TLS handshake.
+        """
+
+        for node, temperature in nodes:
+            self.get(node=node, temperature=temperature)
+        base_url = os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+        try:
+            self._shared_http_client().get(
+                f"{base_url}/models",
+                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}"},
+            )
+        except httpx.HTTPError:
+            return
+        self.warmed_up = True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return client creation counts and lookup totals."""
+
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "lookups": self.lookups,
+                "created": {
+                    f"{node}:{model}@{temperature}": count
+                    for (model, temperature, node), count in self.created.items()
+                },
+                "warmed_up": self.warmed_up,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+            # The async pool cannot be closed synchronously; drop it with the clients.
+            self._async_http_client = None
+
+
+_REGISTRY = LLMRegistry()
+
+
+def get_registry() -> LLMRegistry:
+    """Return the process-wide client registry."""
+
+    return _REGISTRY
+
+
+def get_llm(
+    model: str | None = None, temperature: float = 0.1, node: str | None = None
+) -> BaseChatModel:
+    """Return a shared ``ChatOpenAI`` instance configured from environment variables."""
+
+    return _REGISTRY.get(node=node, temperature=temperature, model=model)
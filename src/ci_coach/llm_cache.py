@@ -0,0 +1,267 @@
+"""Persistent, content-addressed cache for LLM responses."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Sequence
+
+from langchain.schema import BaseMessage
+
+CACHE_MODES = {"off", "readwrite", "replay"}
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+def prompt_key(messages: Sequence[BaseMessage], model: str, temperature: float) -> str:
+    """Return the content hash identifying a formatted prompt for ``model``/``temperature``."""
+
+    payload = {
+        "model": model,
+        "temperature": float(temperature),
+        "messages": [{"type": m.type, "content": m.content} for m in messages],
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-backed response cache with TTL and size-based LRU eviction.
+
+    ``mode`` is ``readwrite`` (serve hits, store misses), ``replay`` (serve hits, raise
+    ``CacheMissError`` on a miss so sessions can run fully offline) or ``off``. Calls with a
+    temperature above zero are not deterministic: in ``readwrite`` mode they skip the lookup
+    unless ``cache_sampled`` is set, but their responses are still stored, so a recorded
+    session can be replayed. Replay mode always serves them from the cache.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        mode: str = "readwrite",
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float | None = 7 * 24 * 3600,
+        cache_sampled: bool = False,
+    ) -> None:
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unsupported cache mode {mode!r}. Expected one of {sorted(CACHE_MODES)}.")
+        self.path = Path(path)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_sampled = cache_sampled
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._total_bytes = 0
+
+    @classmethod
+    def from_env(cls) -> "LLMResponseCache":
+        """Build a cache from the ``CI_COACH_LLM_CACHE*`` environment variables."""
+
+        default_path = Path(os.getenv("CI_COACH_ARTIFACTS", "artifacts")) / "llm_cache.sqlite"
+        ttl = os.getenv("CI_COACH_LLM_CACHE_TTL_SECONDS")
+        return cls(
+            path=os.getenv("CI_COACH_LLM_CACHE", str(default_path)),
+            mode=os.getenv("CI_COACH_LLM_CACHE_MODE", "readwrite").lower(),
+            max_bytes=int(float(os.getenv("CI_COACH_LLM_CACHE_MAX_MB", "64")) * 1024 * 1024),
+            ttl_seconds=float(ttl) if ttl else 7 * 24 * 3600,
+            cache_sampled=os.getenv("CI_COACH_LLM_CACHE_SAMPLED", "").lower() in {"1", "true", "yes", "on"},
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _serves(self, temperature: float) -> bool:
+        """Whether a call at ``temperature`` may be answered from the cache."""
+
+        return self.mode == "replay" or temperature <= 0 or self.cache_sampled
+
+    def complete(
+        self,
+        messages: Sequence[BaseMessage],
+        model: str,
+        temperature: float,
+        call: Callable[[], str],
+    ) -> str:
+        """Return the cached response for the prompt, or run ``call`` and store its result."""
+
+        if self.mode == "off":
+            self.bypassed += 1
+            return call()
+
+        key = prompt_key(messages, model, temperature)
+        if self._serves(temperature):
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            if self.mode == "replay":
+                raise CacheMissError(
+                    f"No cached {model} response for prompt {key[:12]}; replay mode does not call the LLM."
+                )
+        else:
+            self.bypassed += 1
+        content = call()
+        self.put(key, model, content)
+        return content
+
+    async def acomplete(
+        self,
+        messages: Sequence[BaseMessage],
+        model: str,
+        temperature: float,
+        call: Callable[[], Awaitable[str]],
+    ) -> str:
+        """Async variant of :meth:`complete`; only the LLM call is awaited.
+
+        Lookups are single-row SQLite reads on a local file and stay on the event loop.
+        """
+
+        if self.mode == "off":
+            self.bypassed += 1
+            return await call()
+
+        key = prompt_key(messages, model, temperature)
+        if self._serves(temperature):
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            if self.mode == "replay":
+                raise CacheMissError(
+                    f"No cached {model} response for prompt {key[:12]}; replay mode does not call the LLM."
+                )
+        else:
+            self.bypassed += 1
+        content = await call()
+        self.put(key, model, content)
+        return content
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT content, created_at, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._total_bytes -= row[2]
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, content: str) -> None:
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            conn = self._connection()
+            previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, size, now, now),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds is not None:
+            cutoff = now - self.ttl_seconds
+            count, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses WHERE created_at < ?",
+                (cutoff,),
+            ).fetchone()
+            if count:
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+                self._total_bytes -= size
+                self.evictions += count
+        while self._total_bytes > self.max_bytes:
+            oldest = conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                self._total_bytes = 0
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (oldest[0],))
+            self._total_bytes -= oldest[1]
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current on-disk footprint."""
+
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes": self._total_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_CACHE: LLMResponseCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_response_cache() -> LLMResponseCache:
+    """Return the process-wide response cache, configured from the environment on first use."""
+
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = LLMResponseCache.from_env()
+        return _CACHE
+
+
+def set_response_cache(cache: LLMResponseCache) -> None:
+    """Replace the process-wide response cache (used by the CLI flags)."""
+
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is not None and _CACHE is not cache:
+            _CACHE.close()
+        _CACHE = cache
@@ -0,0 +1,262 @@
+"""Durable session checkpoints in SQLite.
+
+Each saved turn appends one checkpoint row per session. Most rows are *deltas*: the
+messages, audit entries, charts and diagrams appended since the previous checkpoint plus
+any other field whose content changed. Every ``snapshot_every`` checkpoints a full
+*snapshot* is written instead, so resuming reads the latest snapshot and at most
+``snapshot_every - 1`` deltas rather than the whole log. Older rows are compacted away as
+new snapshots land.
+
+Datasets are referenced by handle; their data lives in the content-addressed
+:mod:`ci_coach.dataset_store`, so checkpoints stay small and lossless.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .artifacts import default_artifacts_dir
+from .conversation import content_hash
+from .state import CIState
+
+# Fields that only ever grow during a session; deltas store just the new tail.
+APPEND_ONLY_FIELDS = ("messages", "audit_log", "charts", "diagrams")
+DEFAULT_SNAPSHOT_EVERY = 20
+
+
+@dataclass
+class _Tracked:
+    """What the store last wrote for a session, used to compute the next delta."""
+
+    seq: int = 0
+    since_snapshot: int = 0
+    lengths: Dict[str, int] = field(default_factory=dict)
+    hashes: Dict[str, str] = field(default_factory=dict)
+
+
+class SessionCheckpointer:
+    """Append-only SQLite checkpoint log for CI Coach sessions."""
+
+    def __init__(self, path: Path | str, snapshot_every: int = DEFAULT_SNAPSHOT_EVERY) -> None:
+        if snapshot_every < 1:
+            raise ValueError("snapshot_every must be at least 1.")
+        self.path = Path(path)
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._tracked: Dict[str, _Tracked] = {}
+
+    @classmethod
+    def from_env(cls) -> "SessionCheckpointer":
+        """Build a checkpointer from ``CI_COACH_SESSION_DB`` and ``CI_COACH_SNAPSHOT_EVERY``."""
+
+        return cls(
+            os.getenv("CI_COACH_SESSION_DB", str(default_artifacts_dir() / "sessions.sqlite")),
+            snapshot_every=int(os.getenv("CI_COACH_SNAPSHOT_EVERY", DEFAULT_SNAPSHOT_EVERY)),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (session_id, seq)
+                );
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def save(self, session_id: str, state: CIState) -> int:
+        """Checkpoint ``state`` and return the checkpoint sequence number.
+
+        Writes nothing (and returns the previous sequence number) when the state is
+        unchanged since the last checkpoint.
+        """
+
+        with self._lock:
+            conn = self._connection()
+            tracked = self._tracked.get(session_id)
+            if tracked is None:
+                tracked = self._tracked[session_id] = self._restore_tracking(conn, session_id)
+
+            data = state.to_dict()
+            hashes = {
+                name: content_hash(value)
+                for name, value in data.items()
+                if name not in APPEND_ONLY_FIELDS
+            }
+            lengths = {name: len(data[name]) for name in APPEND_ONLY_FIELDS}
+
+            snapshot = (
+                tracked.seq == 0
+                or tracked.since_snapshot + 1 >= self.snapshot_every
+                or any(lengths[name] < tracked.lengths.get(name, 0) for name in APPEND_ONLY_FIELDS)
+            )
+            if snapshot:
+                payload: Dict[str, Any] = {"set": data}
+            else:
+                payload = {
+                    "append": {
+                        name: data[name][tracked.lengths.get(name, 0) :]
+                        for name in APPEND_ONLY_FIELDS
+                        if lengths[name] > tracked.lengths.get(name, 0)
+                    },
+                    "set": {
+                        name: data[name]
+                        for name, digest in hashes.items()
+                        if tracked.hashes.get(name) != digest
+                    },
+                }
+                if not any(payload.values()):
+                    return tracked.seq
+
+            seq = tracked.seq + 1
+            conn.execute(
+                "INSERT INTO checkpoints (session_id, seq, kind, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    session_id,
+                    seq,
+                    "snapshot" if snapshot else "delta",
+                    json.dumps(payload, default=str, ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+            if snapshot:
+                self._compact(conn, session_id, seq)
+            conn.commit()
+
+            tracked.seq = seq
+            tracked.since_snapshot = 0 if snapshot else tracked.since_snapshot + 1
+            tracked.lengths = lengths
+            tracked.hashes = hashes
+            return seq
+
+    def load(self, session_id: str) -> CIState | None:
+        """Rebuild a session from its latest snapshot plus the deltas written after it."""
+
+        with self._lock:
+            conn = self._connection()
+            rows = self._rows_since_snapshot(conn, session_id)
+            if not rows:
+                return None
+            data: Dict[str, Any] = {}
+            for _, _, payload in rows:
+                change = json.loads(payload)
+                data.update(change.get("set", {}))
+                for name, items in change.get("append", {}).items():
+                    data[name] = [*data.get(name, []), *items]
+            state = CIState.from_dict(data)
+            self._tracked[session_id] = self._tracking_for(state, rows)
+            return state
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM checkpoints WHERE session_id = ?", (session_id,))
+            conn.commit()
+            self._tracked.pop(session_id, None)
+
+    def release(self, session_id: str) -> None:
+        """Forget the in-memory write tracking for a session that is no longer loaded."""
+
+        with self._lock:
+            self._tracked.pop(session_id, None)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM checkpoints WHERE session_id = ? LIMIT 1", (session_id,)
+            ).fetchone()
+            return row is not None
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        """Return every stored session with its checkpoint count and last update time."""
+
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT session_id, MAX(seq), COUNT(*), MAX(created_at) FROM checkpoints "
+                "GROUP BY session_id ORDER BY MAX(created_at) DESC"
+            ).fetchall()
+        return [
+            {"session_id": sid, "seq": seq, "checkpoints": count, "updated_at": updated}
+            for sid, seq, count, updated in rows
+        ]
+
+    def compact(self, session_id: str | None = None) -> int:
+        """Drop checkpoints older than each session's latest snapshot; return rows removed."""
+
+        with self._lock:
+            conn = self._connection()
+            if session_id is None:
+                targets = [row[0] for row in conn.execute("SELECT DISTINCT session_id FROM checkpoints")]
+            else:
+                targets = [session_id]
+            before = conn.total_changes
+            for target in targets:
+                latest = conn.execute(
+                    "SELECT MAX(seq) FROM checkpoints WHERE session_id = ? AND kind = 'snapshot'",
+                    (target,),
+                ).fetchone()[0]
+                if latest is not None:
+                    self._compact(conn, target, latest)
+            conn.commit()
+            return conn.total_changes - before
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _compact(self, conn: sqlite3.Connection, session_id: str, snapshot_seq: int) -> None:
+        conn.execute(
+            "DELETE FROM checkpoints WHERE session_id = ? AND seq < ?", (session_id, snapshot_seq)
+        )
+
+    @staticmethod
+    def _rows_since_snapshot(conn: sqlite3.Connection, session_id: str) -> List[Tuple[int, str, str]]:
+        return conn.execute(
+            "SELECT seq, kind, payload FROM checkpoints WHERE session_id = ? AND seq >= "
+            "(SELECT COALESCE(MAX(seq), 0) FROM checkpoints WHERE session_id = ? AND kind = 'snapshot') "
+            "ORDER BY seq",
+            (session_id, session_id),
+        ).fetchall()
+
+    def _restore_tracking(self, conn: sqlite3.Connection, session_id: str) -> _Tracked:
+        # A session saved by an earlier process: continue its sequence but start with a
+        # snapshot, since the in-memory view of what was written is gone.
+        seq = conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM checkpoints WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        return _Tracked(seq=seq, since_snapshot=self.snapshot_every)
+
+    @staticmethod
+    def _tracking_for(state: CIState, rows: List[Tuple[int, str, str]]) -> _Tracked:
+        data = state.to_dict()
+        return _Tracked(
+            seq=rows[-1][0],
+            since_snapshot=len(rows) - 1,
+            lengths={name: len(data[name]) for name in APPEND_ONLY_FIELDS},
+            hashes={
+                name: content_hash(value)
+                for name, value in data.items()
+                if name not in APPEND_ONLY_FIELDS
+            },
+        )
+
@@ -0,0 +1,77 @@
+"""Turn execution policy for the CI Coach graph."""
+
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+# Each chained hop costs one Supervisor call plus one coach call.
+LLM_CALLS_PER_HOP = 2
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+
+@dataclass(frozen=True)
+class TurnPolicy:
+    """Limits on how much graph work a single user turn may trigger.
+
+    By default a turn runs the Supervisor once and hands off to exactly one coach. Setting
+    ``chain_coaches`` lets the Supervisor route to further coaches within the same turn until
+    it answers ``idle`` or the hop/LLM-call budget is spent.
+    """
+
+    chain_coaches: bool = False
+    max_hops: int = 1
+    max_llm_calls: int = LLM_CALLS_PER_HOP
+
+    def __post_init__(self) -> None:
+        if self.max_hops < 1:
+            raise ValueError("max_hops must be at least 1.")
+        if self.max_llm_calls < LLM_CALLS_PER_HOP:
+            raise ValueError(
+                f"max_llm_calls must allow at least one Supervisor and one coach call ({LLM_CALLS_PER_HOP})."
+            )
+
+    @property
+    def mode(self) -> str:
+        return "chain" if self.chain_coaches else "single"
+
+    @classmethod
+    def chained(cls, max_hops: int = 3, max_llm_calls: int | None = None) -> "TurnPolicy":
+        """Return a multi-hop policy with a budget sized for ``max_hops`` coaches."""
+
+        return cls(
+            chain_coaches=True,
+            max_hops=max_hops,
+            max_llm_calls=max_llm_calls or max_hops * LLM_CALLS_PER_HOP,
+        )
+
+    @classmethod
+    def from_env(cls) -> "TurnPolicy":
+        """Build a policy from ``CI_COACH_CHAIN_COACHES``/``CI_COACH_MAX_HOPS``/``CI_COACH_MAX_LLM_CALLS``."""
+
+        if os.getenv("CI_COACH_CHAIN_COACHES", "").lower() not in _TRUTHY:
+            return cls()
+        max_hops = int(os.getenv("CI_COACH_MAX_HOPS", "3"))
+        max_llm_calls = os.getenv("CI_COACH_MAX_LLM_CALLS")
+        return cls.chained(max_hops, int(max_llm_calls) if max_llm_calls else None)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any] | None) -> "TurnPolicy":
+        return cls(**data) if data else cls()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def can_call_llm(self, llm_calls: int) -> bool:
+        """Return ``True`` if another LLM call fits in the turn budget."""
+
+        return llm_calls < self.max_llm_calls
+
+    def can_chain(self, hops: int, llm_calls: int) -> bool:
+        """Return ``True`` if the turn may go back to the Supervisor for another coach."""
+
+        if not self.chain_coaches or hops >= self.max_hops:
+            return False
+        return llm_calls + LLM_CALLS_PER_HOP <= self.max_llm_calls
@@ -0,0 +1,280 @@
+"""Indexed process-map graph and layered swimlane layout.
+
+:class:`ProcessGraph` indexes the ``process_map`` JSON produced by the process map coach
+(``roles``, ``steps`` with ``role_id``, ``edges`` with ``from``/``to``): step ids map to
+positions, edges become integer arrays plus adjacency lists, and every role is a lane.
+
+:func:`layered_layout` places the steps in the Sugiyama style, adapted to swimlanes:
+
+1. rework loops are found with a depth-first search and set aside as back edges, so the rest
+   of the map is acyclic;
+2. each step's column is its longest-path distance from the start, so parallel branches share
+   columns instead of the map growing one column per step;
+3. each lane is as tall as its busiest column, and steps sharing a lane and column are
+   ordered by the barycentre of their neighbours over a few alternating sweeps, which removes
+   most edge crossings.
+
+Everything after graph construction is linear in steps plus edges, and the sweeps are
+vectorised, so maps with thousands of steps lay out in milliseconds.
+
+Coaches often redraft a map with only step names or notes edited. :func:`map_layout` keeps
+the layouts of recent drafts keyed by their structure (lanes, step ids and roles, edge
+endpoints), so such drafts are redrawn without being laid out again.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Mapping, Tuple
+
+import numpy as np
+
+UNASSIGNED_LANE = "Unassigned"
+ORDERING_SWEEPS = 4
+LAYOUT_CACHE_SIZE = 32
+
+
+@dataclass
+class ProcessGraph:
+    """A process map with steps indexed by position and edges as integer arrays."""
+
+    steps: List[Dict[str, Any]]
+    index: Dict[str, int]
+    lane_ids: List[str]
+    lane_names: List[str]
+    lane: np.ndarray
+    edges: List[Dict[str, Any]]
+    sources: np.ndarray
+    targets: np.ndarray
+    successors: List[List[int]]
+    predecessors: List[List[int]]
+    # Edges whose endpoints are not steps of the map; they are left out of the graph.
+    dropped_edges: int = 0
+
+    @classmethod
+    def from_map(cls, process_map: Mapping[str, Any]) -> "ProcessGraph":
+        steps: List[Dict[str, Any]] = list(process_map.get("steps") or [])
+        index: Dict[str, int] = {}
+        for position, step in enumerate(steps):
+            index.setdefault(str(step.get("id", position)), position)
+
+        lane_ids: List[str] = []
+        lane_names: List[str] = []
+        lane_index: Dict[str, int] = {}
+        for role in process_map.get("roles") or []:
+            role_id = str(role.get("id", ""))
+            if role_id and role_id not in lane_index:
+                lane_index[role_id] = len(lane_ids)
+                lane_ids.append(role_id)
+                lane_names.append(str(role.get("name") or role_id))
+        lane = np.empty(len(steps), dtype=np.int64)
+        for position, step in enumerate(steps):
+            # Steps naming an undeclared role get a lane of their own; steps without one share a lane.
+            role_id = str(step.get("role_id") or "")
+            if role_id not in lane_index:
+                lane_index[role_id] = len(lane_ids)
+                lane_ids.append(role_id)
+                lane_names.append(role_id or UNASSIGNED_LANE)
+            lane[position] = lane_index[role_id]
+
+        edges, sources, targets = [], [], []
+        dropped = 0
+        for edge in process_map.get("edges") or []:
+            source, target = index.get(str(edge.get("from"))), index.get(str(edge.get("to")))
+            if source is None or target is None:
+                dropped += 1
+                continue
+            edges.append(edge)
+            sources.append(source)
+            targets.append(target)
+
+        successors: List[List[int]] = [[] for _ in steps]
+        predecessors: List[List[int]] = [[] for _ in steps]
+        for edge_id, (source, target) in enumerate(zip(sources, targets)):
+            successors[source].append(edge_id)
+            predecessors[target].append(edge_id)
+        return cls(
+            steps=steps,
+            index=index,
+            lane_ids=lane_ids,
+            lane_names=lane_names,
+            lane=lane,
+            edges=edges,
+            sources=np.asarray(sources, dtype=np.int64),
+            targets=np.asarray(targets, dtype=np.int64),
+            successors=successors,
+            predecessors=predecessors,
+            dropped_edges=dropped,
+        )
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def step(self, step_id: str) -> Dict[str, Any]:
+        return self.steps[self.index[str(step_id)]]
+
+    def back_edges(self) -> np.ndarray:
+        """Return a mask of edges that close a loop (rework), found by depth-first search.
+
+        Steps without predecessors are searched first, in map order, so the main flow keeps
+        its direction and only the edges returning to an earlier step are marked.
+        """
+
+        n = len(self.steps)
+        # Plain lists: element access in this loop is several times faster than on arrays.
+        targets = self.targets.tolist()
+        back = [False] * len(targets)
+        state = [0] * n  # 0 unvisited, 1 on the DFS stack, 2 finished
+        starts = [node for node in range(n) if not self.predecessors[node]]
+        for root in starts + list(range(n)):
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(self.successors[root]))]
+            while stack:
+                node, pending = stack[-1]
+                for edge_id in pending:
+                    target = targets[edge_id]
+                    if state[target] == 1:
+                        back[edge_id] = True
+                    elif state[target] == 0:
+                        state[target] = 1
+                        stack.append((target, iter(self.successors[target])))
+                        break
+                else:
+                    state[node] = 2
+                    stack.pop()
+        return np.array(back, dtype=bool)
+
+
+@dataclass
+class ProcessLayout:
+    """Grid positions for a :class:`ProcessGraph`: a column and a global row per step."""
+
+    column: np.ndarray
+    row: np.ndarray
+    lane_top: np.ndarray
+    lane_height: np.ndarray
+    back_edge: np.ndarray
+
+    @property
+    def columns(self) -> int:
+        return int(self.column.max()) + 1 if self.column.size else 0
+
+    @property
+    def rows(self) -> int:
+        return int(self.lane_height.sum())
+
+
+def _ranks(graph: ProcessGraph, forward: np.ndarray) -> np.ndarray:
+    """Longest-path column of each step over the acyclic ``forward`` edges (Kahn's algorithm)."""
+
+    n = len(graph)
+    targets, forward_list = graph.targets.tolist(), forward.tolist()
+    rank = [0] * n
+    indegree = np.bincount(graph.targets[forward], minlength=n).tolist()
+    queue = deque(node for node in range(n) if indegree[node] == 0)
+    while queue:
+        node = queue.popleft()
+        for edge_id in graph.successors[node]:
+            if not forward_list[edge_id]:
+                continue
+            target = targets[edge_id]
+            rank[target] = max(rank[target], rank[node] + 1)
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                queue.append(target)
+    return np.array(rank, dtype=np.int64)
+
+
+def _order_cells(cell: np.ndarray, key: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """Position of each step within its (lane, column) cell when sorted by ``key``.
+
+    Ties keep their ``previous`` order, so sweeps that cannot improve a cell leave it alone.
+    """
+
+    order = np.lexsort((previous, key, cell))
+    sorted_cells = cell[order]
+    slot = np.empty(cell.size, dtype=np.int64)
+    slot[order] = np.arange(cell.size) - np.searchsorted(sorted_cells, sorted_cells, side="left")
+    return slot
+
+
+def _barycentres(
+    positions: np.ndarray, sources: np.ndarray, targets: np.ndarray, n: int
+) -> np.ndarray:
+    """Mean position of each step's neighbours along ``sources -> targets``; own position if none."""
+
+    weights = np.bincount(targets, weights=positions[sources], minlength=n)
+    counts = np.bincount(targets, minlength=n)
+    return np.where(counts > 0, weights / np.maximum(counts, 1), positions)
+
+
+def layered_layout(graph: ProcessGraph, sweeps: int = ORDERING_SWEEPS) -> ProcessLayout:
+    """Lay ``graph`` out as swimlanes: columns by longest path, rows by lane and barycentre."""
+
+    n = len(graph)
+    lanes = max(len(graph.lane_ids), 1)
+    back = graph.back_edges()
+    forward = ~back
+    column = _ranks(graph, forward) if n else np.zeros(0, dtype=np.int64)
+    columns = int(column.max()) + 1 if n else 1
+
+    cell = graph.lane * columns + column
+    slot = _order_cells(cell, np.zeros(n), np.arange(n))
+    cell_size = np.bincount(cell, minlength=lanes * columns).reshape(lanes, columns)
+    lane_height = np.maximum(cell_size.max(axis=1), 1)
+    lane_top = np.concatenate(([0], np.cumsum(lane_height)[:-1]))
+
+    sources, targets = graph.sources[forward], graph.targets[forward]
+    for sweep in range(sweeps):
+        position = lane_top[graph.lane] + slot
+        # Alternate between ordering by predecessors and by successors.
+        if sweep % 2 == 0:
+            key = _barycentres(position.astype(float), sources, targets, n)
+        else:
+            key = _barycentres(position.astype(float), targets, sources, n)
+        slot = _order_cells(cell, key, slot)
+
+    return ProcessLayout(
+        column=column,
+        row=lane_top[graph.lane] + slot,
+        lane_top=lane_top,
+        lane_height=lane_height,
+        back_edge=back,
+    )
+
+
+_layouts: "OrderedDict[Hashable, ProcessLayout]" = OrderedDict()
+_layouts_lock = threading.Lock()
+
+
+def structure_key(graph: ProcessGraph) -> Hashable:
+    """Everything :func:`layered_layout` depends on: lane order, step lanes and edge endpoints."""
+
+    return (
+        tuple(graph.lane_ids),
+        tuple(graph.lane.tolist()),
+        tuple(graph.sources.tolist()),
+        tuple(graph.targets.tolist()),
+    )
+
+
+def map_layout(process_map: Mapping[str, Any]) -> Tuple[ProcessGraph, ProcessLayout]:
+    """Index ``process_map`` and lay it out, reusing the layout of a draft with the same structure."""
+
+    graph = ProcessGraph.from_map(process_map)
+    key = structure_key(graph)
+    with _layouts_lock:
+        layout = _layouts.get(key)
+        if layout is not None:
+            _layouts.move_to_end(key)
+            return graph, layout
+    layout = layered_layout(graph)
+    with _layouts_lock:
+        _layouts[key] = layout
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+    return graph, layout
@@ -0,0 +1,320 @@
+"""Process discovery from event logs: a directly-follows graph as ``process_map`` JSON.
+
+An event log has one row per event with a case id, an activity and a timestamp, and
+optionally the resource that performed it. :func:`discover_process_map` turns it into the
+``process_map`` JSON the process map coach produces (``roles``, ``steps``, ``edges``), so it
+is drawn, diffed and exported like a drafted map:
+
+* every activity becomes a step, annotated with its event and case counts;
+* events are sorted by case and time, and each pair of consecutive events of a case is a
+  directly-follows transition; transitions become edges with their frequency and the median
+  time between the two events;
+* each activity is placed in the swimlane of the resource that performs it most often.
+
+Everything is a sort, ``factorize`` or ``bincount`` over the event arrays, with no per-case
+Python loop, so logs with millions of events are mined in seconds. Only the
+:data:`DEFAULT_MAX_ACTIVITIES` most frequent activities are kept: events of rarer activities
+are dropped before the transitions are counted, so paths through them are bridged rather
+than cut.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .process_graph import ProcessGraph
+
+DEFAULT_MAX_ACTIVITIES = 50
+DEFAULT_LANE = "Process"
+MAX_CITED = 3
+# Transitions ranked as the slowest must carry at least this share of all transitions.
+MIN_RANKED_SHARE = 0.01
+
+# Accepted column names for each event field, matched case-insensitively; the XES names used
+# by most process-mining exports are included. Generic names such as ``step``, ``date`` or
+# ``lot_id`` are left out: they head ordinary measurement tables as often as event logs.
+EVENT_COLUMNS: Dict[str, Sequence[str]] = {
+    "case": ("case_id", "case", "case:concept:name", "caseid", "trace_id"),
+    "activity": ("activity", "concept:name", "activity_name"),
+    "timestamp": ("timestamp", "time:timestamp", "time", "event_time", "datetime", "start_time"),
+    "resource": ("resource", "org:resource", "org:role", "role", "performer"),
+}
+# Rows whose timestamps are parsed to tell date-times from numbers or labels.
+TIMESTAMP_SAMPLE_ROWS = 50
+_DATE_LIKE = r"\d{1,4}[-/.:]\d{1,2}"
+
+
+def event_log_columns(columns: Iterable[Any]) -> Dict[str, Any]:
+    """Map event fields to the matching ``columns``."""
+
+    lowered = {str(column).strip().lower(): column for column in columns}
+    found = {}
+    for name, aliases in EVENT_COLUMNS.items():
+        match = next((lowered[alias] for alias in aliases if alias in lowered), None)
+        if match is not None:
+            found[name] = match
+    return found
+
+
+def _is_timestamp(values: pd.Series) -> bool:
+    """Whether ``values`` are date-times: a datetime column, or text that parses as dates."""
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return True
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return False
+    sample = values.dropna().astype(str).head(TIMESTAMP_SAMPLE_ROWS)
+    if sample.empty or not sample.str.contains(_DATE_LIKE, regex=True).all():
+        return False
+    return bool(pd.to_datetime(sample, errors="coerce", format="mixed").notna().all())
+
+
+def is_event_log(columns: Iterable[Any], events: Optional[pd.DataFrame] = None) -> bool:
+    """Whether ``columns`` hold an event log: a case id, an activity and a timestamp.
+
+    Given the rows as well, ``events`` must also look like one: the timestamp column holds
+    date-times rather than numbers, and some case has more than one event.
+    """
+
+    found = event_log_columns(columns)
+    if not {"case", "activity", "timestamp"} <= set(found):
+        return False
+    if events is None:
+        return True
+    cases = events[found["case"]].dropna()
+    return _is_timestamp(events[found["timestamp"]]) and bool(cases.duplicated().any())
+
+
+def _duration(minutes: float) -> str:
+    if minutes >= 2 * 24 * 60:
+        return f"{minutes / (24 * 60):.1f} d"
+    if minutes >= 120:
+        return f"{minutes / 60:.1f} h"
+    return f"{minutes:.3g} min"
+
+
+def _plural(count: int, noun: str, plural: str | None = None) -> str:
+    return f"{count:,} {noun if count == 1 else plural or noun + 's'}"
+
+
+def _runs(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start offsets and lengths of the runs of equal values in sorted ``keys``.
+
+    A sort plus this is several times faster than ``np.unique`` on millions of events.
+    """
+
+    offsets = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    return offsets, np.diff(np.r_[offsets, len(keys)])
+
+
+def _most_frequent(codes: np.ndarray, names: Sequence[Any], limit: int = MAX_CITED) -> List[str]:
+    counts = np.bincount(codes, minlength=len(names))
+    return [str(names[code]) for code in np.argsort(-counts, kind="stable")[:limit] if counts[code]]
+
+
+@dataclass
+class ProcessDiscovery:
+    """A discovered process map and the figures behind it."""
+
+    process_map: Dict[str, Any]
+    events: int
+    cases: int
+    # Events and activities of the log before the rarest activities were dropped.
+    total_events: int
+    total_activities: int
+    median_case_minutes: float
+    start_activities: List[str]
+    end_activities: List[str]
+
+    def highlights(self, limit: int = MAX_CITED) -> Dict[str, List[str]]:
+        """The busiest and slowest transitions, and rework loops, as ``A -> B`` strings."""
+
+        names = {step["id"]: step["name"] for step in self.process_map["steps"]}
+
+        def label(edge: Dict[str, Any]) -> str:
+            return f"{names[edge['from']]} -> {names[edge['to']]}"
+
+        edges = self.process_map["edges"]
+        busiest = sorted(edges, key=lambda edge: -edge["frequency"])[:limit]
+        # One-off transitions are noise when ranking by duration.
+        transitions = sum(edge["frequency"] for edge in edges)
+        common = [edge for edge in edges if edge["frequency"] >= MIN_RANKED_SHARE * transitions] or edges
+        slowest = sorted(common, key=lambda edge: -edge["median_minutes"])[:limit]
+        graph = ProcessGraph.from_map(self.process_map)
+        rework = [graph.edges[edge] for edge in np.flatnonzero(graph.back_edges())]
+        rework.sort(key=lambda edge: -edge["frequency"])
+        return {
+            "busiest": [f"{label(edge)} ({edge['frequency']:,}x)" for edge in busiest],
+            "slowest": [f"{label(edge)} (median {_duration(edge['median_minutes'])})" for edge in slowest],
+            "rework": [f"{label(edge)} ({edge['frequency']:,}x)" for edge in rework[:limit]],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "events": self.events,
+            "cases": self.cases,
+            "activities": len(self.process_map["steps"]),
+            "transitions": len(self.process_map["edges"]),
+            "lanes": len(self.process_map["roles"]),
+            "dropped_events": self.total_events - self.events,
+            "dropped_activities": self.total_activities - len(self.process_map["steps"]),
+            "median_case_minutes": round(self.median_case_minutes, 3),
+            "start_activities": self.start_activities,
+            "end_activities": self.end_activities,
+            **self.highlights(),
+        }
+
+    def describe(self) -> str:
+        """A few sentences suitable for a coach reply or a narration prompt."""
+
+        steps, edges, roles = (self.process_map[key] for key in ("steps", "edges", "roles"))
+        text = (
+            f"Discovered {_plural(len(steps), 'activity', 'activities')} and "
+            f"{_plural(len(edges), 'transition')} in {_plural(len(roles), 'lane')} from "
+            f"{_plural(self.events, 'event')} in {_plural(self.cases, 'case')}; median case duration "
+            f"{_duration(self.median_case_minutes)}."
+        )
+        dropped = self.total_activities - len(steps)
+        if dropped:
+            text += (
+                f" The {_plural(dropped, 'rarest activity', 'rarest activities')} "
+                f"({self.total_events - self.events:,} events) were left out."
+            )
+        highlights = self.highlights()
+        if highlights["busiest"]:
+            text += f" Busiest: {', '.join(highlights['busiest'])}."
+            text += f" Slowest: {', '.join(highlights['slowest'])}."
+        if highlights["rework"]:
+            text += f" Rework loops: {', '.join(highlights['rework'])}."
+        return text
+
+
+def discover_process_map(events: pd.DataFrame, max_activities: Optional[int] = None) -> ProcessDiscovery:
+    """Mine ``events`` into a directly-follows process map with resource swimlanes.
+
+    ``max_activities`` defaults to ``CI_COACH_MINING_MAX_ACTIVITIES``
+    (:data:`DEFAULT_MAX_ACTIVITIES`). Events with a missing case, activity or unparseable
+    timestamp are ignored; events of a case with equal timestamps keep their row order.
+    """
+
+    columns = event_log_columns(events.columns)
+    missing = [name for name in ("case", "activity", "timestamp") if name not in columns]
+    if missing:
+        found = ", ".join(map(str, events.columns))
+        raise ValueError(f"Event log needs {', '.join(missing)} column(s); found {found}.")
+    max_activities = max_activities or int(os.getenv("CI_COACH_MINING_MAX_ACTIVITIES", DEFAULT_MAX_ACTIVITIES))
+
+    timestamps = pd.to_datetime(events[columns["timestamp"]], errors="coerce", utc=True)
+    # Factorising the columns directly is much faster than converting Arrow strings first.
+    cases, _ = pd.factorize(events[columns["case"]])
+    activities, activity_names = pd.factorize(events[columns["activity"]])
+    valid = timestamps.notna().to_numpy() & (cases >= 0) & (activities >= 0)
+    if not valid.any():
+        raise ValueError("The event log has no events with a case, an activity and a timestamp.")
+    time_ns = timestamps.dt.tz_convert(None).to_numpy("datetime64[ns]").view("int64")[valid]
+    cases, activities = cases[valid], activities[valid]
+    if "resource" in columns:
+        resources, resource_names = pd.factorize(events[columns["resource"]])
+        resources = np.where(resources < 0, len(resource_names), resources)[valid]
+        resource_names = [*map(str, resource_names), DEFAULT_LANE]
+    else:
+        resources, resource_names = np.zeros(len(cases), dtype=np.int64), [DEFAULT_LANE]
+    frequency = np.bincount(activities, minlength=len(activity_names))
+    total_events, total_activities = len(cases), int(np.count_nonzero(frequency))
+
+    # Keep the most frequent activities, in order of first appearance, and drop the others'
+    # events before pairing; activity codes are renumbered to 0..k-1.
+    kept = np.sort(np.argsort(-frequency, kind="stable")[: min(max_activities, total_activities)])
+    code = np.full(len(activity_names), -1)
+    code[kept] = np.arange(len(kept))
+    activities = code[activities]
+    names = [str(activity_names[activity]) for activity in kept.tolist()]
+    if len(kept) < len(activity_names):
+        mask = activities >= 0
+        cases, activities, resources, time_ns = cases[mask], activities[mask], resources[mask], time_ns[mask]
+
+    # Events in case order, then time order; lexsort is stable, so ties keep their row order.
+    # Case codes follow first appearance, so logs exported grouped by case and sorted by time
+    # are already in this order and skip the sort.
+    same_case = cases[1:] == cases[:-1]
+    if not (np.all(cases[1:] >= cases[:-1]) and np.all((time_ns[1:] >= time_ns[:-1])[same_case])):
+        order = np.lexsort((time_ns, cases))
+        cases, activities, resources, time_ns = cases[order], activities[order], resources[order], time_ns[order]
+        same_case = cases[1:] == cases[:-1]
+    first = np.flatnonzero(np.r_[True, ~same_case])
+    last = np.r_[first[1:] - 1, len(cases) - 1]
+
+    # Directly-follows pairs, grouped by (source, target) with their median gap.
+    k = len(kept)
+    pair_type = np.int16 if k * k <= np.iinfo(np.int16).max else np.int64
+    pairs = (activities[:-1] * k + activities[1:])[same_case].astype(pair_type)
+    gaps = ((time_ns[1:] - time_ns[:-1])[same_case]) / 6e10
+    # Sort by gap, then stably by pair; numpy radix-sorts 16-bit keys, several times faster
+    # than a lexsort of the two.
+    by_gap = np.argsort(gaps)
+    by_pair = by_gap[np.argsort(pairs[by_gap], kind="stable")]
+    pairs, gaps = pairs[by_pair], gaps[by_pair]
+    offsets, counts = _runs(pairs)
+    codes = pairs[offsets].astype(np.int64)
+    median_gap = (gaps[offsets + (counts - 1) // 2] + gaps[offsets + counts // 2]) / 2
+
+    # Swimlane per activity: the resource that performs it most often.
+    r = len(resource_names)
+    lane_keys = np.sort(activities * r + resources)
+    lane_offsets, lane_counts = _runs(lane_keys)
+    lane_keys = lane_keys[lane_offsets]
+    busiest = np.lexsort((-lane_counts, lane_keys // r))
+    lane_keys = lane_keys[busiest]
+    lead = np.r_[True, lane_keys[1:] // r != lane_keys[:-1] // r]
+    lane_of = np.zeros(k, dtype=np.int64)
+    lane_of[lane_keys[lead] // r] = lane_keys[lead] % r
+
+    event_counts = np.bincount(activities, minlength=k)
+    case_activity = np.sort(cases * k + activities)
+    case_counts = np.bincount(case_activity[_runs(case_activity)[0]] % k, minlength=k)
+    process_map = {
+        "roles": [{"id": f"r{lane}", "name": resource_names[lane]} for lane in pd.unique(lane_of).tolist()],
+        "steps": [
+            {
+                "id": f"a{activity}",
+                "name": name,
+                "role_id": f"r{lane}",
+                "description": f"{_plural(events, 'event')} in {_plural(cases_seen, 'case')}",
+                "metric": _plural(events, "event"),
+                "frequency": events,
+            }
+            for activity, (name, lane, events, cases_seen) in enumerate(
+                zip(names, lane_of.tolist(), event_counts.tolist(), case_counts.tolist())
+            )
+        ],
+        "edges": [
+            {
+                "from": f"a{source}",
+                "to": f"a{target}",
+                "note": f"{count:,}x, {_duration(gap)}",
+                "frequency": count,
+                "median_minutes": round(gap, 3),
+            }
+            for source, target, count, gap in zip(
+                (codes // k).tolist(), (codes % k).tolist(), counts.tolist(), median_gap.tolist()
+            )
+        ],
+        "systems": [],
+    }
+
+    durations = (time_ns[last] - time_ns[first]) / 6e10
+    return ProcessDiscovery(
+        process_map=process_map,
+        events=len(cases),
+        cases=len(first),
+        total_events=total_events,
+        total_activities=total_activities,
+        median_case_minutes=float(np.median(durations)),
+        start_activities=_most_frequent(activities[first], names),
+        end_activities=_most_frequent(activities[last], names),
+    )
@@ -0,0 +1,214 @@
+"""Column profiles of stored datasets and local repair of chart column names.
+
+A profile is a compact, JSON-serialisable description of each column (dtype, null ratio,
+cardinality, range/quantiles or top values) plus the columns that look like time axes,
+categories and measures. Profiles are computed once per dataset content hash by
+:class:`ci_coach.dataset_store.DatasetStore` and shown to the Chart Planner, so it can pick
+real column names; :func:`resolve_chart_spec` repairs the near misses that remain without
+another LLM call.
+"""
+
+from __future__ import annotations
+
+import difflib
+import re
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Sequence, Tuple
+
+import pandas as pd
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle at runtime
+    from .charts import ChartSpec
+
+PROFILE_VERSION = 1
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+MAX_CATEGORIES = 50
+TOP_VALUES = 5
+TIME_NAME = re.compile(
+    r"(^|_)(date|time|timestamp|ts|day|week|month|year|period|seq|sequence|sample|batch|order|run)(_|$)",
+    re.I,
+)
+
+
+def _looks_like_dates(series: pd.Series) -> bool:
+    sample = series.dropna().astype(str).head(50)
+    if sample.empty or not sample.str.contains(r"\d", regex=True).all():
+        return False
+    parsed = pd.to_datetime(sample, errors="coerce", format="mixed")
+    return parsed.notna().mean() >= 0.9
+
+
+def profile_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    """Return the column profile of ``df``.
+
+    Null ratios, cardinalities and numeric ranges/quantiles are computed column-wise in a
+    handful of vectorised pandas calls rather than per column.
+    """
+
+    rows = len(df)
+    nulls = df.isna().mean() if rows else pd.Series(0.0, index=df.columns)
+    distinct = df.nunique(dropna=True)
+    numeric = df.select_dtypes(include="number").select_dtypes(exclude="bool")
+    if not numeric.empty and rows:
+        quantiles = numeric.quantile(list(QUANTILES))
+        # Per column, so integer columns are not upcast to a shared float dtype.
+        minimum = {column: numeric[column].min() for column in numeric.columns}
+        maximum = {column: numeric[column].max() for column in numeric.columns}
+        monotonic = {column: numeric[column].is_monotonic_increasing for column in numeric.columns}
+    else:
+        quantiles, minimum, maximum, monotonic = None, {}, {}, {}
+
+    columns: List[Dict[str, Any]] = []
+    for column in df.columns:
+        series = df[column]
+        entry: Dict[str, Any] = {
+            "name": str(column),
+            "dtype": str(series.dtype),
+            "nulls": round(float(nulls[column]), 4),
+            "distinct": int(distinct[column]),
+        }
+        if column in numeric.columns and quantiles is not None:
+            entry["min"] = _scalar(minimum[column])
+            entry["max"] = _scalar(maximum[column])
+            entry["quantiles"] = {f"p{int(q * 100):02d}": _scalar(quantiles.at[q, column]) for q in QUANTILES}
+            # A numeric column is a time axis only when its name says so and it never decreases,
+            # so measures such as ``cycle_time`` stay measures.
+            if TIME_NAME.search(str(column)) and monotonic[column]:
+                entry["role"] = "time"
+            elif pd.api.types.is_integer_dtype(series) and 1 < entry["distinct"] <= 12 < rows:
+                entry["role"] = "category"
+            else:
+                entry["role"] = "numeric"
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            entry["min"], entry["max"] = str(series.min()), str(series.max())
+            entry["role"] = "time"
+        elif pd.api.types.is_bool_dtype(series):
+            entry["role"] = "category"
+        elif _looks_like_dates(series):
+            entry["role"] = "time"
+        else:
+            entry["role"] = "category" if entry["distinct"] <= MAX_CATEGORIES else "text"
+            top = series.value_counts(dropna=True).head(TOP_VALUES)
+            entry["top"] = [str(value) for value in top.index]
+        columns.append(entry)
+
+    return {
+        "version": PROFILE_VERSION,
+        "rows": rows,
+        "columns": columns,
+        "time_columns": [c["name"] for c in columns if c["role"] == "time"],
+        "category_columns": [c["name"] for c in columns if c["role"] == "category"],
+        "numeric_columns": [c["name"] for c in columns if c["role"] == "numeric"],
+    }
+
+
+def _scalar(value: Any) -> Any:
+    if pd.isna(value):
+        return None
+    value = value.item() if hasattr(value, "item") else value
+    return round(value, 4) if isinstance(value, float) else value
+
+
+def describe_profile(name: str, profile: Mapping[str, Any]) -> str:
+    """Render a profile as a few prompt lines: one per column, most useful facts first."""
+
+    lines = [f"{name} ({profile['rows']:,} rows):"]
+    for column in profile["columns"]:
+        facts = [column["dtype"], column["role"]]
+        if column["nulls"]:
+            facts.append(f"{column['nulls']:.0%} null")
+        if "quantiles" in column:
+            q = column["quantiles"]
+            facts.append(f"range {column['min']}..{column['max']}, median {q['p50']}")
+        elif "top" in column:
+            facts.append(f"{column['distinct']} distinct, e.g. {', '.join(column['top'][:3])}")
+        elif "min" in column:
+            facts.append(f"{column['min']} to {column['max']}")
+        lines.append(f"  - {column['name']}: {'; '.join(facts)}")
+    return "\n".join(lines)
+
+
+def _normalise(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def resolve_name(name: str | None, candidates: Sequence[str], cutoff: float = 0.75) -> str | None:
+    """Map ``name`` onto one of ``candidates``, tolerating case, punctuation and typos.
+
+    Tries an exact match, then a match ignoring case and separators, then a ``difflib``
+    close match on the normalised names. Returns ``None`` when nothing is close enough.
+    """
+
+    if not name:
+        return None
+    if name in candidates:
+        return name
+    normalised = {_normalise(candidate): candidate for candidate in candidates}
+    key = _normalise(name)
+    if key in normalised:
+        return normalised[key]
+    matches = difflib.get_close_matches(key, list(normalised), n=1, cutoff=cutoff)
+    if matches:
+        return normalised[matches[0]]
+    prefixed = [candidate for norm, candidate in normalised.items() if key and norm.startswith(key)]
+    return prefixed[0] if len(prefixed) == 1 else None
+
+
+# Which column roles each chart type needs, used to fill in columns the planner left out.
+_DEFAULT_ROLES = {
+    "pareto": {"value_column": "numeric", "category_column": "category"},
+    "histogram": {"value_column": "numeric"},
+    "boxplot": {"value_column": "numeric"},
+    "run": {"value_column": "numeric", "secondary_column": "time"},
+    "control": {"value_column": "numeric", "secondary_column": "time"},
+    "scatter": {"value_column": "numeric", "secondary_column": "numeric"},
+    "bar_compare": {"value_column": "numeric", "category_column": "category", "secondary_column": "category"},
+}
+
+
+def resolve_chart_spec(
+    spec: "ChartSpec",
+    datasets: Mapping[str, Any],
+    profiles: Mapping[str, Mapping[str, Any]],
+) -> Tuple["ChartSpec", List[Dict[str, Any]]]:
+    """Repair the dataset and column names in ``spec`` against the dataset profiles.
+
+    Misspelt names are mapped to the closest real column; missing or unresolvable columns
+    the chart type needs are filled with the first unused column of the right role.
+    Returns the repaired spec and a list of the repairs made (empty when none were needed).
+    """
+
+    repairs: List[Dict[str, Any]] = []
+    dataset = resolve_name(spec.dataset_name, list(datasets))
+    if dataset is None and len(datasets) == 1:
+        dataset = next(iter(datasets))
+    if dataset is None:
+        return spec, repairs
+    if dataset != spec.dataset_name:
+        repairs.append({"field": "dataset_name", "from": spec.dataset_name, "to": dataset})
+        spec = replace(spec, dataset_name=dataset)
+
+    profile = profiles.get(dataset)
+    if not profile:
+        return spec, repairs
+    names = [column["name"] for column in profile["columns"]]
+    by_role = {
+        "numeric": profile["numeric_columns"],
+        "time": profile["time_columns"],
+        "category": profile["category_columns"],
+    }
+    roles = _DEFAULT_ROLES.get(spec.chart_type.lower(), {})
+    fields = ("value_column", "category_column", "secondary_column")
+
+    resolved = {field: resolve_name(getattr(spec, field), names) for field in fields}
+    for field in fields:
+        original = getattr(spec, field)
+        if resolved[field] is None and field in roles:
+            used = set(resolved.values())
+            fallback = next((c for c in by_role[roles[field]] if c not in used), None)
+            # Keep an unknown name the chart needs when there is no substitute, so the
+            # renderer's error names it.
+            resolved[field] = fallback or original
+        if resolved[field] != original:
+            repairs.append({"field": field, "from": original, "to": resolved[field]})
+    return replace(spec, **resolved), repairs
@@ -0,0 +1,171 @@
+"""Content-addressed cache of rendered charts and diagrams (PNG, SVG, Mermaid or DOT files).
+
+Every render is named by a hash of what determines its pixels: the renderer kind and
+version, the DPI and the inputs (the dataset content hash plus the full ``ChartSpec`` for
+charts, the artifact JSON and output format for diagrams). Asking for the same chart twice
+returns the existing file without rendering, and distinct charts never overwrite each other.
+
+The cache is shared by every session, but sessions never hand out its paths: a render is
+written to the session's artifacts directory and hard-linked into the cache (copied across
+file systems), and a hit is linked back out the same way. Files are evicted least recently
+used first once the cache exceeds ``CI_COACH_RENDER_CACHE_MB``; eviction only removes the
+cache's link, so files a session's state points to stay in place.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Mapping
+
+from .artifacts import default_artifacts_dir
+from .conversation import content_hash
+
+DEFAULT_MAX_MB = 256
+
+
+class RenderCache:
+    """LRU, size-bounded directory of rendered files named by content hash."""
+
+    def __init__(self, root: Path | str, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Path, int] | None" = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "RenderCache":
+        """Build a cache at ``CI_COACH_RENDER_CACHE`` (default ``artifacts/renders``)."""
+
+        return cls(
+            os.getenv("CI_COACH_RENDER_CACHE", str(default_artifacts_dir() / "renders")),
+            max_bytes=int(float(os.getenv("CI_COACH_RENDER_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+        )
+
+    def path_for(self, kind: str, key: Mapping[str, Any], label: str = "", suffix: str = ".png") -> Path:
+        """Return the stable artifact path for a render of ``kind`` identified by ``key``."""
+
+        digest = content_hash({"kind": kind, **key})[:16]
+        stem = "_".join(part for part in (kind, label, digest) if part)
+        return self.root / f"{stem}{suffix}"
+
+    def _load(self) -> "OrderedDict[Path, int]":
+        # Rebuild the LRU order from modification times, which hits refresh.
+        if self._entries is None:
+            # Dot-prefixed names are renders still being written (see ``artifacts.save_figure``).
+            files = [p for p in self.root.iterdir() if not p.name.startswith(".")] if self.root.exists() else []
+            files = sorted((p for p in files if p.is_file()), key=lambda p: p.stat().st_mtime)
+            self._entries = OrderedDict((path, path.stat().st_size) for path in files)
+            self._bytes = sum(self._entries.values())
+        return self._entries
+
+    def get(self, path: Path) -> bool:
+        """Return whether ``path`` is cached, marking it most recently used if so."""
+
+        with self._lock:
+            entries = self._load()
+            if path in entries and path.exists():
+                entries.move_to_end(path)
+                self.hits += 1
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return True
+            if path in entries:
+                self._bytes -= entries.pop(path)
+            self.misses += 1
+            return False
+
+    def fetch(self, path: Path, target: Path) -> bool:
+        """Link cached ``path`` to ``target``; ``False`` if it was evicted since :meth:`get`."""
+
+        with self._lock:
+            try:
+                _link(path, target)
+            except FileNotFoundError:
+                entries = self._load()
+                if path in entries:
+                    self._bytes -= entries.pop(path)
+                return False
+            return True
+
+    def add(self, path: Path, source: Path | None = None) -> None:
+        """Record a freshly rendered file and evict the oldest files beyond the size budget.
+
+        ``source`` is the render written elsewhere, normally a session's artifacts directory;
+        it is linked into the cache as ``path``.
+        """
+
+        with self._lock:
+            if source is not None:
+                _link(source, path)
+            entries = self._load()
+            size = path.stat().st_size
+            self._bytes += size - entries.pop(path, 0)
+            entries[path] = size
+            while self._bytes > self.max_bytes and len(entries) > 1:
+                oldest, oldest_size = entries.popitem(last=False)
+                oldest.unlink(missing_ok=True)
+                self._bytes -= oldest_size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._load()
+            lookups = self.hits + self.misses
+            return {
+                "files": len(entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+def _link(source: Path, target: Path) -> None:
+    """Hard-link ``source`` as ``target``, copying when that fails; an existing ``target`` is kept."""
+
+    if target.exists():
+        return
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Dot-prefixed, like a render in progress, until it is complete under its final name.
+    tmp = target.with_name(f".{target.stem}.{uuid.uuid4().hex}.tmp{target.suffix}")
+    try:
+        os.link(source, tmp)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copy2(source, tmp)
+    os.replace(tmp, target)
+
+
+_CACHE: RenderCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """Return the process-wide render cache, configured from the environment on first use."""
+
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = RenderCache.from_env()
+        return _CACHE
+
+
+def set_render_cache(cache: RenderCache) -> None:
+    """Replace the process-wide render cache."""
+
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = cache
@@ -0,0 +1,492 @@
+"""Chart and diagram rendering in a pool of sandboxed worker processes.
+
+matplotlib's ``pyplot`` state machine is global and not thread-safe, and a pathological
+chart (millions of points, a huge figure) can pin a CPU or exhaust memory. Renders are
+therefore sent to pre-warmed worker processes that import matplotlib with the Agg backend
+once at start-up. Each worker runs one job at a time under a CPU-time limit
+(``RLIMIT_CPU``, reset per job) and a memory limit (``RLIMIT_DATA``/``RLIMIT_AS``); the
+parent enforces a wall-clock timeout and can cancel a running job by replacing its worker.
+
+:meth:`RenderPool.submit` returns a :class:`RenderJob` immediately; its ``future`` is a
+regular :class:`concurrent.futures.Future` (wrap it with :func:`asyncio.wrap_future` on an
+event loop). Set ``CI_COACH_RENDER_WORKERS=0`` to render on a single in-process thread
+instead.
+"""
+
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+from .artifacts import artifacts_dir, using_artifacts_dir
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_CPU_SECONDS = 20
+DEFAULT_MEMORY_MB = 1024
+
+
+class RenderError(RuntimeError):
+    """A render job failed in a way that is not the renderer's own exception."""
+
+
+class RenderTimeoutError(RenderError, TimeoutError):
+    """A render job exceeded its wall-clock timeout and its worker was replaced."""
+
+
+class RenderLimitError(RenderError):
+    """A render job exceeded the worker's CPU-time or memory limit."""
+
+
+@dataclass
+class RenderJob:
+    """Handle for a submitted render; ``future`` resolves to the renderer's return value."""
+
+    id: int
+    future: Future
+    submitted_at: float = field(default_factory=time.perf_counter)
+    started_at: float | None = None
+    _cancel: Callable[["RenderJob"], bool] | None = field(default=None, repr=False)
+
+    def result(self, timeout: float | None = None) -> Any:
+        return self.future.result(timeout)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def cancel(self) -> bool:
+        """Cancel the job, stopping its worker if it is already running."""
+
+        if self.future.cancel():
+            return True
+        return self._cancel(self) if self._cancel is not None else False
+
+
+def _cpu_time_exceeded(signum: int, frame: Any) -> None:
+    raise RenderLimitError("Render exceeded its CPU time limit.")
+
+
+def _set_cpu_budget(seconds: int | None) -> None:
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = resource.RLIM_INFINITY if seconds is None else int(usage.ru_utime + usage.ru_stime) + seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = hard if soft == resource.RLIM_INFINITY else min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _limit_memory(memory_mb: int) -> None:
+    import resource
+
+    # RLIMIT_DATA covers heap and anonymous mappings on Linux >= 4.7 without counting the
+    # address space reserved by shared libraries; other platforms only honour RLIMIT_AS.
+    limit = resource.RLIMIT_DATA if sys.platform.startswith("linux") else resource.RLIMIT_AS
+    _, hard = resource.getrlimit(limit)
+    size = memory_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        size = min(size, hard)
+    resource.setrlimit(limit, (size, hard))
+
+
+def _worker_main(conn: Any, cpu_seconds: int, memory_mb: int) -> None:
+    """Worker process loop: warm matplotlib up, then run jobs received over ``conn``."""
+
+    os.environ["MPLBACKEND"] = "Agg"
+    os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import matplotlib
+
+    matplotlib.use("Agg")
+    # Import the renderers and the plotting stack now, so the first job does not pay for it.
+    from . import charts, diagrams  # noqa: F401
+    from .artifacts import pyplot
+
+    pyplot()
+
+    limited = sys.platform != "win32"
+    if limited:
+        signal.signal(signal.SIGXCPU, _cpu_time_exceeded)
+        if memory_mb:
+            _limit_memory(memory_mb)
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        job_id, fn, args, kwargs, directory = message
+        try:
+            if limited and cpu_seconds:
+                _set_cpu_budget(cpu_seconds)
+            with using_artifacts_dir(directory):
+                result = fn(*args, **kwargs)
+            reply = (job_id, True, result)
+        except MemoryError:
+            reply = (job_id, False, RenderLimitError("Render exceeded its memory limit."))
+        except BaseException as exc:  # noqa: BLE001 - reported to the caller
+            reply = (job_id, False, exc)
+        finally:
+            if limited and cpu_seconds:
+                _set_cpu_budget(None)
+        try:
+            conn.send(reply)
+        except Exception as exc:  # the result or exception could not be pickled
+            conn.send((job_id, False, RenderError(f"{type(exc).__name__}: {exc}")))
+
+
+class _Worker:
+    def __init__(self, context: Any, cpu_seconds: int, memory_mb: int) -> None:
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child, cpu_seconds, memory_mb),
+            name="ci-coach-render-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.job: RenderJob | None = None
+        self.ready = False
+        self._ready_lock = threading.Lock()
+
+    def wait_ready(self, timeout: float) -> None:
+        with self._ready_lock:
+            if not self.ready:
+                try:
+                    if not self.conn.poll(timeout):
+                        raise RenderError("Render worker did not start in time.")
+                    self.conn.recv()
+                except (EOFError, OSError) as exc:
+                    raise RenderError(
+                        f"Render worker exited during start-up (code {self.process.exitcode})."
+                    ) from exc
+                self.ready = True
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+_Task = Tuple[RenderJob, Callable[..., Any], tuple, Dict[str, Any], Path]
+
+
+class RenderPool:
+    """Fixed-size pool of render worker processes fed from one queue."""
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        cpu_seconds: int = DEFAULT_CPU_SECONDS,
+        memory_mb: int = DEFAULT_MEMORY_MB,
+    ) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self._queue: "queue.Queue[_Task | None]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._slots: List[_Worker | None] = []
+        self._inline: ThreadPoolExecutor | None = None
+        self._started = False
+        self._closed = False
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.running = 0
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self._waits: Deque[float] = deque(maxlen=1000)
+
+    @classmethod
+    def from_env(cls) -> "RenderPool":
+        """Configure from ``CI_COACH_RENDER_WORKERS``, ``_TIMEOUT_SECONDS``, ``_CPU_SECONDS`` and ``_MEMORY_MB``."""
+
+        return cls(
+            workers=int(os.getenv("CI_COACH_RENDER_WORKERS", DEFAULT_WORKERS)),
+            timeout=float(os.getenv("CI_COACH_RENDER_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS)),
+            cpu_seconds=int(os.getenv("CI_COACH_RENDER_CPU_SECONDS", DEFAULT_CPU_SECONDS)),
+            memory_mb=int(os.getenv("CI_COACH_RENDER_MEMORY_MB", DEFAULT_MEMORY_MB)),
+        )
+
+    def start(self) -> None:
+        """Start (and warm up) the worker processes; called on first submit if not before."""
+
+        with self._lock:
+            if self._started:
+                return
+            if self._closed:
+                raise RenderError("The render pool is closed.")
+            self._started = True
+            if self.workers <= 0:
+                # pyplot is not thread-safe: inline renders share a single thread.
+                self._inline = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ci-coach-render")
+                return
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                # forkserver avoids forking a parent that already runs LLM and HTTP threads.
+                # Preloading the renderers there means each worker (and each replacement
+                # after a timeout) is forked with matplotlib already imported.
+                self._context = multiprocessing.get_context("forkserver")
+                self._context.set_forkserver_preload(
+                    ["matplotlib.pyplot", "seaborn", "ci_coach.charts", "ci_coach.diagrams"]
+                )
+            else:
+                self._context = multiprocessing.get_context("spawn")
+            self._slots = [self._spawn() for _ in range(self.workers)]
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._dispatch, args=(index,), name=f"ci-coach-render-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        for worker in self._slots:
+            if worker is not None:
+                worker.wait_ready(timeout=60)
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._context, self.cpu_seconds, self.memory_mb)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> RenderJob:
+        """Queue ``fn(*args, **kwargs)`` and return its handle without waiting.
+
+        ``fn`` must be a module-level function and its arguments picklable. It runs with the
+        caller's current artifacts directory.
+        """
+
+        self.start()
+        job = RenderJob(id=next(self._ids), future=Future(), _cancel=self._cancel_running)
+        directory = artifacts_dir()
+        if self._inline is not None:
+            context = copy_context()
+            inner = self._inline.submit(context.run, self._run_inline, job, fn, args, kwargs)
+            inner.add_done_callback(lambda done: _chain(done, job.future))
+            return job
+        self._queue.put((job, fn, args, kwargs, directory))
+        return job
+
+    def render(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Submit ``fn`` and wait for its result."""
+
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _run_inline(self, job: RenderJob, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        if not job.future.set_running_or_notify_cancel():
+            raise CancelledError()
+        job.started_at = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._record(job)
+
+    def _record(self, job: RenderJob) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            if job.started_at is not None:
+                self._waits.append(job.started_at - job.submitted_at)
+                self._latencies.append(now - job.started_at)
+
+    def _dispatch(self, index: int) -> None:
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            job, fn, args, kwargs, directory = task
+            if not job.future.set_running_or_notify_cancel():
+                with self._lock:
+                    self.cancelled += 1
+                continue
+            worker = self._slots[index]
+            job.started_at = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                worker.job = job
+            try:
+                self._run_on(index, worker, job, fn, args, kwargs, directory)
+            except Exception as exc:  # noqa: BLE001 - e.g. a replacement worker failed to spawn
+                # Never leave the job pending, and keep this slot's dispatcher running.
+                if not job.future.done():
+                    with self._lock:
+                        self.failed += 1
+                    job.future.set_exception(
+                        exc if isinstance(exc, RenderError) else RenderError(f"Render worker failed: {exc}")
+                    )
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    worker.job = None
+                self._record(job)
+
+    def _run_on(
+        self,
+        index: int,
+        worker: _Worker,
+        job: RenderJob,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        directory: Path,
+    ) -> None:
+        deadline = job.started_at + self.timeout
+        try:
+            worker.wait_ready(timeout=60)
+            worker.conn.send((job.id, fn, args, kwargs, directory))
+            # Poll in short slices so a cancel request is noticed while the job runs.
+            while not worker.conn.poll(0.05):
+                if job.future.done() or time.perf_counter() > deadline or not worker.process.is_alive():
+                    break
+            else:
+                _, ok, value = worker.conn.recv()
+                with self._lock:
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                if not job.future.done():  # unless it was cancelled as the reply arrived
+                    if ok:
+                        job.future.set_result(value)
+                    else:
+                        job.future.set_exception(value)
+                return
+        except RenderError as exc:
+            # The worker did not start (or exited during start-up).
+            error: BaseException = exc
+        except Exception as exc:  # noqa: BLE001 - a dead pipe, or arguments that cannot be pickled
+            error = RenderError(f"Render worker failed: {exc}")
+        else:
+            if job.future.done():
+                error = CancelledError()
+            elif not worker.process.is_alive():
+                error = RenderLimitError(
+                    f"Render worker exited with code {worker.process.exitcode} (resource limit or crash)."
+                )
+            else:
+                error = RenderTimeoutError(f"Render did not finish within {self.timeout:.0f}s.")
+
+        # The worker is busy with (or lost) a job nobody wants any more: replace it.
+        worker.stop(kill=True)
+        with self._lock:
+            self.restarts += 1
+            if isinstance(error, CancelledError):
+                self.cancelled += 1
+            elif isinstance(error, RenderTimeoutError):
+                self.timeouts += 1
+            else:
+                self.failed += 1
+        if not job.future.done():
+            job.future.set_exception(error)
+        if not self._closed:
+            self._slots[index] = self._spawn()
+
+    def _cancel_running(self, job: RenderJob) -> bool:
+        # A running future cannot be cancelled; fail it so the dispatcher stops the worker.
+        if job.future.done():
+            return False
+        try:
+            job.future.set_exception(CancelledError())
+        except Exception:
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            waits = sorted(self._waits)
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+                "render_ms_p50": _percentile_ms(latencies, 0.5),
+                "render_ms_p95": _percentile_ms(latencies, 0.95),
+                "queue_ms_p95": _percentile_ms(waits, 0.95),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._inline is not None:
+            self._inline.shutdown(wait=True)
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=self.timeout + 5)
+        for worker in self._slots:
+            if worker is not None:
+                worker.stop()
+
+
+def _chain(source: Future, target: Future) -> None:
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def _percentile_ms(values: List[float], q: float) -> float | None:
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+
+
+_POOL: RenderPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    """Return the process-wide render pool, configured from the environment on first use."""
+
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = RenderPool.from_env()
+        return _POOL
+
+
+def set_render_pool(pool: RenderPool | None) -> None:
+    """Replace the process-wide render pool, closing the previous one."""
+
+    global _POOL
+    with _POOL_LOCK:
+        previous, _POOL = _POOL, pool
+    if previous is not None and previous is not pool:
+        previous.close()
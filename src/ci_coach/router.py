@@ -0,0 +1,360 @@
+"""Local fast-path intent routing ahead of the Supervisor LLM.
+
+Obvious turns (a pasted CSV block, "draw the fishbone") are routed by deterministic keyword
+rules. A small multinomial naive Bayes classifier, trained offline from the Supervisor
+decisions recorded in exported ``audit_log`` entries, covers the rest when it is confident.
+Anything below the confidence threshold falls back to the LLM Supervisor.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .datasets import CODE_BLOCK_PATTERN
+from .process_mining import is_event_log
+from .vsm import is_stage_table
+
+ROUTABLE_NODES = (
+    "problem",
+    "value_prop",
+    "process_map",
+    "sipoc",
+    "fishbone",
+    "five_whys",
+    "a3",
+    "kaizen",
+    "charts",
+    "vsm",
+)
+
+KEYWORD_RULES: Tuple[Tuple[str, re.Pattern[str]], ...] = (
+    ("charts", re.compile(r"\b(chart|plot|histogram|pareto|box ?plot|scatter|run chart|control chart|graph (?:of|the))\b")),
+    ("fishbone", re.compile(r"\b(fishbone|ishikawa|cause[- ]and[- ]effect)\b")),
+    ("five_whys", re.compile(r"\b(5[- ]?whys?|five whys?|root cause chain)\b")),
+    ("sipoc", re.compile(r"\bsipoc\b")),
+    ("a3", re.compile(r"\ba3\b")),
+    ("kaizen", re.compile(r"\b(kaizen|pdsa|pdca|countermeasure backlog)\b")),
+    (
+        "process_map",
+        re.compile(
+            r"\b(process map|swim ?lanes?|flow ?chart|map (?:the|our|this) process|process mining|event logs?)\b"
+        ),
+    ),
+    ("value_prop", re.compile(r"\b(value prop(?:osition)?|stakeholder value)\b")),
+    ("problem", re.compile(r"\b(problem statement|smart problem)\b")),
+    ("vsm", re.compile(r"\b(vsm|value[- ]stream(?: map)?|takt(?: time)?|little'?s law)\b")),
+)
+
+VSM_PATTERN = dict(KEYWORD_RULES)["vsm"]
+RULE_CONFIDENCE = 0.95
+# A pasted table on its own is a strong hint but not a request: a confident classifier, or
+# a router threshold above this, hands the turn to the Supervisor instead.
+DATASET_CONFIDENCE = 0.9
+# Rows of a pasted table parsed to tell an event log from a table that shares its column names.
+EVENT_SAMPLE_ROWS = 200
+
+# Intent and follow-on suggestions for locally routed turns, standing in for the
+# Supervisor's ``updated_intent`` and ``suggested_next``.
+NODE_GUIDANCE: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "problem": (
+        "Define a SMART problem statement.",
+        ("Map the current process", "Build a SIPOC", "Chart the baseline"),
+    ),
+    "value_prop": (
+        "Clarify the value delivered to stakeholders.",
+        ("Write the problem statement", "Build a SIPOC", "Map the current process"),
+    ),
+    "process_map": (
+        "Map the current process.",
+        ("Compute the value stream", "Build a fishbone for the bottleneck", "Chart step cycle times"),
+    ),
+    "sipoc": ("Scope the process with a SIPOC.", ("Map the process", "Chart the key output", "Build a fishbone")),
+    "fishbone": ("Explore the causes of the problem.", ("Run a 5 Whys", "Chart the suspected causes", "Draft an A3")),
+    "five_whys": ("Trace the root cause.", ("Plan countermeasures in a kaizen", "Draft an A3", "Chart the evidence")),
+    "a3": ("Summarise the improvement on an A3.", ("Plan a kaizen", "Chart the results", "Review the root cause")),
+    "kaizen": ("Plan and track countermeasures.", ("Chart the results", "Update the A3", "Review the process map")),
+    "charts": (
+        "Chart the data.",
+        ("Check the chart for special causes", "Build a fishbone", "Write the problem statement"),
+    ),
+    "vsm": ("Compute the value stream.", ("Build a fishbone for the bottleneck", "Plan a kaizen", "Chart cycle times")),
+}
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class RouteDecision:
+    """A routing choice made without the LLM Supervisor."""
+
+    node: str
+    confidence: float
+    path: str
+    latency_ms: float = 0.0
+
+
+def tokenize(text: str) -> List[str]:
+    """Return lower-cased word unigrams and bigrams for classification."""
+
+    words = _TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def _prose(message: str, blocks: Sequence[re.Match] | None = None) -> str:
+    """``message`` without its fenced code blocks.
+
+    Keywords and the classifier only look at the prose: pasted rows can be megabytes long
+    and mention anything, such as an activity called "A3".
+    """
+
+    if blocks is None:
+        blocks = list(CODE_BLOCK_PATTERN.finditer(message))
+    bounds = [0, *(index for block in blocks for index in block.span()), len(message)]
+    return " ".join(message[start:end] for start, end in zip(bounds[::2], bounds[1::2]))
+
+
+def _is_event_table(body: str, header: str) -> bool:
+    """Whether a pasted table's first rows, not just its header, look like an event log.
+
+    Only :data:`EVENT_SAMPLE_ROWS` rows are parsed, with the header's delimiter and the C
+    parser, so a large paste stays cheap here; the process map coach checks every row.
+    """
+
+    delimiter = next((char for char in "\t,;|" if char in header), ",")
+    lines = body.split("\n", EVENT_SAMPLE_ROWS + 1)[: EVENT_SAMPLE_ROWS + 1]
+    try:
+        rows = pd.read_csv(io.StringIO("\n".join(lines)), sep=delimiter)
+    except ValueError:
+        return False
+    return is_event_log(rows.columns, rows)
+
+
+def _table_node(tables: Sequence[str], lowered: str) -> str:
+    """The coach a pasted table points to: process map, VSM or charts."""
+
+    bodies = [body.strip() for body in tables]
+    headers = [body.split("\n", 1)[0] for body in bodies]
+    columns = [re.split(r"[,\t;|]", header) for header in headers]
+    if any(
+        is_event_log(names) and _is_event_table(body, header)
+        for names, body, header in zip(columns, bodies, headers)
+    ):
+        return "process_map"
+    if any(is_stage_table(names) for names in columns) or VSM_PATTERN.search(lowered):
+        return "vsm"
+    return "charts"
+
+
+def match_rules(message: str) -> Optional[RouteDecision]:
+    """Apply the deterministic rules; only an unambiguous match produces a decision.
+
+    Exactly one coach named by keyword wins. A pasted table goes to the charts coach, to the
+    process map coach when it is an event log, or to the VSM node when it is a stage table
+    or the message asks for a value stream map, but only when the message names no other
+    coach, and with the lower :data:`DATASET_CONFIDENCE` unless the keywords agree.
+    """
+
+    blocks = list(CODE_BLOCK_PATTERN.finditer(message))
+    lowered = _prose(message, blocks).lower()
+    matched = {node for node, pattern in KEYWORD_RULES if pattern.search(lowered)}
+    tables = [
+        match.group("body")
+        for match in blocks
+        if (match.group("lang") or "csv").lower() in {"csv", "tsv", "text", "table"}
+    ]
+    if tables:
+        node = _table_node(tables, lowered)
+        if matched <= {node}:
+            return RouteDecision(node, RULE_CONFIDENCE if matched else DATASET_CONFIDENCE, "rules")
+
+    if len(matched) == 1:
+        return RouteDecision(matched.pop(), RULE_CONFIDENCE, "rules")
+    return None
+
+
+class IntentClassifier:
+    """Multinomial naive Bayes over message unigrams and bigrams."""
+
+    def __init__(self, alpha: float = 1.0) -> None:
+        self.alpha = alpha
+        self.class_counts: Counter[str] = Counter()
+        self.token_counts: Dict[str, Counter[str]] = defaultdict(Counter)
+        self.vocabulary: set[str] = set()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.class_counts.values())
+
+    def fit(self, samples: Iterable[Tuple[str, str]]) -> "IntentClassifier":
+        for text, label in samples:
+            tokens = tokenize(text)
+            self.class_counts[label] += 1
+            self.token_counts[label].update(tokens)
+            self.vocabulary.update(tokens)
+        return self
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return the most likely node and its posterior probability."""
+
+        if not self.class_counts:
+            raise ValueError("Classifier has not been trained.")
+
+        tokens = [token for token in tokenize(text) if token in self.vocabulary]
+        total = self.samples
+        vocab_size = len(self.vocabulary)
+        scores: Dict[str, float] = {}
+        for label, count in self.class_counts.items():
+            label_tokens = self.token_counts[label]
+            denominator = sum(label_tokens.values()) + self.alpha * vocab_size
+            score = math.log(count / total)
+            for token in tokens:
+                score += math.log((label_tokens[token] + self.alpha) / denominator)
+            scores[label] = score
+
+        best = max(scores, key=scores.get)
+        peak = scores[best]
+        normaliser = sum(math.exp(score - peak) for score in scores.values())
+        return best, 1.0 / normaliser
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "alpha": self.alpha,
+            "class_counts": dict(self.class_counts),
+            "token_counts": {label: dict(tokens) for label, tokens in self.token_counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IntentClassifier":
+        classifier = cls(alpha=data.get("alpha", 1.0))
+        classifier.class_counts = Counter(data.get("class_counts", {}))
+        for label, tokens in data.get("token_counts", {}).items():
+            classifier.token_counts[label] = Counter(tokens)
+            classifier.vocabulary.update(tokens)
+        return classifier
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path: Path) -> "IntentClassifier":
+        return cls.from_dict(json.loads(path.read_text()))
+
+
+def training_samples(audit_log: Sequence[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Pair each user message with the node the LLM Supervisor chose for it.
+
+    Decisions made by the fast path itself are skipped so the classifier does not learn from
+    its own output.
+    """
+
+    samples: List[Tuple[str, str]] = []
+    last_user_message: Optional[str] = None
+    for entry in audit_log:
+        if entry.get("role") == "user":
+            last_user_message = entry.get("content")
+            continue
+        if entry.get("node") != "supervisor" or entry.get("route_path", "llm") != "llm":
+            continue
+        decision = entry.get("decision")
+        text = entry.get("user_message") or last_user_message
+        if text and decision in ROUTABLE_NODES:
+            samples.append((_prose(text), decision))
+        last_user_message = None
+    return samples
+
+
+class IntentRouter:
+    """Route turns locally and report whether the LLM Supervisor is still needed."""
+
+    def __init__(
+        self,
+        classifier: IntentClassifier | None = None,
+        threshold: float = 0.85,
+        min_samples: int = 20,
+    ) -> None:
+        self.classifier = classifier
+        self.threshold = threshold
+        self.min_samples = min_samples
+
+    @classmethod
+    def from_env(cls) -> "IntentRouter":
+        """Build a router from ``CI_COACH_ROUTER_MODEL`` and ``CI_COACH_ROUTER_THRESHOLD``."""
+
+        classifier = None
+        model_path = os.getenv("CI_COACH_ROUTER_MODEL")
+        if model_path and Path(model_path).exists():
+            classifier = IntentClassifier.load(Path(model_path))
+        return cls(classifier, threshold=float(os.getenv("CI_COACH_ROUTER_THRESHOLD", "0.85")))
+
+    def _classifier_ready(self) -> bool:
+        # A one-class or tiny model is trivially "confident"; leave those turns to the LLM.
+        return (
+            self.classifier is not None
+            and len(self.classifier.class_counts) > 1
+            and self.classifier.samples >= self.min_samples
+        )
+
+    def route(self, message: str) -> Optional[RouteDecision]:
+        """Return a local decision, or ``None`` when the LLM Supervisor should decide."""
+
+        start = time.perf_counter()
+        decision = match_rules(message)
+        if (decision is None or decision.confidence < RULE_CONFIDENCE) and self._classifier_ready():
+            node, confidence = self.classifier.predict(_prose(message))
+            if confidence >= self.threshold and (decision is None or confidence > decision.confidence):
+                decision = RouteDecision(node, confidence, "classifier")
+        if decision is not None and decision.confidence < self.threshold:
+            decision = None
+        if decision is not None:
+            decision.latency_ms = (time.perf_counter() - start) * 1000
+        return decision
+
+
+_ROUTER: IntentRouter | None = None
+
+
+def get_router() -> IntentRouter | None:
+    """Return the process-wide router, or ``None`` when ``CI_COACH_FAST_ROUTER=0``."""
+
+    global _ROUTER
+    if os.getenv("CI_COACH_FAST_ROUTER", "1").lower() in {"0", "false", "no", "off"}:
+        return None
+    if _ROUTER is None:
+        _ROUTER = IntentRouter.from_env()
+    return _ROUTER
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Train the fast-path intent classifier from exported CI Coach sessions."
+    )
+    parser.add_argument("transcripts", nargs="+", type=Path, help="JSON files written by --transcript.")
+    parser.add_argument("--output", type=Path, required=True, help="Where to write the model JSON.")
+    args = parser.parse_args(argv)
+
+    samples: List[Tuple[str, str]] = []
+    for transcript in args.transcripts:
+        state = json.loads(transcript.read_text())
+        samples.extend(training_samples(state.get("audit_log", [])))
+    if not samples:
+        parser.error("No Supervisor decisions found in the supplied transcripts.")
+
+    classifier = IntentClassifier().fit(samples)
+    classifier.save(args.output)
+    print(f"Trained on {len(samples)} decisions across {len(classifier.class_counts)} nodes -> {args.output}")
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main(sys.argv[1:])
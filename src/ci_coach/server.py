@@ -0,0 +1,497 @@
+"""Multi-session HTTP service hosting many CI Coach conversations in one process.
+
+Every session is an isolated ``CICoachApp`` with its own artifacts directory. Turns run
+through ``CICoachApp.asend`` on a single event loop:
+
+* a per-session lock serialises turns of the same conversation, and is taken before a turn
+  slot so a request queued behind its own session's turn does not hold a slot;
+* at most ``max_concurrent_turns`` turns run at once, further requests wait in a bounded
+  queue and are rejected with ``503`` once ``max_queued_turns`` are already waiting;
+* every turn is checkpointed to the session store from a worker thread; sessions idle for
+  ``idle_seconds`` (or beyond ``max_sessions``) are dropped from memory and reloaded on
+  their next request;
+* ``DELETE`` waits for an in-flight turn, then removes the checkpoints and the session's
+  artifacts directory.
+
+Endpoints (JSON bodies)::
+
+    POST   /sessions                      -> {"session_id": ...}
+    POST   /sessions/{id}/messages        {"message": "..."} -> {"response": ..., ...}
+    GET    /sessions/{id}                 -> exported state
+    DELETE /sessions/{id}
+    GET    /metrics
+    GET    /healthz
+
+Run ``ci-coach-server --port 8080``; with ``CI_COACH_LLM_PROVIDER=fake`` it runs fully
+offline against the scripted model.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import shutil
+import sys
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Deque, Dict, Tuple
+
+from .app import CICoachApp
+from .artifacts import default_artifacts_dir
+from .llm_cache import CacheMissError
+from .persistence import SessionCheckpointer
+from .policy import TurnPolicy
+from .render_pool import get_render_pool
+from .state import CIState
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class ServerBusyError(RuntimeError):
+    """Raised when the turn queue is full and the request should be retried later."""
+
+
+class SessionNotFoundError(KeyError):
+    """Raised for an unknown session id."""
+
+
+@dataclass
+class _Session:
+    app: CICoachApp
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+    turns: int = 0
+    # Requests holding a reference to this session (queued or running); never evicted while > 0.
+    active: int = 0
+    # Set when the session is deleted, so requests still waiting on its lock do not run.
+    deleted: bool = False
+
+
+class SessionManager:
+    """Own the in-memory sessions, the turn admission limits and idle eviction.
+
+    Checkpoint reads and writes run on worker threads, so SQLite I/O and state
+    serialisation never block the event loop.
+    """
+
+    def __init__(
+        self,
+        store: SessionCheckpointer,
+        artifacts_root: Path | None = None,
+        policy: TurnPolicy | None = None,
+        max_sessions: int = 1000,
+        idle_seconds: float = 900.0,
+        max_concurrent_turns: int = 64,
+        max_queued_turns: int = 256,
+    ) -> None:
+        self.store = store
+        self.artifacts_root = Path(artifacts_root or default_artifacts_dir() / "sessions")
+        self.policy = policy or TurnPolicy.from_env()
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.max_concurrent_turns = max_concurrent_turns
+        self.max_queued_turns = max_queued_turns
+        self._sessions: Dict[str, _Session] = {}
+        self._turn_slots = asyncio.Semaphore(max_concurrent_turns)
+        self._waiting = 0
+        self._running = 0
+        self.counters = {
+            "turns": 0,
+            "rejected": 0,
+            "errors": 0,
+            "evicted": 0,
+            "restored": 0,
+        }
+        self._turn_latency_ms: Deque[float] = deque(maxlen=1000)
+
+    def _new_app(self, session_id: str, state: CIState | None = None) -> CICoachApp:
+        return CICoachApp(
+            policy=self.policy,
+            artifacts_dir=self.artifacts_root / session_id,
+            state=state,
+            session_id=session_id,
+            checkpointer=self.store,
+        )
+
+    async def create(self) -> str:
+        session_id = uuid.uuid4().hex
+        session = _Session(self._new_app(session_id))
+        await session.app.acheckpoint()
+        self._sessions[session_id] = session
+        await self._evict_overflow()
+        return session_id
+
+    async def _acquire(self, session_id: str) -> _Session:
+        """Return the session, restoring it from the store, with the caller counted as active.
+
+        Callers must decrement ``active`` when they are done with the session.
+        """
+
+        if not _SESSION_ID_PATTERN.match(session_id):
+            raise SessionNotFoundError(session_id)
+        session = self._sessions.get(session_id)
+        if session is None:
+            state = await asyncio.to_thread(self.store.load, session_id)
+            if state is None:
+                raise SessionNotFoundError(session_id)
+            # Another request may have restored the session while this one was loading it.
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self._new_app(session_id, state))
+                self.counters["restored"] += 1
+        session.active += 1
+        session.last_used = time.monotonic()
+        try:
+            await self._evict_overflow()
+        except BaseException:
+            session.active -= 1
+            raise
+        return session
+
+    async def send(self, session_id: str, message: str) -> Dict[str, Any]:
+        """Run one turn, waiting for a free slot unless the queue is already full."""
+
+        if self._waiting >= self.max_queued_turns:
+            self.counters["rejected"] += 1
+            raise ServerBusyError("Too many turns in flight; retry shortly.")
+        session = await self._acquire(session_id)
+
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        waiting = True
+        try:
+            # The session lock comes first: requests queued behind a busy session must not
+            # hold turn slots that other sessions could use meanwhile.
+            async with session.lock, self._turn_slots:
+                self._waiting -= 1
+                waiting = False
+                if session.deleted:
+                    raise SessionNotFoundError(session_id)
+                seen = (len(session.app.state.charts), len(session.app.state.diagrams))
+                self._running += 1
+                try:
+                    response = await session.app.asend(message)
+                except Exception:
+                    self.counters["errors"] += 1
+                    raise
+                finally:
+                    self._running -= 1
+        finally:
+            if waiting:
+                self._waiting -= 1
+            session.active -= 1
+
+        session.turns += 1
+        session.last_used = time.monotonic()
+        self.counters["turns"] += 1
+        latency_ms = (time.perf_counter() - queued_at) * 1000
+        self._turn_latency_ms.append(latency_ms)
+        turn = session.app.state.audit_log[-1]
+        return {
+            "session_id": session_id,
+            "response": response,
+            "decision": session.app.state.router_decision,
+            "charts": session.app.state.charts[seen[0]:],
+            "diagrams": session.app.state.diagrams[seen[1]:],
+            "llm_calls": turn.get("llm_calls"),
+            "queue_ms": round(latency_ms - turn.get("latency_ms", 0.0), 1),
+            "latency_ms": round(latency_ms, 1),
+        }
+
+    async def export(self, session_id: str) -> Dict[str, Any]:
+        session = await self._acquire(session_id)
+        try:
+            async with session.lock:
+                if session.deleted:
+                    raise SessionNotFoundError(session_id)
+                # export_state may wait for a background summary; keep that off the loop.
+                return await asyncio.to_thread(session.app.export_state)
+        finally:
+            session.active -= 1
+
+    async def delete(self, session_id: str) -> None:
+        """Delete the session's checkpoints and artifacts once any in-flight turn has finished."""
+
+        if not _SESSION_ID_PATTERN.match(session_id):
+            raise SessionNotFoundError(session_id)
+        session = self._sessions.get(session_id)
+        if session is None:
+            if not await asyncio.to_thread(self.store.__contains__, session_id):
+                raise SessionNotFoundError(session_id)
+            await asyncio.to_thread(self._purge, session_id)
+            return
+        session.active += 1
+        try:
+            # Holding the lock keeps a running turn from checkpointing the session again after
+            # it is deleted; turns still waiting for the lock see ``deleted`` and give up.
+            async with session.lock:
+                session.deleted = True
+                if self._sessions.get(session_id) is session:
+                    del self._sessions[session_id]
+                await asyncio.to_thread(self._purge, session_id)
+        finally:
+            session.active -= 1
+
+    def _purge(self, session_id: str) -> None:
+        self.store.delete(session_id)
+        shutil.rmtree(self.artifacts_root / session_id, ignore_errors=True)
+
+    async def _evict(self, session_id: str) -> bool:
+        session = self._sessions[session_id]
+        async with session.lock:
+            if session.deleted:
+                return False
+            # Turns are already checkpointed; this only catches a reset or applied summary.
+            await session.app.acheckpoint()
+        if session.active or self._sessions.get(session_id) is not session:
+            # A request picked the session up while it was being saved.
+            return False
+        del self._sessions[session_id]
+        self.store.release(session_id)
+        self.counters["evicted"] += 1
+        return True
+
+    async def _evict_overflow(self) -> None:
+        if len(self._sessions) <= self.max_sessions:
+            return
+        idle = sorted((s.last_used, sid) for sid, s in self._sessions.items() if not s.active)
+        for _, session_id in idle[: len(self._sessions) - self.max_sessions]:
+            if session_id in self._sessions:
+                await self._evict(session_id)
+
+    async def evict_idle(self) -> int:
+        """Move sessions idle for longer than ``idle_seconds`` to the store."""
+
+        cutoff = time.monotonic() - self.idle_seconds
+        expired = [
+            sid
+            for sid, s in self._sessions.items()
+            if s.last_used < cutoff and not s.active
+        ]
+        evicted = 0
+        for session_id in expired:
+            if session_id in self._sessions and await self._evict(session_id):
+                evicted += 1
+        return evicted
+
+    async def run_evictor(self, interval: float = 30.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+
+    async def flush(self) -> None:
+        """Persist every in-memory session (used on shutdown)."""
+
+        for session_id in list(self._sessions):
+            if session_id in self._sessions:
+                await self._evict(session_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = sorted(self._turn_latency_ms)
+        return {
+            "sessions_in_memory": len(self._sessions),
+            "turns_running": self._running,
+            "turns_waiting": self._waiting,
+            "max_concurrent_turns": self.max_concurrent_turns,
+            "max_queued_turns": self.max_queued_turns,
+            **self.counters,
+            "turn_p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+            "turn_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 1) if latencies else None,
+            "render_pool": get_render_pool().stats(),
+        }
+
+
+class CoachHTTPServer:
+    """Minimal HTTP/1.1 front end for :class:`SessionManager` on ``asyncio`` streams."""
+
+    def __init__(self, manager: SessionManager, host: str = "127.0.0.1", port: int = 8080) -> None:
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload, extra_headers = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, extra_headers, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except _BadRequest as exc:
+            _write_response(writer, exc.status, {"error": str(exc)}, {}, keep_alive=False)
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        parts = [part for part in path.split("?", 1)[0].split("/") if part]
+        try:
+            if parts == ["healthz"] and method == "GET":
+                return HTTPStatus.OK, {"status": "ok"}, {}
+            if parts == ["metrics"] and method == "GET":
+                return HTTPStatus.OK, self.manager.metrics(), {}
+            if parts == ["sessions"] and method == "POST":
+                return HTTPStatus.CREATED, {"session_id": await self.manager.create()}, {}
+            if len(parts) == 2 and parts[0] == "sessions":
+                if method == "GET":
+                    return HTTPStatus.OK, await self.manager.export(parts[1]), {}
+                if method == "DELETE":
+                    await self.manager.delete(parts[1])
+                    return HTTPStatus.NO_CONTENT, None, {}
+            if len(parts) == 3 and parts[0] == "sessions" and parts[2] == "messages" and method == "POST":
+                message = _json_body(body).get("message")
+                if not isinstance(message, str) or not message.strip():
+                    return HTTPStatus.BAD_REQUEST, {"error": "Body must contain a non-empty 'message'."}, {}
+                return HTTPStatus.OK, await self.manager.send(parts[1], message), {}
+        except SessionNotFoundError as exc:
+            return HTTPStatus.NOT_FOUND, {"error": f"Unknown session {exc.args[0]!r}."}, {}
+        except ServerBusyError as exc:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(exc)}, {"Retry-After": "1"}
+        except CacheMissError as exc:
+            return HTTPStatus.CONFLICT, {"error": str(exc)}, {}
+        except _BadRequest as exc:
+            return exc.status, {"error": str(exc)}, {}
+        except Exception as exc:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)}, {}
+        return HTTPStatus.NOT_FOUND, {"error": f"No route for {method} {path}."}, {}
+
+
+class _BadRequest(Exception):
+    def __init__(self, message: str, status: int = HTTPStatus.BAD_REQUEST) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _json_body(body: bytes) -> Dict[str, Any]:
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError as exc:
+        raise _BadRequest(f"Invalid JSON body: {exc}") from exc
+    if not isinstance(data, dict):
+        raise _BadRequest("JSON body must be an object.")
+    return data
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Tuple[str, str, Dict[str, str], bytes] | None:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _version = request_line.decode("latin-1").split()
+    except ValueError as exc:
+        raise _BadRequest("Malformed request line.") from exc
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY_BYTES:
+        raise _BadRequest("Request body too large.", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+
+def _write_response(
+    writer: asyncio.StreamWriter,
+    status: int,
+    payload: Any,
+    headers: Dict[str, str],
+    keep_alive: bool,
+) -> None:
+    body = b"" if payload is None else json.dumps(payload, default=str).encode("utf-8")
+    status = HTTPStatus(status)
+    lines = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        *(f"{name}: {value}" for name, value in headers.items()),
+    ]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve many CI Coach sessions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--store",
+        type=Path,
+        default=default_artifacts_dir() / "sessions.sqlite",
+        help="SQLite file holding session checkpoints (default: artifacts/sessions.sqlite).",
+    )
+    parser.add_argument("--max-sessions", type=int, default=1000, help="Sessions kept in memory.")
+    parser.add_argument("--idle-seconds", type=float, default=900.0, help="Evict sessions idle this long.")
+    parser.add_argument("--max-concurrent-turns", type=int, default=64, help="Turns running at once.")
+    parser.add_argument(
+        "--max-queued-turns",
+        type=int,
+        default=256,
+        help="Turns allowed to wait for a slot before requests get 503 (default: 256).",
+    )
+    return parser.parse_args(argv)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    manager = SessionManager(
+        SessionCheckpointer(args.store),
+        max_sessions=args.max_sessions,
+        idle_seconds=args.idle_seconds,
+        max_concurrent_turns=args.max_concurrent_turns,
+        max_queued_turns=args.max_queued_turns,
+    )
+    # Start the render workers before accepting requests so the first chart is not slow.
+    await asyncio.to_thread(get_render_pool().start)
+    server = CoachHTTPServer(manager, args.host, args.port)
+    await server.start()
+    evictor = asyncio.create_task(manager.run_evictor(min(30.0, args.idle_seconds)))
+    print(f"CI Coach server listening on http://{server.host}:{server.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        evictor.cancel()
+        await server.close()
+        await manager.flush()
+        get_render_pool().close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main(sys.argv[1:])
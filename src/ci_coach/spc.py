@@ -0,0 +1,301 @@
+"""Statistical process control: control limits and run-rule checks, vectorised with numpy.
+
+* :func:`imr` - Individuals and Moving Range charts; sigma is estimated from the average
+  moving range (``MR-bar / d2``), not the overall standard deviation, so shifts and trends
+  in the data do not widen the limits.
+* :func:`xbar_r` and :func:`xbar_s` - subgroup mean charts with Range or Standard deviation
+  charts, using the usual ``A2/D3/D4`` and ``A3/B3/B4`` constants.
+* :func:`run_rules` - the eight Nelson rules (rules 1, 5, 6 and 2 are the Western Electric
+  zone rules) evaluated as rolling windows over boolean arrays, so each rule is a handful of
+  array operations however long the series is.
+
+Results are :class:`SPCResult` objects whose :meth:`SPCResult.to_dict` is compact enough to
+keep in the conversation state and cite in a reply.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from math import gamma, sqrt
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# d2 and d3 (mean and standard deviation of the relative range) for subgroup sizes 2..25.
+_D2 = (
+    1.128, 1.693, 2.059, 2.326, 2.534, 2.704, 2.847, 2.970, 3.078, 3.173, 3.258, 3.336,
+    3.407, 3.472, 3.532, 3.588, 3.640, 3.689, 3.735, 3.778, 3.819, 3.858, 3.895, 3.931,
+)
+_D3_CONST = (
+    0.853, 0.888, 0.880, 0.864, 0.848, 0.833, 0.820, 0.808, 0.797, 0.787, 0.778, 0.770,
+    0.763, 0.756, 0.750, 0.744, 0.739, 0.734, 0.729, 0.724, 0.720, 0.716, 0.712, 0.708,
+)
+MAX_SUBGROUP = 25
+
+NELSON_RULES = {
+    1: "1 point beyond 3 sigma",
+    2: "9 points in a row on one side of the centre line",
+    3: "6 points in a row steadily increasing or decreasing",
+    4: "14 points in a row alternating up and down",
+    5: "2 of 3 points beyond 2 sigma on the same side",
+    6: "4 of 5 points beyond 1 sigma on the same side",
+    7: "15 points in a row within 1 sigma",
+    8: "8 points in a row beyond 1 sigma on either side",
+}
+WESTERN_ELECTRIC_RULES = (1, 5, 6, 2)
+MAX_CITED_POINTS = 10
+
+
+def d2(n: int) -> float:
+    return _D2[_constant_index(n)]
+
+
+def c4(n: int) -> float:
+    """Bias correction of the sample standard deviation for subgroups of ``n``."""
+
+    return sqrt(2 / (n - 1)) * gamma(n / 2) / gamma((n - 1) / 2)
+
+
+def _constant_index(n: int) -> int:
+    if not 2 <= n <= MAX_SUBGROUP:
+        raise ValueError(f"Subgroup size must be between 2 and {MAX_SUBGROUP}, got {n}.")
+    return n - 2
+
+
+@dataclass
+class ControlLimits:
+    center: float
+    lcl: float
+    ucl: float
+
+    def to_dict(self) -> Dict[str, float]:
+        return {key: round(float(value), 6) for key, value in self.__dict__.items()}
+
+
+@dataclass
+class RuleViolation:
+    """Points (indices into the charted series) that complete a rule's pattern."""
+
+    rule: int
+    indices: np.ndarray
+
+    @property
+    def description(self) -> str:
+        return NELSON_RULES[self.rule]
+
+    def to_dict(self, labels: Sequence[Any] | None = None) -> Dict[str, Any]:
+        cited = self.indices[:MAX_CITED_POINTS]
+        return {
+            "rule": self.rule,
+            "description": self.description,
+            "count": int(self.indices.size),
+            "points": [str(labels[i]) for i in cited] if labels is not None else cited.tolist(),
+        }
+
+
+@dataclass
+class SPCResult:
+    """Limits and rule violations for a pair of control charts."""
+
+    chart: str
+    points: np.ndarray
+    limits: ControlLimits
+    sigma: float
+    dispersion: np.ndarray
+    dispersion_limits: ControlLimits
+    subgroup_size: int = 1
+    violations: List[RuleViolation] = field(default_factory=list)
+    dispersion_violations: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+
+    @property
+    def out_of_control(self) -> bool:
+        return bool(self.violations) or bool(self.dispersion_violations.size)
+
+    def to_dict(self, labels: Sequence[Any] | None = None) -> Dict[str, Any]:
+        """Return a JSON-ready summary; ``labels`` names the charted points (e.g. their dates)."""
+
+        return {
+            "chart": self.chart,
+            "points": int(self.points.size),
+            "subgroup_size": self.subgroup_size,
+            "sigma": round(float(self.sigma), 6),
+            "limits": self.limits.to_dict(),
+            "dispersion_limits": self.dispersion_limits.to_dict(),
+            "violations": [violation.to_dict(labels) for violation in self.violations],
+            "dispersion_beyond_limits": int(self.dispersion_violations.size),
+            "in_control": not self.out_of_control,
+        }
+
+    def describe(self) -> str:
+        """One or two sentences suitable for a coach reply."""
+
+        limits = self.limits
+        text = (
+            f"{self.chart} limits: centre {limits.center:.4g}, LCL {limits.lcl:.4g}, UCL {limits.ucl:.4g} "
+            f"(sigma {self.sigma:.3g}, {self.points.size:,} points)."
+        )
+        if not self.out_of_control:
+            return text + " No run-rule violations; the process looks stable."
+        found = [f"rule {v.rule} ({v.description}): {v.indices.size}" for v in self.violations]
+        if self.dispersion_violations.size:
+            found.append(f"{self.dispersion_violations.size} dispersion points outside their limits")
+        return text + " Signals - " + "; ".join(found) + "."
+
+
+def _clean(values: Sequence[float]) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    return values if finite.all() else values[finite]
+
+
+def imr(values: Sequence[float], rules: Sequence[int] = tuple(NELSON_RULES)) -> SPCResult:
+    """Individuals and Moving Range charts for ``values`` in time order."""
+
+    x = _clean(values)
+    if x.size < 2:
+        raise ValueError("An I-MR chart needs at least two observations.")
+    moving_range = np.abs(np.diff(x))
+    mr_bar = moving_range.mean()
+    sigma = mr_bar / d2(2)
+    center = x.mean()
+    index = _constant_index(2)
+    d4 = 1 + 3 * _D3_CONST[index] / _D2[index]
+    mr_limits = ControlLimits(center=mr_bar, lcl=0.0, ucl=d4 * mr_bar)
+    return SPCResult(
+        chart="I-MR",
+        points=x,
+        limits=ControlLimits(center=center, lcl=center - 3 * sigma, ucl=center + 3 * sigma),
+        sigma=sigma,
+        dispersion=moving_range,
+        dispersion_limits=mr_limits,
+        violations=run_rules(x, center, sigma, rules),
+        # Moving range i spans points i and i + 1; cite the later one.
+        dispersion_violations=np.flatnonzero(moving_range > mr_limits.ucl) + 1,
+    )
+
+
+def _subgroups(values: Sequence[float], size: int) -> np.ndarray:
+    x = _clean(values)
+    count = x.size // size
+    if count < 2:
+        raise ValueError(f"Need at least two complete subgroups of {size} observations.")
+    # A trailing partial subgroup is left out of the limits.
+    return x[: count * size].reshape(count, size)
+
+
+def xbar_r(values: Sequence[float], subgroup_size: int, rules: Sequence[int] = tuple(NELSON_RULES)) -> SPCResult:
+    """X-bar and Range charts for consecutive subgroups of ``subgroup_size`` observations."""
+
+    index = _constant_index(subgroup_size)
+    groups = _subgroups(values, subgroup_size)
+    means = groups.mean(axis=1)
+    ranges = np.ptp(groups, axis=1)
+    grand_mean, r_bar = means.mean(), ranges.mean()
+    sigma = r_bar / _D2[index]
+    sigma_mean = sigma / sqrt(subgroup_size)
+    factor = 3 * _D3_CONST[index] / _D2[index]
+    r_limits = ControlLimits(center=r_bar, lcl=max(0.0, 1 - factor) * r_bar, ucl=(1 + factor) * r_bar)
+    return SPCResult(
+        chart="X-bar/R",
+        points=means,
+        limits=ControlLimits(center=grand_mean, lcl=grand_mean - 3 * sigma_mean, ucl=grand_mean + 3 * sigma_mean),
+        sigma=sigma,
+        dispersion=ranges,
+        dispersion_limits=r_limits,
+        subgroup_size=subgroup_size,
+        violations=run_rules(means, grand_mean, sigma_mean, rules),
+        dispersion_violations=np.flatnonzero((ranges > r_limits.ucl) | (ranges < r_limits.lcl)),
+    )
+
+
+def xbar_s(values: Sequence[float], subgroup_size: int, rules: Sequence[int] = tuple(NELSON_RULES)) -> SPCResult:
+    """X-bar and S charts; preferred over X-bar/R for subgroups larger than about 10."""
+
+    _constant_index(subgroup_size)
+    groups = _subgroups(values, subgroup_size)
+    means = groups.mean(axis=1)
+    stds = groups.std(axis=1, ddof=1)
+    grand_mean, s_bar = means.mean(), stds.mean()
+    bias = c4(subgroup_size)
+    sigma = s_bar / bias
+    sigma_mean = sigma / sqrt(subgroup_size)
+    spread = 3 * sqrt(1 - bias**2) / bias
+    s_limits = ControlLimits(center=s_bar, lcl=max(0.0, 1 - spread) * s_bar, ucl=(1 + spread) * s_bar)
+    return SPCResult(
+        chart="X-bar/S",
+        points=means,
+        limits=ControlLimits(center=grand_mean, lcl=grand_mean - 3 * sigma_mean, ucl=grand_mean + 3 * sigma_mean),
+        sigma=sigma,
+        dispersion=stds,
+        dispersion_limits=s_limits,
+        subgroup_size=subgroup_size,
+        violations=run_rules(means, grand_mean, sigma_mean, rules),
+        dispersion_violations=np.flatnonzero((stds > s_limits.ucl) | (stds < s_limits.lcl)),
+    )
+
+
+def control_chart(values: Sequence[float], subgroup_size: int | None = None) -> SPCResult:
+    """Pick the conventional chart: I-MR for individuals, X-bar/R up to 10, X-bar/S above."""
+
+    if not subgroup_size or subgroup_size < 2:
+        return imr(values)
+    if subgroup_size <= 10:
+        return xbar_r(values, subgroup_size)
+    return xbar_s(values, subgroup_size)
+
+
+def _window_count(flags: np.ndarray, width: int) -> np.ndarray:
+    """Number of true flags in the window of ``width`` ending at each index (0 before it fills).
+
+    The rule windows are at most 15 wide, so summing shifted int8 views is several times
+    faster than differencing a 64-bit cumulative sum.
+    """
+
+    counts = flags.astype(np.int8)
+    for shift in range(1, width):
+        counts[shift:] += flags[:-shift]
+    counts[: width - 1] = 0
+    return counts
+
+
+def _run(flags: np.ndarray, width: int) -> np.ndarray:
+    """Whether each index ends ``width`` consecutive true flags."""
+
+    run = flags.copy()
+    for shift in range(1, width):
+        run[shift:] &= flags[:-shift]
+    run[: width - 1] = False
+    return run
+
+
+def run_rules(
+    points: np.ndarray, center: float, sigma: float, rules: Sequence[int] = tuple(NELSON_RULES)
+) -> List[RuleViolation]:
+    """Evaluate Nelson rules on ``points``; each violation lists the points that complete it."""
+
+    x = np.asarray(points, dtype=float)
+    if sigma <= 0 or not np.isfinite(sigma):
+        return []
+    z = (x - center) / sigma
+    step = np.diff(x)
+    rising, falling = step > 0, step < 0
+    # A run of n points rising or alternating is a run of n - 1 steps (n - 2 step pairs), so
+    # step-based results are padded at the front to index the point that completes the run.
+    checks = {
+        1: lambda: np.abs(z) > 3,
+        2: lambda: _run(z > 0, 9) | _run(z < 0, 9),
+        3: lambda: np.concatenate(([False], _run(rising, 5) | _run(falling, 5))),
+        4: lambda: np.concatenate(
+            ([False, False], _run((rising[1:] & falling[:-1]) | (falling[1:] & rising[:-1]), 12))
+        ),
+        5: lambda: (_window_count(z > 2, 3) >= 2) | (_window_count(z < -2, 3) >= 2),
+        6: lambda: (_window_count(z > 1, 5) >= 4) | (_window_count(z < -1, 5) >= 4),
+        7: lambda: _run(np.abs(z) < 1, 15),
+        8: lambda: _run(np.abs(z) > 1, 8),
+    }
+    violations = []
+    for rule in rules:
+        hits = np.flatnonzero(checks[rule]())
+        if hits.size:
+            violations.append(RuleViolation(rule=rule, indices=hits))
+    return violations
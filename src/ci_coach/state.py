@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import Any, Dict, List, Optional
 
+from typing_extensions import Annotated, TypedDict
+
 
 @dataclass
 class Message:
@@ -14,6 +16,60 @@ class Message:
     content: str
 
 
+def append_items(left: List[Any], right: List[Any]) -> List[Any]:
+    """Reducer for append-only graph fields; unchanged when a node appends nothing."""
+
+    return left + right if right else left
+
+
+def merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Reducer for keyed graph fields; new entries are merged into the existing mapping."""
+
+    return {**left, **right} if right else left
+
+
+class GraphState(TypedDict, total=False):
+    """Typed LangGraph schema mirroring ``CIState``.
+
+    Nodes return only the fields they change. Append-only fields use ``append_items`` and
+    keyed collections use ``merge_dicts``; every other field is replaced by the latest write.
+    """
+
+    intent: str
+    mode: str
+    user_role: str
+    problem_statement: Optional[str]
+    value_proposition: Dict[str, Any]
+    problem_metrics: List[Dict[str, Any]]
+    problem_scope: Dict[str, Any]
+    sipoc: Dict[str, Any]
+    process_map: Dict[str, Any]
+    vsm: Dict[str, Any]
+    fishbone: Dict[str, Any]
+    five_whys: List[Dict[str, Any]]
+    a3: Dict[str, Any]
+    kaizen_plan: List[Dict[str, Any]]
+    spc: Dict[str, Any]
+    datasets: Annotated[Dict[str, Any], merge_dicts]
+    charts: Annotated[List[str], append_items]
+    diagrams: Annotated[List[str], append_items]
+    diagram_stats: Annotated[Dict[str, int], merge_dicts]
+    ci_opportunities: List[Dict[str, Any]]
+    messages: Annotated[List[Message], append_items]
+    audit_log: Annotated[List[Dict[str, Any]], append_items]
+    latest_user_message: Optional[str]
+    pending_response: Optional[str]
+    router_decision: Optional[str]
+    suggested_next_steps: List[str]
+    turn_policy: Dict[str, Any]
+    turn_hops: int
+    turn_llm_calls: int
+    turn_prompt_tokens: List[int]
+    conversation_summary: str
+    summarized_upto: int
+    artifact_versions: Annotated[Dict[str, Dict[str, Any]], merge_dicts]
+
+
 @dataclass
 class CIState:
     """Container for conversation state shared across the LangGraph."""
@@ -32,9 +88,14 @@ class CIState:
     five_whys: List[Dict[str, Any]] = field(default_factory=list)
     a3: Dict[str, Any] = field(default_factory=dict)
     kaizen_plan: List[Dict[str, Any]] = field(default_factory=list)
-    datasets: Dict[str, Any] = field(default_factory=dict)
+    # Control chart results keyed by ``dataset:column`` (see ``spc.SPCResult.to_dict``).
+    spc: Dict[str, Any] = field(default_factory=dict)
+    # Dataset handles (see ``dataset_store.DatasetHandle``); the data lives in the store.
+    datasets: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     charts: List[str] = field(default_factory=list)
     diagrams: List[str] = field(default_factory=list)
+    # Diagram renders and skipped no-op redrafts this session (``rendered``/``unchanged``).
+    diagram_stats: Dict[str, int] = field(default_factory=dict)
     ci_opportunities: List[Dict[str, Any]] = field(default_factory=list)
     messages: List[Message] = field(default_factory=list)
     audit_log: List[Dict[str, Any]] = field(default_factory=list)
@@ -42,6 +103,13 @@ class CIState:
     pending_response: Optional[str] = None
     router_decision: Optional[str] = None
     suggested_next_steps: List[str] = field(default_factory=list)
+    turn_policy: Dict[str, Any] = field(default_factory=dict)
+    turn_hops: int = 0
+    turn_llm_calls: int = 0
+    turn_prompt_tokens: List[int] = field(default_factory=list)
+    conversation_summary: str = ""
+    summarized_upto: int = 0
+    artifact_versions: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
     def to_dict(self) -> Dict[str, Any]:
         """Return a serialisable representation of the state."""
@@ -61,9 +129,11 @@ class CIState:
             "five_whys": self.five_whys,
             "a3": self.a3,
             "kaizen_plan": self.kaizen_plan,
+            "spc": self.spc,
             "datasets": self.datasets,
             "charts": self.charts,
             "diagrams": self.diagrams,
+            "diagram_stats": self.diagram_stats,
             "ci_opportunities": self.ci_opportunities,
             "messages": [m.__dict__ for m in self.messages],
             "audit_log": self.audit_log,
@@ -71,8 +141,30 @@ class CIState:
             "pending_response": self.pending_response,
             "router_decision": self.router_decision,
             "suggested_next_steps": self.suggested_next_steps,
+            "turn_policy": self.turn_policy,
+            "turn_hops": self.turn_hops,
+            "turn_llm_calls": self.turn_llm_calls,
+            "turn_prompt_tokens": self.turn_prompt_tokens,
+            "conversation_summary": self.conversation_summary,
+            "summarized_upto": self.summarized_upto,
+            "artifact_versions": self.artifact_versions,
         }
 
+    def to_graph_state(self) -> GraphState:
+        """Return the graph input for a turn without copying or converting any field."""
+
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @classmethod
+    def from_graph_state(cls, state: GraphState) -> "CIState":
+        """Wrap graph state in a ``CIState`` view.
+
+        Fields are shared with the graph rather than copied, so nodes must report changes by
+        returning an update instead of mutating collections on the view.
+        """
+
+        return cls(**state)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "CIState":
         """Instantiate a ``CIState`` from a plain dictionary."""
@@ -93,9 +185,11 @@ class CIState:
             five_whys=data.get("five_whys", []),
             a3=data.get("a3", {}),
             kaizen_plan=data.get("kaizen_plan", []),
+            spc=data.get("spc", {}),
             datasets=data.get("datasets", {}),
             charts=data.get("charts", []),
             diagrams=data.get("diagrams", []),
+            diagram_stats=data.get("diagram_stats", {}),
             ci_opportunities=data.get("ci_opportunities", []),
             messages=messages,
             audit_log=data.get("audit_log", []),
@@ -103,6 +197,13 @@ class CIState:
             pending_response=data.get("pending_response"),
             router_decision=data.get("router_decision"),
             suggested_next_steps=data.get("suggested_next_steps", []),
+            turn_policy=data.get("turn_policy", {}),
+            turn_hops=data.get("turn_hops", 0),
+            turn_llm_calls=data.get("turn_llm_calls", 0),
+            turn_prompt_tokens=data.get("turn_prompt_tokens", []),
+            conversation_summary=data.get("conversation_summary", ""),
+            summarized_upto=data.get("summarized_upto", 0),
+            artifact_versions=data.get("artifact_versions", {}),
         )
 
 
@@ -111,3 +212,12 @@ def append_message(state: CIState, role: str, content: str) -> None:
 
     state.messages.append(Message(role=role, content=content))
     state.audit_log.append({"role": role, "content": content})
+
+
+def message_update(role: str, content: str) -> GraphState:
+    """Return the graph update that appends a chat message to the history."""
+
+    return {
+        "messages": [Message(role=role, content=content)],
+        "audit_log": [{"role": role, "content": content}],
+    }
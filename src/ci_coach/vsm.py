@@ -0,0 +1,311 @@
+"""Value stream metrics, computed deterministically and vectorised with numpy.
+
+:func:`compute_vsm` takes value stream stages, as the ``stages`` list of the VSM JSON or as a
+table with one row per stage (``ct_min``, ``wt_min``, ``wip`` and optionally ``family`` for
+product families), and returns a :class:`VSMResult` with, per family:
+
+* lead time (cycle plus waiting time), value-add time and %VA;
+* takt time, the available minutes per day over the daily demand;
+* the bottleneck, the stage with the longest cycle time, and the stages slower than takt;
+* a Little's Law check: the WIP divided by the throughput the demand implies should match the
+  measured lead time, and a large mismatch points at stale WIP counts or waiting times.
+
+Every metric is a ``bincount`` or a sort over the stage arrays, so value streams with
+thousands of stages and families take milliseconds. :meth:`VSMResult.to_dict` is the VSM
+JSON kept in the state's ``vsm`` field, so coaches cite these numbers instead of doing the
+arithmetic themselves.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# One eight-hour shift, used for takt time when no available time is given.
+DEFAULT_AVAILABLE_MIN = 480.0
+# Little's Law is flagged when the WIP-implied lead time is off by more than this fraction.
+LITTLES_LAW_TOLERANCE = 0.25
+MAX_CITED_STAGES = 5
+
+# Accepted column names for each stage field, matched case-insensitively.
+STAGE_COLUMNS: Dict[str, Sequence[str]] = {
+    "id": ("id", "stage_id", "step_id"),
+    "name": ("name", "stage", "step", "process"),
+    "family": ("family", "product_family", "value_stream", "product"),
+    "ct_min": ("ct_min", "ct", "cycle_time", "cycle_time_min"),
+    "wt_min": ("wt_min", "wt", "wait_time", "wait_time_min", "queue_time_min"),
+    "wip": ("wip", "inventory", "queue"),
+    "demand_per_day": ("demand_per_day", "daily_demand", "demand"),
+}
+
+
+def stage_columns(columns: Iterable[Any]) -> Dict[str, Any]:
+    """Map stage fields to the matching ``columns``; a stage table needs at least ``ct_min``."""
+
+    lowered = {str(column).strip().lower(): column for column in columns}
+    found = {}
+    for name, aliases in STAGE_COLUMNS.items():
+        match = next((lowered[alias] for alias in aliases if alias in lowered), None)
+        if match is not None:
+            found[name] = match
+    return found
+
+
+def is_stage_table(columns: Iterable[Any]) -> bool:
+    """Whether ``columns`` look like value stream stages: a cycle time and a waiting time or WIP.
+
+    A cycle time column on its own is as likely to hold per-unit measurements for charting.
+    """
+
+    found = stage_columns(columns)
+    return "ct_min" in found and ("wt_min" in found or "wip" in found)
+
+
+def stage_frame(stages: pd.DataFrame | Iterable[Mapping[str, Any]]) -> pd.DataFrame:
+    """Normalise stages to ``id``, ``name``, ``family``, ``ct_min``, ``wt_min`` and ``wip`` columns."""
+
+    df = stages if isinstance(stages, pd.DataFrame) else pd.DataFrame(list(stages))
+    columns = stage_columns(df.columns)
+    if "ct_min" not in columns:
+        raise ValueError("Value stream stages need a cycle time column (ct_min).")
+
+    n = len(df)
+    frame = pd.DataFrame(index=pd.RangeIndex(n))
+    ids = df[columns["id"]].astype(str).to_numpy() if "id" in columns else [f"s{i + 1}" for i in range(n)]
+    frame["id"] = ids
+    frame["name"] = df[columns["name"]].astype(str).to_numpy() if "name" in columns else frame["id"]
+    frame["family"] = df[columns["family"]].fillna("").astype(str).to_numpy() if "family" in columns else ""
+    for name in ("ct_min", "wt_min", "wip", "demand_per_day"):
+        if name in columns:
+            values = pd.to_numeric(df[columns[name]], errors="coerce").to_numpy(dtype=float)
+            frame[name] = np.clip(np.nan_to_num(values, nan=0.0), 0.0, None)
+        elif name != "demand_per_day":
+            frame[name] = 0.0
+    return frame
+
+
+def _plural(count: int, noun: str) -> str:
+    return f"{count:,} {noun}{'s' if count != 1 else ''}"
+
+
+def _number(value: float) -> Optional[float]:
+    return round(float(value), 3) if np.isfinite(value) else None
+
+
+@dataclass
+class VSMResult:
+    """Per-family value stream metrics over a normalised stage frame."""
+
+    name: str
+    stages: pd.DataFrame
+    families: List[str]
+    available_min_per_day: float
+    value_add: np.ndarray
+    wait: np.ndarray
+    wip: np.ndarray
+    demand: np.ndarray
+    takt: np.ndarray
+    # Index into ``stages`` of each family's bottleneck, and stage counts per family.
+    bottleneck: np.ndarray
+    stage_counts: np.ndarray
+    over_takt: np.ndarray
+    # Per family, the indices of its stages slower than takt, in stage order.
+    over_takt_stages: List[np.ndarray]
+    # The ``demand_per_day`` argument, used by families without a demand column value.
+    default_demand: Optional[float] = None
+
+    @property
+    def lead_time(self) -> np.ndarray:
+        return self.value_add + self.wait
+
+    @property
+    def pct_va(self) -> np.ndarray:
+        lead = self.lead_time
+        return np.divide(self.value_add, lead, out=np.zeros_like(lead), where=lead > 0)
+
+    @property
+    def wip_lead_time(self) -> np.ndarray:
+        """Lead time implied by Little's Law: WIP over throughput, which is one unit per takt."""
+
+        return self.wip * self.takt
+
+    @property
+    def littles_law_ratio(self) -> np.ndarray:
+        lead = self.lead_time
+        return np.divide(self.wip_lead_time, lead, out=np.full_like(lead, np.nan), where=lead > 0)
+
+    @property
+    def critical(self) -> int:
+        """The family with the longest lead time, reported at the top level of :meth:`to_dict`."""
+
+        return int(np.argmax(self.lead_time))
+
+    def family_summaries(self) -> List[Dict[str, Any]]:
+        """Metrics of every family, computed together so thousands of families stay cheap."""
+
+        ids = self.stages["id"].to_numpy()
+        ratio = self.littles_law_ratio
+        consistent = np.abs(ratio - 1) <= LITTLES_LAW_TOLERANCE
+        columns = zip(
+            self.families,
+            self.demand.tolist(),
+            self.takt.tolist(),
+            self.lead_time.tolist(),
+            self.value_add.tolist(),
+            self.wait.tolist(),
+            self.pct_va.tolist(),
+            self.wip.tolist(),
+            self.stage_counts.tolist(),
+            ids[self.bottleneck].tolist(),
+            self.over_takt_stages,
+            self.wip_lead_time.tolist(),
+            ratio.tolist(),
+            consistent.tolist(),
+        )
+        return [
+            {
+                "family": family,
+                "demand_per_day": _number(demand),
+                "takt_min": _number(takt),
+                "lead_time_min": _number(lead),
+                "value_add_time_min": _number(value_add),
+                "wait_time_min": _number(wait),
+                "pct_va": _number(pct_va),
+                "wip": _number(wip),
+                "stage_count": count,
+                "bottleneck_stage_id": str(bottleneck),
+                "stages_over_takt": ids[over].tolist(),
+                "littles_law": {
+                    "wip_lead_time_min": _number(wip_lead),
+                    "ratio": _number(family_ratio),
+                    "consistent": bool(agrees) if np.isfinite(family_ratio) else None,
+                },
+            }
+            for (
+                family, demand, takt, lead, value_add, wait, pct_va, wip, count, bottleneck, over, wip_lead,
+                family_ratio, agrees,
+            ) in columns
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The VSM JSON: stages plus the critical family's metrics, and every family's when several.
+
+        Stages keep their own ``demand_per_day`` when a column supplied it, and
+        ``default_demand_per_day`` is the demand given for the rest, so recomputing from this
+        JSON gives every family the demand it had.
+        """
+
+        columns = ["id", "name", "ct_min", "wt_min", "wip"] + (["family"] if len(self.families) > 1 else [])
+        if "demand_per_day" in self.stages:
+            columns.append("demand_per_day")
+        values = [self.stages[column].to_numpy() for column in columns] + [self.over_takt]
+        values = [np.round(value, 3).tolist() if value.dtype.kind == "f" else value.tolist() for value in values]
+        # Zipping plain lists is several times faster than DataFrame.to_dict("records").
+        keys = [*columns, "over_takt"]
+        summaries = self.family_summaries()
+        result = {
+            "name": self.name,
+            "available_min_per_day": _number(self.available_min_per_day),
+            "default_demand_per_day": None if self.default_demand is None else _number(self.default_demand),
+            "stages": [dict(zip(keys, row)) for row in zip(*values)],
+            **summaries[self.critical],
+        }
+        if len(self.families) > 1:
+            result["families"] = summaries
+        else:
+            result.pop("family")
+        return result
+
+    def describe(self) -> str:
+        """A few sentences suitable for a coach reply."""
+
+        family = self.critical
+        bottleneck = self.stages.iloc[self.bottleneck[family]]
+        lead, value_add = self.lead_time[family], self.value_add[family]
+        text = ""
+        if len(self.families) > 1:
+            slowest = self.families[family] or "the unnamed family"
+            text = f"Across {len(self.families):,} product families, {slowest} has the longest lead time. "
+        text += (
+            f"Lead time {lead:,.1f} min ({lead / 60:,.1f} h), value-add {value_add:,.1f} min "
+            f"({self.pct_va[family]:.1%} VA) over {_plural(self.stage_counts[family], 'stage')}; bottleneck "
+            f"{bottleneck['name']} (CT {bottleneck['ct_min']:.3g} min)."
+        )
+        takt = self.takt[family]
+        if not np.isfinite(takt):
+            return text + " Give the daily demand (demand_per_day) to get takt time and a Little's Law check."
+        over = self.over_takt_stages[family]
+        text += f" Takt {takt:.3g} min at {self.demand[family]:g}/day"
+        if over.size:
+            names = self.stages["name"].iloc[over[:MAX_CITED_STAGES]].tolist()
+            cited = ", ".join(names) + (" ..." if over.size > MAX_CITED_STAGES else "")
+            text += f"; {_plural(over.size, 'stage')} slower than takt ({cited})."
+        else:
+            text += "; every stage keeps up with takt."
+        ratio = self.littles_law_ratio[family]
+        if np.isfinite(ratio) and abs(ratio - 1) > LITTLES_LAW_TOLERANCE:
+            text += (
+                f" Little's Law: {self.wip[family]:,.0f} units of WIP at takt imply a "
+                f"{self.wip_lead_time[family]:,.0f} min lead time against {lead:,.0f} min measured; "
+                "check the WIP counts and waiting times."
+            )
+        elif np.isfinite(ratio):
+            text += " WIP and lead time agree with Little's Law."
+        return text
+
+
+def compute_vsm(
+    stages: pd.DataFrame | Iterable[Mapping[str, Any]],
+    demand_per_day: Optional[float] = None,
+    available_min_per_day: float = DEFAULT_AVAILABLE_MIN,
+    name: str = "",
+) -> VSMResult:
+    """Compute value stream metrics per product family, in stage order.
+
+    A ``demand_per_day`` column overrides ``demand_per_day`` for its family (the largest
+    value in the family is used).
+    """
+
+    frame = stage_frame(stages)
+    if frame.empty:
+        raise ValueError("The value stream has no stages.")
+    codes, families = pd.factorize(frame["family"], sort=False)
+    frame["family_code"] = codes
+    k = len(families)
+    ct, wt, wip = (frame[column].to_numpy(dtype=float) for column in ("ct_min", "wt_min", "wip"))
+
+    demand = np.full(k, np.nan if demand_per_day is None else float(demand_per_day))
+    if "demand_per_day" in frame:
+        family_demand = np.full(k, -np.inf)
+        np.maximum.at(family_demand, codes, frame["demand_per_day"].to_numpy(dtype=float))
+        demand = np.where(family_demand > 0, family_demand, demand)
+    takt = np.divide(available_min_per_day, demand, out=np.full(k, np.nan), where=demand > 0)
+
+    # The first stage of each family after sorting by cycle time, longest first.
+    order = np.lexsort((np.arange(len(frame)), -ct, codes))
+    bottleneck = order[np.searchsorted(codes[order], np.arange(k))]
+    with np.errstate(invalid="ignore"):
+        over_takt = ct > takt[codes]
+    over = np.flatnonzero(over_takt)
+    over = over[np.argsort(codes[over], kind="stable")]
+    over_takt_stages = np.split(over, np.searchsorted(codes[over], np.arange(1, k)))
+
+    return VSMResult(
+        name=name,
+        stages=frame,
+        families=[str(family) for family in families],
+        available_min_per_day=float(available_min_per_day),
+        value_add=np.bincount(codes, weights=ct, minlength=k),
+        wait=np.bincount(codes, weights=wt, minlength=k),
+        wip=np.bincount(codes, weights=wip, minlength=k),
+        demand=demand,
+        takt=takt,
+        bottleneck=bottleneck,
+        stage_counts=np.bincount(codes, minlength=k),
+        over_takt=over_takt,
+        over_takt_stages=over_takt_stages,
+        default_demand=None if demand_per_day is None else float(demand_per_day),
+    )
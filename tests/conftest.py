@@ -0,0 +1,13 @@
+import pytest
+
+from ci_coach import dataset_store
+from ci_coach.dataset_store import DatasetStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A dataset store in a temporary directory, installed as the process-wide store."""
+
+    store = DatasetStore(tmp_path / "datasets")
+    monkeypatch.setattr(dataset_store, "_STORE", store)
+    return store
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ci_coach.datasets import extract_datasets, load_dataset
+
+
+@pytest.fixture
+def cycle_times(tmp_path):
+    rng = np.random.default_rng(9)
+    path = tmp_path / "cycle_times.csv"
+    pd.DataFrame({"line": rng.choice(["A", "B", "C"], 5000), "ct": rng.integers(1, 100, 5000)}).to_csv(
+        path, index=False
+    )
+    return path
+
+
+def test_chunked_load_keeps_every_row_within_the_limit(cycle_times):
+    df, stats = load_dataset(cycle_times, chunk_rows=1000)
+    assert (stats.rows_read, stats.rows_kept, stats.chunks, stats.mode) == (5000, 5000, 5, "full")
+    assert df["ct"].dtype == np.int8 and isinstance(df["line"].dtype, pd.CategoricalDtype)
+    assert df["ct"].tolist() == pd.read_csv(cycle_times)["ct"].tolist()
+
+
+def test_rows_beyond_the_limit_are_sampled_in_order(cycle_times):
+    df, stats = load_dataset(cycle_times, chunk_rows=1000, max_rows=500)
+    assert (stats.rows_kept, stats.mode) == (500, "sample")
+    assert df.index.is_monotonic_increasing
+
+
+def test_aggregate_by_keeps_group_statistics(cycle_times):
+    source = pd.read_csv(cycle_times)
+    df, stats = load_dataset(cycle_times, chunk_rows=700, aggregate_by=["line"])
+    expected = source.groupby("line")["ct"].agg(["count", "sum", "min", "max"])
+    assert stats.mode == "aggregate"
+    assert df.set_index("line")[["ct_count", "ct_sum", "ct_min", "ct_max"]].to_numpy().tolist() == (
+        expected.to_numpy().tolist()
+    )
+
+
+def test_peak_memory_is_measured_per_load(cycle_times):
+    # Raise the process's lifetime high-water mark well above what the load needs.
+    ballast = np.ones(50_000_000)
+    del ballast
+    _, stats = load_dataset(cycle_times, chunk_rows=1000)
+    assert 0 <= stats.peak_rss_increase_mb < 100
+    assert "peak RSS +" in stats.describe()
+
+
+def test_pasted_blocks_become_datasets():
+    message = "Here:\n```csv\nx,y\n1,2\n3,4\n```\nand\n```python\nprint(1)\n```"
+    [(name, df)] = extract_datasets(message)
+    assert name == "dataset_1" and df.to_dict("list") == {"x": [1, 3], "y": [2, 4]}
@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+from ci_coach.json_utils import MessageFieldStreamer, extract_json
+
+REPLY = {
+    "intent": "message",
+    "nested": {"message": "not this one", "items": ["message", {"message": "nor this"}]},
+    "message": 'Line one\nTab\there, a "quote", a back\\slash, caf\u00e9 and a rocket \U0001F680.',
+    "suggested_next_steps": ["Draw the map"],
+    "after": "message",
+}
+
+
+def stream(text, sizes):
+    streamer = MessageFieldStreamer()
+    pieces, start = [], 0
+    for size in sizes:
+        pieces.append(streamer.feed(text[start : start + size]))
+        start += size
+    pieces.append(streamer.feed(text[start:]))
+    return "".join(pieces), streamer
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_every_chunking_decodes_the_message(ensure_ascii):
+    text = "```json\n" + json.dumps(REPLY, ensure_ascii=ensure_ascii, indent=1) + "\n```"
+    rng = np.random.default_rng(8)
+    chunkings = [[1] * len(text), [3] * len(text), rng.integers(1, 12, len(text)).tolist()]
+    for sizes in chunkings:
+        decoded, streamer = stream(text, sizes)
+        assert decoded == REPLY["message"]
+        assert streamer.done
+
+
+def test_surrogate_pair_split_across_chunks():
+    text = json.dumps({"message": "\U0001F680!"})
+    split = text.index("\\ude")
+    streamer = MessageFieldStreamer()
+    assert streamer.feed(text[: split + 2]) == ""
+    assert streamer.feed(text[split + 2 :]) == "\U0001F680!"
+
+
+def test_text_is_emitted_as_it_arrives():
+    streamer = MessageFieldStreamer()
+    assert streamer.feed('{"message": "Hel') == "Hel"
+    assert streamer.feed('lo\\') == "lo"
+    assert streamer.feed('n", "x": 1}') == "\n"
+    assert streamer.done
+
+
+def test_missing_or_non_string_field_emits_nothing():
+    for reply in ({"intent": "charts"}, {"message": None, "text": "hi"}, {"data": {"message": "inner"}}):
+        decoded, streamer = stream(json.dumps(reply), [5] * 20)
+        assert decoded == "" and not streamer.done
+
+
+def test_other_fields_and_escaped_keys():
+    reply = {'a "message"': "no", "summary": "yes \\o/"}
+    streamer = MessageFieldStreamer(field="summary")
+    assert streamer.feed(json.dumps(reply)) == "yes \\o/"
+    assert MessageFieldStreamer().feed(json.dumps(reply)) == ""
+
+
+def test_extract_json_tolerates_surrounding_text():
+    assert extract_json('Sure:\n```json\n{"message": "hi"}\n```') == {"message": "hi"}
+    with pytest.raises(ValueError):
+        extract_json("no json here")
+    with pytest.raises(ValueError):
+        extract_json("   ")
@@ -0,0 +1,112 @@
+import pytest
+
+from ci_coach.persistence import SessionCheckpointer
+from ci_coach.state import CIState, Message
+
+
+def kinds(checkpointer, session_id):
+    return [
+        kind
+        for (kind,) in checkpointer._connection().execute(
+            "SELECT kind FROM checkpoints WHERE session_id = ? ORDER BY seq", (session_id,)
+        )
+    ]
+
+
+def turn(state, number):
+    state.messages.append(Message(role="user", content=f"turn {number}"))
+    state.messages.append(Message(role="assistant", content=f"reply {number}"))
+    state.audit_log.append({"node": "turn", "hops": 1})
+    state.intent = f"intent {number % 2}"
+
+
+@pytest.fixture
+def checkpointer(tmp_path):
+    checkpointer = SessionCheckpointer(tmp_path / "sessions.sqlite", snapshot_every=3)
+    yield checkpointer
+    checkpointer.close()
+
+
+def test_deltas_rebuild_the_state(checkpointer):
+    state = CIState()
+    for number in range(5):
+        turn(state, number)
+        checkpointer.save("s1", state)
+    state.process_map = {"steps": [{"id": "s1", "name": "Receive"}]}
+    checkpointer.save("s1", state)
+    assert checkpointer.load("s1").to_dict() == state.to_dict()
+
+
+def test_snapshots_every_n_checkpoints_and_compacts_older_rows(checkpointer):
+    state = CIState()
+    seqs = []
+    for number in range(5):
+        turn(state, number)
+        seqs.append(checkpointer.save("s1", state))
+    assert seqs == [1, 2, 3, 4, 5]
+    # 1 snapshot, 2 deltas, then snapshot 4 removes rows 1-3.
+    assert kinds(checkpointer, "s1") == ["snapshot", "delta"]
+    assert checkpointer.sessions()[0]["checkpoints"] == 2
+
+
+def test_delta_holds_only_the_appended_tail_and_changed_fields(checkpointer):
+    state = CIState()
+    turn(state, 0)
+    checkpointer.save("s1", state)
+    turn(state, 1)
+    checkpointer.save("s1", state)
+    (payload,) = checkpointer._connection().execute("SELECT payload FROM checkpoints WHERE seq = 2").fetchone()
+    assert '"turn 0"' not in payload and '"turn 1"' in payload
+    assert '"intent": "intent 1"' in payload and '"mode"' not in payload
+
+
+def test_unchanged_state_writes_nothing(checkpointer):
+    state = CIState()
+    turn(state, 0)
+    assert checkpointer.save("s1", state) == 1
+    assert checkpointer.save("s1", state) == 1
+    assert kinds(checkpointer, "s1") == ["snapshot"]
+
+
+def test_shrinking_an_append_only_field_writes_a_snapshot(checkpointer):
+    state = CIState()
+    turn(state, 0)
+    checkpointer.save("s1", state)
+    state.messages = state.messages[1:]
+    checkpointer.save("s1", state)
+    assert kinds(checkpointer, "s1") == ["snapshot"]
+    assert len(checkpointer.load("s1").messages) == 1
+
+
+def test_a_new_process_resumes_with_a_snapshot(checkpointer):
+    state = CIState()
+    turn(state, 0)
+    checkpointer.save("s1", state)
+    checkpointer.close()
+
+    restarted = SessionCheckpointer(checkpointer.path, snapshot_every=3)
+    turn(state, 1)
+    assert restarted.save("s1", state) == 2
+    assert kinds(restarted, "s1") == ["snapshot"]
+    resumed = restarted.load("s1")
+    turn(resumed, 2)
+    restarted.save("s1", resumed)
+    assert kinds(restarted, "s1") == ["snapshot", "delta"]
+    assert restarted.load("s1").to_dict() == resumed.to_dict()
+    restarted.close()
+
+
+def test_sessions_are_independent_and_deletable(checkpointer):
+    for session_id in ("a", "b"):
+        state = CIState(problem_statement=session_id)
+        checkpointer.save(session_id, state)
+    assert {row["session_id"] for row in checkpointer.sessions()} == {"a", "b"}
+    checkpointer.delete("a")
+    assert "a" not in checkpointer and "b" in checkpointer
+    assert checkpointer.load("a") is None
+    assert checkpointer.load("b").problem_statement == "b"
+
+
+def test_snapshot_interval_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        SessionCheckpointer(tmp_path / "sessions.sqlite", snapshot_every=0)
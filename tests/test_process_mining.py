@@ -0,0 +1,106 @@
+import pandas as pd
+import pytest
+
+from ci_coach import coaches
+from ci_coach.coaches import _event_log
+from ci_coach.process_mining import discover_process_map, is_event_log
+from ci_coach.router import match_rules
+from ci_coach.state import CIState
+
+# Two cases, rows deliberately out of time order; case 2 reworks Check.
+LOG = pd.DataFrame(
+    {
+        "case_id": ["1", "2", "1", "2", "2", "1", "2"],
+        "activity": ["Receive", "Receive", "Check", "Check", "Check", "Ship", "Ship"],
+        "timestamp": [
+            "2024-01-02 08:00",
+            "2024-01-02 09:00",
+            "2024-01-02 08:30",
+            "2024-01-02 10:00",
+            "2024-01-02 11:00",
+            "2024-01-02 09:30",
+            "2024-01-02 13:00",
+        ],
+        "resource": ["Clerk", "Clerk", "QA", "QA", "QA", "Dock", "Dock"],
+    }
+)
+
+
+def edges(discovery):
+    names = {step["id"]: step["name"] for step in discovery.process_map["steps"]}
+    return {
+        (names[edge["from"]], names[edge["to"]]): (edge["frequency"], edge["median_minutes"])
+        for edge in discovery.process_map["edges"]
+    }
+
+
+def test_directly_follows_counts_and_median_gaps():
+    discovery = discover_process_map(LOG)
+    assert (discovery.events, discovery.cases) == (7, 2)
+    assert edges(discovery) == {
+        ("Receive", "Check"): (2, 45.0),
+        ("Check", "Check"): (1, 60.0),
+        ("Check", "Ship"): (2, 90.0),
+    }
+    assert [step["frequency"] for step in discovery.process_map["steps"]] == [2, 3, 2]
+    assert [role["name"] for role in discovery.process_map["roles"]] == ["Clerk", "QA", "Dock"]
+    # Case 1 takes 90 min, case 2 takes 240 min.
+    assert discovery.median_case_minutes == 165.0
+    assert discovery.start_activities == ["Receive"] and discovery.end_activities == ["Ship"]
+    assert discovery.highlights()["rework"] == ["Check -> Check (1x)"]
+
+
+def test_rare_activities_are_dropped():
+    discovery = discover_process_map(LOG, max_activities=2)
+    assert [step["name"] for step in discovery.process_map["steps"]] == ["Receive", "Check"]
+    assert discovery.to_dict()["dropped_events"] == 2
+
+
+def test_missing_event_columns_are_reported():
+    with pytest.raises(ValueError, match="activity"):
+        discover_process_map(LOG.drop(columns="activity"))
+
+
+def test_event_log_needs_date_times_and_repeated_cases():
+    assert is_event_log(LOG.columns, LOG)
+    assert is_event_log(["Case:Concept:Name", "concept:name", "time:timestamp"])
+    # Each case once: a table of lots, not a log.
+    assert not is_event_log(LOG.columns, LOG.drop_duplicates("case_id"))
+    # Numbers in a time column are durations or counters, not timestamps.
+    assert not is_event_log(LOG.columns, LOG.assign(timestamp=range(len(LOG))))
+    assert not is_event_log(LOG.columns, LOG.assign(timestamp="late"))
+    assert is_event_log(LOG.columns, LOG.assign(timestamp=pd.to_datetime(LOG["timestamp"])))
+
+
+def test_generic_columns_are_not_event_fields():
+    assert not is_event_log(["lot_id", "step", "date", "thickness"])
+    assert not is_event_log(["order_id", "event", "date", "team"])
+
+
+def test_measurement_tables_route_to_charts():
+    message = (
+        "Please plot an I-MR control chart of thickness per lot\n```\nlot_id,step,date,thickness\n"
+        "L1,coat,2024-01-02,5.1\nL2,coat,2024-01-03,5.3\nL3,coat,2024-01-04,5.0\n```"
+    )
+    assert match_rules(message).node == "charts"
+    table = "```\n" + LOG.to_csv(index=False) + "```"
+    decision = match_rules("Here is our order log\n" + table)
+    assert (decision.node, decision.confidence) == ("process_map", 0.9)
+    # A coach named in the text wins over the table.
+    assert match_rules("Plot a histogram of this\n" + table).node == "charts"
+
+
+def test_process_map_coach_checks_stored_rows(store):
+    state = CIState()
+    for name, frame in (("log", LOG), ("lots", LOG.drop_duplicates("case_id"))):
+        state.datasets[name] = store.put(name, frame).to_dict()
+    assert _event_log(state)[0] == "log"
+
+
+def test_event_log_verdicts_are_bounded(store, monkeypatch):
+    monkeypatch.setattr(coaches, "EVENT_LOG_CACHE_SIZE", 2)
+    monkeypatch.setattr(coaches, "_event_logs", coaches.OrderedDict())
+    handles = [store.put(f"log{i}", LOG.assign(resource=f"R{i}")).to_dict() for i in range(3)]
+    for handle in [*handles, handles[1]]:
+        assert coaches._is_event_log(handle)
+    assert list(coaches._event_logs) == [handles[2]["hash"], handles[1]["hash"]]
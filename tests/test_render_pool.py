@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from ci_coach import render_pool
+from ci_coach.render_pool import RenderError, RenderPool
+
+
+def render_in_background(pool, fn, *args):
+    """Run ``pool.render`` on a daemon thread; return its outcome, or None if it blocked."""
+
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(pool.render(fn, *args))
+        except Exception as exc:  # noqa: BLE001 - inspected by the test
+            outcome.append(exc)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=60)
+    return outcome[0] if outcome else None
+
+
+def test_render_fails_instead_of_hanging_when_a_worker_cannot_start(monkeypatch):
+    # ``abs`` cannot take the worker's arguments, so every worker exits before it is ready.
+    monkeypatch.setattr(render_pool, "_worker_main", abs)
+    pool = RenderPool(workers=1, timeout=5)
+    try:
+        with pytest.raises(RenderError):
+            pool.start()
+        # The dispatcher survives the first failure and serves the next job too.
+        for _ in range(2):
+            assert isinstance(render_in_background(pool, str, 1), RenderError)
+        stats = pool.stats()
+        assert stats["failed"] == 2 and stats["restarts"] == 2
+        assert all(thread.is_alive() for thread in pool._threads)
+    finally:
+        pool.close()
+
+
+def test_inline_pool_renders_on_a_thread():
+    pool = RenderPool(workers=0)
+    try:
+        assert pool.render(str, 12) == "12"
+        with pytest.raises(ValueError):
+            pool.render(int, "twelve")
+    finally:
+        pool.close()
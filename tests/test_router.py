@@ -0,0 +1,34 @@
+from ci_coach.router import EVENT_SAMPLE_ROWS, match_rules, training_samples
+
+
+def fenced(rows):
+    return "```\n" + "\n".join(rows) + "\n```"
+
+
+def test_keywords_inside_pasted_tables_are_ignored():
+    table = fenced(["case_id,activity,timestamp"] + [f"{i // 2},A{i % 4},2024-01-02 0{i % 9}:00" for i in range(40)])
+    assert match_rules("Here is our log\n" + table).node == "process_map"
+    assert match_rules("Draw the fishbone\n```text\nplot a pareto\n```").node == "fishbone"
+
+
+def test_event_log_check_only_parses_a_sample_of_rows():
+    header = "case_id,activity,timestamp"
+    # Every case appears once within the sample, so the table is not taken for an event log.
+    rows = [f"{i},Receive,2024-01-02 08:00" for i in range(EVENT_SAMPLE_ROWS)]
+    assert match_rules(fenced([header, *rows, "0,Ship,2024-01-03 08:00"])).node == "charts"
+    assert match_rules(fenced([header, "0,Ship,2024-01-03 08:00", *rows])).node == "process_map"
+
+
+def test_single_keyword_wins_and_ambiguity_defers():
+    assert match_rules("Let's do a 5 whys on the late shipments").node == "five_whys"
+    assert match_rules("hello there") is None
+
+
+def test_training_samples_drop_pasted_tables():
+    audit = [
+        {"role": "user", "content": "Chart this\n```\nx,y\n1,2\n```"},
+        {"node": "supervisor", "decision": "charts"},
+        {"role": "user", "content": "thanks"},
+        {"node": "supervisor", "decision": "charts", "route_path": "rules"},
+    ]
+    assert training_samples(audit) == [("Chart this\n ", "charts")]
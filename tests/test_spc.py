@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+
+from ci_coach.spc import _window_count, c4, control_chart, d2, imr, run_rules, xbar_r, xbar_s
+
+
+def rule_points(violations, rule):
+    return next((v.indices.tolist() for v in violations if v.rule == rule), [])
+
+
+def test_chart_constants_match_the_published_tables():
+    assert d2(2) == pytest.approx(1.128)
+    assert d2(5) == pytest.approx(2.326)
+    assert c4(5) == pytest.approx(0.9400, abs=1e-4)
+    assert c4(25) == pytest.approx(0.9896, abs=1e-4)
+    for n in (1, 26):
+        with pytest.raises(ValueError):
+            d2(n)
+
+
+def test_imr_limits_use_the_average_moving_range():
+    result = imr([10, 12, 11, 13, 12, 14, 13, 15])
+    mr_bar = 11 / 7
+    sigma = mr_bar / 1.128
+    assert result.sigma == pytest.approx(sigma)
+    assert result.limits.center == pytest.approx(12.5)
+    assert result.limits.ucl == pytest.approx(12.5 + 3 * sigma)
+    assert result.limits.lcl == pytest.approx(12.5 - 3 * sigma)
+    # D4 for n = 2 is 3.267.
+    assert result.dispersion_limits.ucl == pytest.approx(3.267 * mr_bar, rel=1e-3)
+    assert result.dispersion_limits.lcl == 0.0
+
+
+def test_imr_drops_missing_values():
+    assert imr([1.0, np.nan, 2.0, np.inf, 3.0]).points.tolist() == [1.0, 2.0, 3.0]
+
+
+def test_xbar_r_matches_a2_and_d4():
+    rng = np.random.default_rng(3)
+    values = rng.normal(50, 2, 100)
+    result = xbar_r(values, 5)
+    groups = values.reshape(20, 5)
+    r_bar = np.ptp(groups, axis=1).mean()
+    grand_mean = groups.mean()
+    # A2 = 0.577, D3 = 0 and D4 = 2.114 for subgroups of five.
+    assert result.limits.center == pytest.approx(grand_mean)
+    assert result.limits.ucl == pytest.approx(grand_mean + 0.577 * r_bar, rel=1e-3)
+    assert result.dispersion_limits.ucl == pytest.approx(2.114 * r_bar, rel=1e-3)
+    assert result.dispersion_limits.lcl == 0.0
+
+
+def test_xbar_s_matches_a3_and_b4():
+    rng = np.random.default_rng(4)
+    values = rng.normal(5, 0.5, 12 * 20)
+    result = xbar_s(values, 12)
+    s_bar = values.reshape(20, 12).std(axis=1, ddof=1).mean()
+    # A3 = 0.886, B3 = 0.354 and B4 = 1.646 for subgroups of twelve.
+    assert result.limits.ucl - result.limits.center == pytest.approx(0.886 * s_bar, rel=1e-3)
+    assert result.dispersion_limits.lcl == pytest.approx(0.354 * s_bar, rel=1e-2)
+    assert result.dispersion_limits.ucl == pytest.approx(1.646 * s_bar, rel=1e-3)
+
+
+def test_trailing_partial_subgroup_is_left_out():
+    assert xbar_r(np.arange(23, dtype=float), 5).points.size == 4
+    with pytest.raises(ValueError):
+        xbar_r([1.0, 2.0, 3.0], 2)
+
+
+def test_control_chart_picks_the_conventional_chart():
+    values = np.arange(60, dtype=float) % 7
+    assert control_chart(values).chart == "I-MR"
+    assert control_chart(values, 5).chart == "X-bar/R"
+    assert control_chart(values, 12).chart == "X-bar/S"
+
+
+def test_constant_series_has_zero_width_limits_and_no_signals():
+    result = imr([4.2] * 30)
+    assert result.sigma == 0
+    assert result.limits.to_dict() == {"center": 4.2, "lcl": 4.2, "ucl": 4.2}
+    assert result.violations == []
+    assert result.dispersion_violations.size == 0
+    assert result.to_dict()["in_control"]
+    assert run_rules(np.full(20, 4.2), 4.2, 0.0) == []
+
+
+def test_rule_1_flags_points_beyond_three_sigma():
+    points = np.zeros(10)
+    points[[3, 7]] = [3.5, -4.0]
+    assert rule_points(run_rules(points, 0.0, 1.0, (1,)), 1) == [3, 7]
+
+
+def test_rule_2_flags_the_ninth_point_on_one_side():
+    points = np.r_[np.full(10, 0.5), np.full(3, -0.5)]
+    assert rule_points(run_rules(points, 0.0, 1.0, (2,)), 2) == [8, 9]
+
+
+def test_rule_3_indexes_the_sixth_rising_point():
+    # Six points are five rising steps; the step result is padded by one point.
+    points = np.r_[5.0, 5.0, np.arange(6) * 0.1, 0.0]
+    assert rule_points(run_rules(points, 0.0, 1.0, (3,)), 3) == [7]
+    assert run_rules(np.arange(5) * 0.1, 0.0, 1.0, (3,)) == []
+    falling = np.r_[np.arange(7)[::-1] * 0.1, 0.3]
+    assert rule_points(run_rules(falling, 0.0, 1.0, (3,)), 3) == [5, 6]
+
+
+def test_rule_4_indexes_the_fourteenth_alternating_point():
+    # Fourteen points are thirteen steps and twelve up/down pairs; padded by two points.
+    alternating = np.tile([0.1, -0.1], 7)
+    assert rule_points(run_rules(alternating, 0.0, 1.0, (4,)), 4) == [13]
+    assert run_rules(alternating[:13], 0.0, 1.0, (4,)) == []
+    # The flat first step breaks the pattern; points 1 to 17 alternate.
+    longer = np.r_[0.0, 0.0, np.tile([0.1, -0.1], 8)]
+    assert rule_points(run_rules(longer, 0.0, 1.0, (4,)), 4) == [14, 15, 16, 17]
+
+
+def test_rules_5_and_6_count_points_on_the_same_side():
+    points = np.array([0.0, 2.5, 0.0, 2.5, 0.0, -2.5, 0.0, 2.5])
+    assert rule_points(run_rules(points, 0.0, 1.0, (5,)), 5) == [3]
+    points = np.array([1.5, 1.5, 0.0, 1.5, 1.5, -1.5, -1.5, 0.0, -1.5])
+    assert rule_points(run_rules(points, 0.0, 1.0, (6,)), 6) == [4]
+
+
+def test_rules_7_and_8_flag_hugging_and_avoiding_the_centre():
+    hugging = np.tile([0.5, -0.5], 8)
+    assert rule_points(run_rules(hugging, 0.0, 1.0, (7,)), 7) == [14, 15]
+    avoiding = np.tile([1.5, -1.5], 4)
+    assert rule_points(run_rules(avoiding, 0.0, 1.0, (8,)), 8) == [7]
+
+
+def test_window_count_matches_a_cumulative_sum():
+    rng = np.random.default_rng(5)
+    flags = rng.random(10_000) < 0.7
+    for width in (3, 5, 15):
+        counts = _window_count(flags, width)
+        totals = np.cumsum(np.r_[0, flags.astype(np.int64)])
+        expected = totals[width:] - totals[:-width]
+        assert counts.dtype == np.int8
+        assert (counts[: width - 1] == 0).all()
+        assert counts[width - 1 :].tolist() == expected.tolist()
+
+
+def test_window_count_stays_within_int8_on_long_true_runs():
+    flags = np.ones(100_000, dtype=bool)
+    counts = _window_count(flags, 15)
+    assert counts.max() == 15 and counts.min() == 0
+    assert flags.all()
+
+
+def test_violations_cite_labels():
+    points = np.tile([0.0, 1.0], 10)
+    points[12] = 20.0
+    result = imr(points, rules=(1,))
+    summary = result.to_dict(labels=[f"lot {i}" for i in range(20)])
+    assert summary["violations"] == [
+        {"rule": 1, "description": "1 point beyond 3 sigma", "count": 1, "points": ["lot 12"]}
+    ]
+    assert not summary["in_control"]
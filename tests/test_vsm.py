@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ci_coach.coaches import _vsm_stages
+from ci_coach.state import CIState
+from ci_coach.vsm import compute_vsm, is_stage_table
+
+STAGES = pd.DataFrame(
+    {
+        "family": ["A", "A", "A", "B", "B"],
+        "stage": ["Cut", "Weld", "Pack", "Cut", "Paint"],
+        "ct_min": [5.0, 8.0, 2.0, 3.0, 12.0],
+        "wt_min": [30.0, 60.0, 10.0, 20.0, 90.0],
+        "wip": [4.0, 6.0, 1.0, 2.0, 5.0],
+        "demand_per_day": [60.0, 60.0, 60.0, 40.0, 40.0],
+    }
+)
+
+
+def test_metrics_per_family():
+    result = compute_vsm(STAGES)
+    assert result.families == ["A", "B"]
+    assert result.value_add.tolist() == [15.0, 15.0]
+    assert result.lead_time.tolist() == [115.0, 125.0]
+    assert result.pct_va == pytest.approx([15 / 115, 15 / 125])
+    assert result.takt.tolist() == [8.0, 12.0]
+    assert result.stages["name"].iloc[result.bottleneck].tolist() == ["Weld", "Paint"]
+    # Only stages strictly slower than takt are flagged.
+    assert np.flatnonzero(result.over_takt).tolist() == []
+    summary = result.to_dict()
+    assert summary["family"] == "B" and summary["lead_time_min"] == 125.0
+    assert [family["demand_per_day"] for family in summary["families"]] == [60.0, 40.0]
+
+
+def test_demand_argument_covers_families_without_a_demand_value():
+    stages = STAGES.assign(demand_per_day=[60.0, 60.0, 60.0, np.nan, np.nan])
+    result = compute_vsm(stages, demand_per_day=80)
+    assert result.demand.tolist() == [60.0, 80.0]
+    assert np.flatnonzero(result.over_takt).tolist() == [4]
+    assert np.isnan(compute_vsm(STAGES.drop(columns="demand_per_day")).takt).all()
+
+
+def test_recomputing_from_the_json_keeps_each_family_demand():
+    stages = STAGES.assign(demand_per_day=[60.0, 60.0, 60.0, np.nan, np.nan])
+    first = compute_vsm(stages, demand_per_day=80).to_dict()
+    assert first["default_demand_per_day"] == 80.0
+    again = compute_vsm(
+        first["stages"], demand_per_day=first["default_demand_per_day"], available_min_per_day=420
+    )
+    assert again.demand.tolist() == [60.0, 80.0]
+    assert again.takt.tolist() == [7.0, 5.25]
+    # Family B is critical, so the top-level demand is B's; the stages keep A's own.
+    assert first["demand_per_day"] == 80.0
+    assert [stage["demand_per_day"] for stage in first["stages"]] == [60.0, 60.0, 60.0, 0.0, 0.0]
+
+
+def test_littles_law_ratio():
+    stages = pd.DataFrame({"stage": ["A", "B"], "ct_min": [1.0, 1.0], "wt_min": [9.0, 9.0], "wip": [2.0, 2.0]})
+    result = compute_vsm(stages, demand_per_day=48)
+    # Takt is 10 min, so 4 units of WIP imply a 40 min lead time against 20 min measured.
+    assert result.littles_law_ratio.tolist() == [2.0]
+    assert not result.to_dict()["littles_law"]["consistent"]
+
+
+def test_stage_table_needs_a_wait_time_or_wip():
+    assert is_stage_table(["stage", "ct_min", "wip"])
+    assert not is_stage_table(["lot", "cycle_time"])
+
+
+def _session(store, *tables):
+    state = CIState()
+    for name, frame in tables:
+        handle = store.put(name, frame)
+        state.datasets[name] = handle.to_dict()
+        state.audit_log.append({"node": "dataset_ingest", "dataset": name})
+    return state
+
+
+def test_vsm_stages_prefer_a_table_loaded_this_turn(store):
+    state = _session(store, ("stages", STAGES))
+    stages, origin = _vsm_stages(state)
+    assert origin == "stages" and len(stages) == 5
+
+
+def test_vsm_stages_prefer_the_current_map_over_an_earlier_table(store):
+    state = _session(store, ("stages", STAGES))
+    state.audit_log.append({"node": "turn"})
+    state.vsm = compute_vsm(STAGES.iloc[:2]).to_dict()
+    state.latest_user_message = "add the demand to the value stream"
+    stages, origin = _vsm_stages(state)
+    assert origin == "the current value stream map" and len(stages) == 2
+    state.latest_user_message = "redo the value stream from stages"
+    assert _vsm_stages(state)[1] == "stages"
+
+
+def test_vsm_stages_fall_back_to_the_newest_table_then_the_process_map(store):
+    state = _session(store, ("old", STAGES.iloc[:2]), ("new", STAGES))
+    state.audit_log.append({"node": "turn"})
+    assert _vsm_stages(state)[1] == "new"
+    state = CIState(process_map={"steps": [{"id": "s1", "name": "Cut", "ct_min": 5}]})
+    assert _vsm_stages(state)[1] == "the process map"
+    assert _vsm_stages(CIState()) is None